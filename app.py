@@ -1,24 +1,45 @@
+import math
 import os
-from flask import Flask, request, redirect, url_for, render_template, flash
-from flask_mail import Mail, Message
+import time
+from contextlib import contextmanager
+from flask import Flask, request, redirect, url_for, render_template, flash, g
+from werkzeug.exceptions import HTTPException, TooManyRequests
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_wtf.csrf import CSRFProtect
 from contact_form import ContactForm
-import logging
-from logging import FileHandler
-from dotenv import load_dotenv
+from mail_queue import MailQueue, MailSender
+from smtp_pool import SMTPPool
+from page_cache import PageCache
+from compression import ENCODINGS, compress_response, static_file
+from assets import ONE_YEAR, AssetManifest, CriticalCSS, ImageManifest, VendorManifest
+from video import VideoLibrary
+from metrics import Metrics
+from scanner import ScannerFilter
+from email_check import DomainVerdicts
+from rate_limit import RateLimiter, parse_limit
+from i18n import DEFAULT_LANGUAGE, LANGUAGES, LANGUAGE_COOKIE, negotiate_language, other_language, translator
+from app_logging import setup_logging
+from warmup import bytecode_cache, compile_templates, import_modules, report, timed
+from static_server import StaticIndex, StaticMiddleware
+import sqlite3
 
+# Modules only needed once mail is sent or a form is validated. They are
+# imported on first use, or by warm_up() before a worker takes requests,
+# so that importing the app (and booting a worker) stays quick.
+DEFERRED_IMPORTS = ('email_validator', 'flask_mail')
 
 
 app = Flask(__name__)
 csrf = CSRFProtect(app)
-load_dotenv()
+# .env is a development convenience; deployments set the environment
+if os.path.exists(os.path.join(app.root_path, '.env')):
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(app.root_path, '.env'))
 
 
-# Set up logging
-if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
+# Log records are queued and written as JSON lines by a background thread
+# (LOG_FILE, LOG_LEVEL); warnings and errors also go to stderr
+setup_logging(app)
 
 
 # Flask app config
@@ -32,35 +53,238 @@ app.config['SESSION_COOKIE_SECURE'] = True  # Secure cookies (https)
 app.config['PREFERRED_URL_SCHEME'] = 'https'  # Ensure the correct scheme for production
 
 app.config['SESSION_TYPE'] = 'filesystem'  # For file-based sessions
-app.config['MAIL_SERVER'] = 'send.one.com'
-app.config['MAIL_PORT'] = 465
+app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'send.one.com')
+app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 465))
 app.config['MAIL_USERNAME'] = 'moi@espoo-israel.fi'
 app.config['MAIL_PASSWORD'] = os.getenv('EMAIL_PASSWORD')
 app.config['MAIL_USE_TLS'] = False
-app.config['MAIL_USE_SSL'] = True
+app.config['MAIL_USE_SSL'] = os.getenv('MAIL_USE_SSL', 'true').lower() in ('1', 'true', 'yes')
+app.config['MAIL_QUEUE_PATH'] = os.getenv('MAIL_QUEUE_PATH', 'mail_queue.db')
 app.config['DEBUG'] = False
 app.config['WTF_CSRF_ENABLED'] = False
+app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')  # /metrics is public without one
+# Contact form posts allowed per client IP and per email address, as
+# capacity/seconds token buckets; 0 disables the limit
+app.config['CONTACT_IP_LIMIT'] = os.getenv('CONTACT_IP_LIMIT', '10/3600')
+app.config['CONTACT_EMAIL_LIMIT'] = os.getenv('CONTACT_EMAIL_LIMIT', '3/3600')
 
 
-# session cookie security setting and error handling
+# session cookie security setting
 if not app.debug:
     app.config['SESSION_COOKIE_SECURE'] = True
     app.config['SESSION_COOKIE_HTTPONLY'] = True
-    file_handler = FileHandler('error.log')
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
 
-mail = Mail(app)
+# Request and phase timings, served at /metrics for all workers together
+metrics = Metrics()
+metrics.init_app(app)
+
+asset_manifest = AssetManifest(os.path.join(app.static_folder, 'dist', 'manifest.json'))
+vendor_manifest = VendorManifest(os.path.join(app.static_folder, 'vendor', 'manifest.json'))
+image_manifest = ImageManifest(os.path.join(app.static_folder, 'images', 'derived', 'manifest.json'))
+critical_manifest = CriticalCSS(os.path.join(app.static_folder, 'critical', 'manifest.json'),
+                                app.static_folder, asset_manifest)
+# Video renditions come from build_videos.py's manifest; until the hero
+# clip has been built, the hand-made files are used if they exist
+hero_videos = VideoLibrary(os.path.join(app.static_folder, 'videos'), fallback={'hero-video': [
+    ('hero-video-mobile.mp4', '(max-width: 768px)'),
+    ('hero-video.mp4', '(min-width: 769px)'),
+]})
+# Compiled templates are shared by workers and restarts through the
+# filesystem; warm_up() below loads them before the first request
+app.jinja_env.bytecode_cache = bytecode_cache()
+app.jinja_env.globals.update(picture=image_manifest.picture, responsive_background=image_manifest.background,
+                             image_url=image_manifest.url, video_sources=hero_videos.sources,
+                             video_poster=hero_videos.poster, vendored=vendor_manifest.get,
+                             vendor_preload=vendor_manifest.preload, stylesheet=critical_manifest.stylesheet)
+page_cache = PageCache(app, dependencies=[lambda: asset_manifest.version, lambda: vendor_manifest.version,
+                                          lambda: image_manifest.version, lambda: hero_videos.version,
+                                          lambda: critical_manifest.version])
+metrics.counter('page_cache_hits_total', 'Pages served from the rendered page cache', lambda: page_cache.hits)
+metrics.counter('page_cache_misses_total', 'Pages rendered for the page cache', lambda: page_cache.misses)
+
+# Known scanner probes (/wp-login.php, /.env, ...) get a static 404 before
+# routing and are only counted
+metrics.describe('scanner_blocked_total', 'counter', 'Scanner probes answered with a static 404, by rule')
+app.wsgi_app = ScannerFilter(app.wsgi_app,
+                             extra_patterns=[p for p in os.getenv('SCANNER_PATTERNS', '').split(',') if p],
+                             on_block=lambda rule: metrics.inc('scanner_blocked_total', rule=rule))
+
+# Behind a reverse proxy, TRUSTED_PROXIES is the number of X-Forwarded-For
+# hops to trust, so that request.remote_addr is the client's address. Leave
+# it at 0 only when clients connect directly: they could set the header
+if int(os.getenv('TRUSTED_PROXIES', 0)):
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(os.getenv('TRUSTED_PROXIES')))
+
+
+# Contact form submissions are queued and sent by a background thread so
+# the request never waits for the SMTP server. The thread reuses one
+# authenticated SMTP session for consecutive messages.
+smtp_pool = SMTPPool(app.config)
+# Connects well below messages sent means the session is being reused
+for name, stat, help in (
+        ('smtp_connects_total', 'connects', 'SMTP sessions opened and logged in'),
+        ('smtp_messages_sent_total', 'messages_sent', 'Messages sent over the pooled SMTP session'),
+        ('smtp_stale_sessions_total', 'stale_sessions', 'Pooled SMTP sessions found dropped by the server'),
+        ('smtp_failures_total', 'failures', 'Messages the SMTP pool failed to send')):
+    metrics.counter(name, help, lambda stat=stat: smtp_pool.stats[stat])
+# The form only checks the email syntax; whether the domain accepts mail
+# is looked up (and cached) here, off the request path
+email_domains = DomainVerdicts()
+UNDELIVERABLE_NOTE = "HUOM: lähettäjän sähköpostiosoitteen verkkotunnus ei vastaanota sähköpostia.\n\n"
+
+def deliver_submission(payload):
+    from flask_mail import Mail, Message
+    with app.app_context():
+        if 'mail' not in app.extensions:
+            Mail(app)
+        msg = Message(payload['subject'], sender=payload['sender'], recipients=payload['recipients'])
+        msg.body = payload['body']
+        if payload.get('submitter'):
+            with metrics.timer('email_check'):
+                if email_domains.check(payload['submitter']) is False:
+                    msg.body = UNDELIVERABLE_NOTE + msg.body
+        with metrics.timer('mail_send'):
+            smtp_pool.send(msg.sender, list(msg.send_to), msg.as_bytes(), msg.mail_options, msg.rcpt_options)
+
+mail_queue = MailQueue(app.config['MAIL_QUEUE_PATH'])
+mail_sender = MailSender(mail_queue, deliver_submission)
+
+@app.before_request
+def start_mail_sender():
+    mail_sender.start()
+
+# Bots and floods are turned away before the form is validated or any
+# mail is queued: honeypot and fill time first, then token buckets per
+# client IP and email address shared by the workers. Behind a proxy the IP
+# bucket needs TRUSTED_PROXIES (set to 1 in the Procfile and Dockerfile);
+# without it every visitor has the proxy's address and shares one bucket.
+contact_limiter = RateLimiter({'ip': parse_limit(app.config['CONTACT_IP_LIMIT']),
+                               'email': parse_limit(app.config['CONTACT_EMAIL_LIMIT'])})
+metrics.describe('contact_rejected_total', 'counter', 'Contact form posts rejected before validation, by reason')
+
+def screen_submission(form):
+    """Response for a bot or flooding client, or None to go on with the form."""
+    reason = form.spam_reason()
+    if reason is None:
+        try:
+            wait = contact_limiter.hit(ip=request.remote_addr, email=(form.email.data or '').strip().lower()[:254])
+        except sqlite3.Error as e:
+            # Fail open: a broken limiter must not block the form
+            app.logger.error("Rate limiter failed: %s", e)
+            wait = 0
+        if wait:
+            reason = 'rate_limited'
+    if reason is None:
+        return None
+    metrics.inc('contact_rejected_total', reason=reason)
+    app.logger.info("Contact form rejected: %s", reason, extra={'sample': 'contact_rejected'})
+    if reason == 'rate_limited':
+        raise TooManyRequests(retry_after=math.ceil(wait))
+    # Bots get the same redirect as a sent message and learn nothing
+    return redirect(url_for('thank_you', lang=g.lang))
+
+# Language handling: /fi/ and /en/ pick the language explicitly, other URLs
+# negotiate it from the lang cookie or Accept-Language
+LANGUAGE_PREFIX = f"/<any({', '.join(LANGUAGES)}):lang>"
+
+@app.url_value_preprocessor
+def pull_language(endpoint, values):
+    g.lang_explicit = values.pop('lang', None) if values else None
+    g.lang = g.lang_explicit or negotiate_language(request)
+
+@app.url_defaults
+def add_language(endpoint, values):
+    if 'lang' not in values and g.get('lang_explicit') and app.url_map.is_endpoint_expecting(endpoint, 'lang'):
+        values['lang'] = g.lang_explicit
+
+# Static assets: url_for('static', ...) resolves through the build manifest
+# (build_assets.py), and fingerprinted files are cached for a year
+@app.url_defaults
+def fingerprint_static(endpoint, values):
+    if endpoint == 'static' and 'filename' in values:
+        values['filename'] = asset_manifest.resolve(values['filename'])
+
+# Static files are served from precompressed .br/.gz siblings when the
+# build wrote them and the client accepts the encoding
+app.view_functions['static'] = static_file
+
+# Files present at startup are indexed in memory (content-hash ETags,
+# precompressed variants) and answered before Flask routing; the view
+# above only sees files added later. STATIC_INDEX=0 turns this off, e.g.
+# while editing CSS against the development server.
+def static_cache_control(filename):
+    if asset_manifest.is_hashed(filename):
+        return f'public, max-age={ONE_YEAR}, immutable'
+    return 'no-cache'
+
+static_index = None
+if os.getenv('STATIC_INDEX', '1') != '0':
+    static_index = StaticIndex(app.static_folder)
+    app.wsgi_app = StaticMiddleware(app.wsgi_app, static_index, prefix=f'{app.static_url_path}/',
+                                    cache_control=static_cache_control,
+                                    on_serve=lambda method, status, seconds:
+                                        metrics.record_request('static', method, status, seconds))
+
+@app.after_request
+def cache_fingerprinted_assets(response):
+    if request.endpoint == 'static' and response.status_code in (200, 206, 304) \
+            and asset_manifest.is_hashed(request.view_args.get('filename')):
+        response.cache_control.no_cache = False
+        response.cache_control.public = True
+        response.cache_control.max_age = ONE_YEAR
+        response.cache_control.immutable = True
+    return response
+
+@app.context_processor
+def inject_language():
+    lang = g.get('lang', DEFAULT_LANGUAGE)
+    return {'lang': lang, 'other_lang': other_language(lang), '_': translator(lang)}
+
+@app.after_request
+def remember_language(response):
+    if g.get('lang_explicit'):
+        if request.cookies.get(LANGUAGE_COOKIE) != g.lang_explicit:
+            response.set_cookie(LANGUAGE_COOKIE, g.lang_explicit, max_age=365 * 24 * 3600, samesite='Lax')
+    elif request.endpoint in ('home', 'thank_you'):
+        response.vary.update(('Accept-Language', 'Cookie'))
+    return response
+
+@app.after_request
+def compress_html(response):
+    # Cached pages arrive already compressed; this covers the rest
+    if request.endpoint != 'static':
+        compress_response(response)
+    return response
+
+def contact_form():
+    form = ContactForm()
+    _ = translator(g.lang)
+    form.join.choices = [("kyllä", _('form.join_yes')), ("ei", _('form.join_no'))]
+    return form
 
 @app.errorhandler(Exception)
 def handle_exception(e):
-    app.logger.error(f"An error occurred: {e}")
+    # 405s and other HTTP errors from odd clients keep their status and
+    # Werkzeug's short body instead of becoming logged 500 pages
+    if isinstance(e, HTTPException):
+        return e
+    app.logger.exception("Unhandled error: %s", e)
     return render_template('error.html', error=str(e)), 500
 
 @app.route('/', methods=['GET', 'POST'])
+@app.route(f'{LANGUAGE_PREFIX}/', methods=['GET', 'POST'])
 def home():
-    form = ContactForm()
-    if form.validate_on_submit():
+    # Anonymous GETs are served from the rendered page cache
+    if request.method != 'POST':
+        return page_cache.render('index.html', lang=g.lang, context=lambda: {'form': contact_form()})
+
+    form = contact_form()
+    rejected = screen_submission(form)
+    if rejected is not None:
+        return rejected
+    with metrics.timer('validate'):
+        valid = form.validate_on_submit()
+    if valid:
         name = form.name.data
         email = form.email.data
         phone = form.phone.data
@@ -81,37 +305,44 @@ def home():
             return redirect(url_for('home'))"""
 
 
-        # Process the form (e.g., send email)
+        # Process the form (queue the email for the background sender)
         try:
-            msg = Message(f"New Contact Form Submission from {name}",
-                          sender='moi@espoo-israel.fi',
-                          recipients=["info@espoo-israel.fi", "espoo.israel@gmail.com"])
-            msg.body = f"Nimi: {name}\nSähköposti: {email}\nHaluan liittyä jäseneksi: {join}\nOsite: {address}\nPostiosoite: {postal_code}\nPuhelin: {phone}\nHyväksyn ehdot: {accept_policy}\nViestisi: {message}"
-            mail.send(msg)
-            flash("Message sent successfully!")
-            return redirect(url_for('thank_you'))
-        except Exception as e:
-            app.logger.error(f"Email sending failed: {str(e)}")
-            flash("Failed to send message. Please try again later.")
-            return redirect(url_for('home'))
+            mail_queue.put(subject=f"New Contact Form Submission from {name}",
+                           sender='moi@espoo-israel.fi',
+                           recipients=["info@espoo-israel.fi", "espoo.israel@gmail.com"],
+                           submitter=email,
+                           body=f"Nimi: {name}\nSähköposti: {email}\nHaluan liittyä jäseneksi: {join}\nOsite: {address}\nPostiosoite: {postal_code}\nPuhelin: {phone}\nHyväksyn ehdot: {accept_policy}\nViestisi: {message}")
+            mail_sender.notify()
+            flash(translator(g.lang)('flash.sent'))
+            return redirect(url_for('thank_you', lang=g.lang))
+        except sqlite3.Error as e:
+            app.logger.error("Queueing email failed: %s", e)
+            flash(translator(g.lang)('flash.failed'))
+            return redirect(url_for('home', lang=g.lang))
 
     return render_template('index.html', form=form)
 
 @app.errorhandler(404)
 def page_not_found(e):
-    app.logger.error(f"404 Error: {e}")
-    return render_template('404.html'), 404
+    # Mostly bots probing for paths; sampled so they cannot flood the log
+    app.logger.info("404 Not Found", extra={'sample': '404'})
+    return page_cache.render('404.html', status=404)
 
 @app.errorhandler(500)
 def internal_error(e):
-    app.logger.error(f"500 Error: {e}")
-    return render_template('500.html'), 500
+    app.logger.error("500 Internal Server Error: %s", e)
+    return page_cache.render('500.html', status=500)
 
 
 
 @app.route('/thank_you')  # Match the route name with the redirect
+@app.route(f'{LANGUAGE_PREFIX}/thank_you')
 def thank_you():
-    return render_template('kiitos.html')
+    return page_cache.render('kiitos.html', lang=g.lang)
+
+@app.route('/videos/<path:filename>')
+def video(filename):
+    return hero_videos.response(filename)
 
 @app.route('/debug_video')
 def debug_video():
@@ -121,6 +352,61 @@ def debug_video():
 def video_test():
     return render_template('video_test.html')
 
+def public_pages():
+    """``(lang, template, context)`` of every page the page cache serves."""
+    pages = [(lang, template, context) for lang in LANGUAGES
+             for template, context in (('index.html', lambda: {'form': contact_form()}), ('kiitos.html', dict))]
+    return pages + [(None, '404.html', dict), (None, '500.html', dict)]
+
+
+@contextmanager
+def page_request(lang):
+    """Request context for rendering a page of ``lang`` outside of a request."""
+    with app.test_request_context(f'/{lang}/' if lang else '/'):
+        if lang:
+            g.lang = g.lang_explicit = lang
+        yield
+
+
+def render_pages():
+    """The HTML of every public page, as ``{template: [html, ...]}`` with one per language.
+
+    The CSS build steps purge against this: the template source lacks the
+    markup of the form widgets and the macros.
+    """
+    pages = {}
+    with metrics.paused():
+        for lang, template, context in public_pages():
+            with page_request(lang):
+                pages.setdefault(template, []).append(render_template(template, **context()))
+    return pages
+
+
+def warm_up():
+    """Compile all templates and fill the page cache in every language and encoding.
+
+    Called by gunicorn.conf.py in each worker before it takes requests;
+    returns the timings of the startup-time report.
+    """
+    started = time.perf_counter()
+    imported = import_modules(DEFERRED_IMPORTS)
+    if static_index is not None:
+        timed(imported, 'static index', static_index.build)
+    compiled = compile_templates(app.jinja_env)
+    rendered = {}
+    # Warm-up renders are not visitor traffic. Left in, /metrics would count
+    # the master's once per forked worker
+    hits, misses = page_cache.hits, page_cache.misses
+    with metrics.paused():
+        for lang, template, context in public_pages():
+            with page_request(lang):
+                timed(rendered, f'{template} ({lang})' if lang else template,
+                      lambda: [page_cache.get(template, lang, context, encoding) for encoding in (None,) + ENCODINGS])
+    page_cache.hits, page_cache.misses = hits, misses
+    total = time.perf_counter() - started
+    report(imported, compiled, rendered, total)
+    return {'imported': imported, 'compiled': compiled, 'rendered': rendered, 'total': total}
+
 # Enable debug mode for testing
 if __name__ == "__main__": 
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,207 @@
+"""Non-blocking JSON logging for the app and its background threads.
+
+Log calls only put the record on an in-memory queue; a QueueListener
+thread in each worker formats it as one JSON object per line into a
+size-capped rotating file, and copies warnings and errors to stderr
+where gunicorn and the container runtime pick them up. When the queue
+is full, records are dropped rather than blocking the request, and the
+next record that fits says how many were lost.
+
+Every request gets an ID (a sane incoming X-Request-ID or a new one),
+returned in the X-Request-ID response header and added to each record
+logged while the request is handled. Records logged with
+``extra={'sample': key}`` (404s from bots, mostly) are rate limited per
+key; the next one that gets through carries the number suppressed.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask import g, has_request_context, request
+
+QUEUE_SIZE = 10000
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 3
+REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+# Attributes every LogRecord has; anything else came in through extra=
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+class JSONFormatter(logging.Formatter):
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RequestContextFilter(logging.Filter):
+    """Adds the request ID, method and path while a request is handled."""
+
+    def filter(self, record):
+        if has_request_context() and 'request_id' in g:
+            record.request_id = g.request_id
+            record.method = request.method
+            record.path = request.path
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Lets through ``burst`` records per sample key and ``interval`` seconds."""
+
+    def __init__(self, burst=10, interval=60):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = getattr(record, 'sample', None)
+        if key is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            started, passed, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - started >= self.interval:
+                started, passed = now, 0
+            if passed >= self.burst:
+                self._windows[key] = (started, passed, suppressed + 1)
+                return False
+            self._windows[key] = (started, passed + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Never blocks: records that do not fit in the queue are counted and dropped."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Keep extra attributes for the JSON formatter; only flatten the
+        # message and traceback so the record no longer needs its args
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        dropped = self.dropped
+        if dropped:
+            record.dropped = dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        else:
+            self.dropped -= dropped
+
+
+class SharedRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler for several worker processes writing one file.
+
+    When another worker has rotated the file, the stream is reopened
+    instead of writing on into the renamed backup.
+    """
+
+    def emit(self, record):
+        if self.stream is not None:
+            try:
+                rotated = os.stat(self.baseFilename).st_ino != os.fstat(self.stream.fileno()).st_ino
+            except OSError:
+                rotated = True
+            if rotated:
+                self.stream.close()
+                self.stream = self._open()
+        super().emit(record)
+
+
+class LogListener(QueueListener):
+
+    def stop(self):
+        if self._thread is not None and self._thread.is_alive():
+            super().stop()
+
+    def ensure_running(self):
+        # A thread started before gunicorn forked does not exist in the worker
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = None
+            self.start()
+
+    def after_fork(self, handler):
+        # The parent's listener may have held the queue's lock while forking;
+        # the child gets a fresh queue and its own listener thread
+        running = self._thread is not None
+        handler.queue = self.queue = queue.Queue(QUEUE_SIZE)
+        self._thread = None
+        if running:
+            self.start()
+
+
+def setup_logging(app, path=None, level=None, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT):
+    """Route the root logger through a queue to the JSON file and stderr."""
+    path = path or os.environ.get('LOG_FILE', 'app.log')
+    level = level or os.environ.get('LOG_LEVEL', 'INFO')
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    file_handler = SharedRotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                             encoding='utf-8', delay=True)
+    file_handler.setFormatter(JSONFormatter())
+    error_handler = logging.StreamHandler(sys.stderr)
+    error_handler.setLevel(logging.WARNING)
+    error_handler.setFormatter(JSONFormatter())
+
+    queue_handler = DroppingQueueHandler(queue.Queue(QUEUE_SIZE))
+    queue_handler.addFilter(RequestContextFilter())
+    queue_handler.addFilter(SamplingFilter())
+    listener = LogListener(queue_handler.queue, file_handler, error_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in [h for h in root.handlers if isinstance(h, DroppingQueueHandler)]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    listener.ensure_running()
+    atexit.register(listener.stop)
+    os.register_at_fork(after_in_child=lambda: listener.after_fork(queue_handler))
+
+    @app.before_request
+    def assign_request_id():
+        listener.ensure_running()
+        incoming = request.headers.get('X-Request-ID', '')
+        g.request_id = incoming if REQUEST_ID.match(incoming) else uuid.uuid4().hex
+
+    @app.after_request
+    def return_request_id(response):
+        if 'request_id' in g:
+            response.headers['X-Request-ID'] = g.request_id
+        return response
+
+    app.extensions['logging'] = {'handler': queue_handler, 'listener': listener}
+    return listener
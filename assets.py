@@ -0,0 +1,226 @@
+"""Runtime side of the static asset pipelines.
+
+``AssetManifest`` maps logical static filenames such as ``style.css`` to the
+fingerprinted output of build_assets.py, ``VendorManifest`` lists the
+third-party files self-hosted by vendor_assets.py, ``CriticalCSS`` holds the
+first-screen CSS extracted by critical_css.py and ``ImageManifest``
+describes the resized derivatives written by build_images.py. Without a
+manifest, e.g. in development before running the builds, every name
+resolves to the original file, third-party files come from their CDNs,
+style.css is linked as a blocking stylesheet and images render as plain
+``<img>`` tags.
+"""
+import json
+import os
+import threading
+
+from flask import url_for
+from markupsafe import Markup, escape
+
+ONE_YEAR = 365 * 24 * 3600
+
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg', 'png': 'image/png'}
+
+
+class JSONManifest:
+    """A JSON build manifest that is reloaded when the file changes."""
+
+    def __init__(self, path):
+        self.path = path
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._load({})
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            data = {}
+            if mtime is not None:
+                try:
+                    with open(self.path, encoding='utf-8') as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    data = {}
+            self._load(data)
+            self._mtime = mtime
+
+    def _load(self, data):
+        self.data = data
+
+    @property
+    def version(self):
+        """Changes whenever the manifest is rebuilt (used as a cache key)."""
+        self._refresh()
+        return self._mtime
+
+
+class AssetManifest(JSONManifest):
+
+    def _load(self, data):
+        self.data = data
+        self._hashed = frozenset(data.values())
+
+    def resolve(self, filename):
+        self._refresh()
+        return self.data.get(filename, filename)
+
+    def is_hashed(self, filename):
+        self._refresh()
+        return filename in self._hashed
+
+
+class VendorManifest(JSONManifest):
+    """Third-party files self-hosted by vendor_assets.py."""
+
+    def get(self, name):
+        """Static path of the vendored ``name``, or None to use the CDN."""
+        self._refresh()
+        return self.data.get(name)
+
+    def preload(self):
+        self._refresh()
+        return self.data.get('preload', [])
+
+
+class CriticalCSS(JSONManifest):
+    """Inlined first-screen CSS per template and the purged style.css (critical_css.py)."""
+
+    def __init__(self, path, static_folder, assets):
+        self.static_folder = static_folder
+        self.assets = assets
+        self._inline = {}
+        super().__init__(path)
+
+    def _load(self, data):
+        self.data = data
+        self._inline = {}
+
+    def inline(self, template):
+        """The critical CSS of ``template``, or None if it has not been built."""
+        self._refresh()
+        name = self.data.get('templates', {}).get(template)
+        if name is None:
+            return None
+        # Through the asset manifest, so the minified build is inlined
+        path = self.assets.resolve(name)
+        css = self._inline.get(path)
+        if css is None:
+            try:
+                with open(os.path.join(self.static_folder, path), encoding='utf-8') as f:
+                    css = f.read().strip().replace('</', '<\\/')
+            except OSError:
+                return None
+            self._inline[path] = css
+        return css
+
+    def stylesheet(self, template):
+        """Render the tags loading style.css into ``template``.
+
+        With a build, the critical CSS is inlined and the purged stylesheet
+        is preloaded and applied once it arrives (``<noscript>`` links it
+        for browsers without JS); otherwise style.css blocks rendering.
+        """
+        css = self.inline(template)
+        if css is None:
+            return Markup(f'<link rel="stylesheet" href="{url_for("static", filename="style.css")}">')
+        href = url_for('static', filename=self.data['stylesheet'])
+        onload = "this.onload=null;this.rel='stylesheet'"
+        return Markup(f'<style>{css}</style>\n'
+                      f'<link rel="preload" href="{href}" as="style" onload="{onload}">\n'
+                      f'<noscript><link rel="stylesheet" href="{href}"></noscript>')
+
+
+def _attributes(attrs):
+    parts = []
+    for name, value in attrs.items():
+        name = name.rstrip('_').replace('_', '-')
+        if value is None or value is False:
+            continue
+        if value is True:
+            parts.append(name)
+        else:
+            parts.append(f'{name}="{escape(value)}"')
+    return ' '.join(parts)
+
+
+def _srcset(variants):
+    return ', '.join(f"{url_for('static', filename=v['file'])} {v['width']}w" for v in variants)
+
+
+class ImageManifest(JSONManifest):
+
+    def get(self, filename):
+        self._refresh()
+        return self.data.get(filename)
+
+    def url(self, filename, width=960):
+        """URL of the fallback-format variant closest above ``width`` pixels."""
+        entry = self.get(filename)
+        if entry is None:
+            return url_for('static', filename=filename)
+        fallback = entry['variants'][entry['fallback']]
+        variant = next((v for v in fallback if v['width'] >= width), fallback[-1])
+        return url_for('static', filename=variant['file'])
+
+    def picture(self, filename, alt, sizes='100vw', width=None, height=None, **attrs):
+        """Render ``<picture>`` with AVIF/WebP sources and a srcset fallback.
+
+        ``width``/``height`` are the rendered size in CSS pixels; when only
+        one is given the other follows the image's aspect ratio, and when
+        neither is given the intrinsic size is used so the browser can
+        reserve space before the image loads.
+        """
+        entry = self.get(filename)
+        if entry is not None:
+            if width is None and height is None:
+                width, height = entry['width'], entry['height']
+            elif width is None:
+                width = round(float(height) * entry['width'] / entry['height'])
+            elif height is None:
+                height = round(float(width) * entry['height'] / entry['width'])
+        img = {'alt': alt, 'width': width, 'height': height}
+        if entry is None:
+            img['src'] = url_for('static', filename=filename)
+            img.update(attrs)
+            return Markup(f'<img {_attributes(img)}>')
+
+        fallback = entry['variants'][entry['fallback']]
+        img.update(src=self.url(filename), srcset=_srcset(fallback), sizes=sizes)
+        img.setdefault('decoding', 'async')
+        img.update(attrs)
+        sources = [
+            f'<source type="{MIME_TYPES[fmt]}" srcset="{_srcset(variants)}" sizes="{escape(sizes)}">'
+            for fmt, variants in entry['variants'].items() if fmt != entry['fallback']
+        ]
+        return Markup('<picture>' + ''.join(sources) + f'<img {_attributes(img)}></picture>')
+
+    def background(self, filename, selector):
+        """Render a ``<style>`` block picking a background size per viewport.
+
+        Breakpoints assume a 2x display: a variant is used once the viewport
+        is at least half its pixel width. image-set() lets browsers that
+        support it pick AVIF or WebP.
+        """
+        entry = self.get(filename)
+        if entry is None:
+            return Markup('')
+        fallback = entry['variants'][entry['fallback']]
+        rules = []
+        for i, variant in enumerate(fallback):
+            candidates = [
+                (fmt, variants[i]) for fmt, variants in entry['variants'].items() if i < len(variants)
+            ]
+            image_set = ', '.join(
+                f"url({url_for('static', filename=v['file'])}) type(\"{MIME_TYPES[fmt]}\")" for fmt, v in candidates
+            )
+            rule = (f"{selector}{{background-image:url({url_for('static', filename=variant['file'])});"
+                    f"background-image:image-set({image_set})}}")
+            if i:
+                rule = f"@media (min-width: {fallback[i - 1]['width'] // 2 + 1}px){{{rule}}}"
+            rules.append(rule)
+        return Markup('<style>' + ''.join(rules) + '</style>')
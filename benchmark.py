@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for the site with regression thresholds.
+
+Boots app:app under gunicorn (or uses --url), with the mail queue pointed
+at an in-process dev_smtp server and the contact form rate limits turned
+off (against --url, form_post runs into them). It then drives each
+scenario at rising concurrency for a fixed time and reports requests per
+second, p50/p95/p99 latency and the error rate. Results can be saved as a JSON baseline; a
+later run fails if requests per second drop or p95 latency grows by more
+than --threshold, or if the error rate rises at all.
+
+Workers, threads and the worker class default to what gunicorn.conf.py
+picks for this machine. --modes runs everything once per worker class
+and prints a requests per second comparison.
+
+benchmark_baseline.json was recorded with the settings of the --check
+command below (--duration 5, on one CPU). CI runs that command on its own
+runner, so only a coarse threshold means anything there: it catches a
+route getting several times slower, not a few percent.
+
+    python benchmark.py --save-baseline
+    python benchmark.py --check --workers 2 --concurrency 8 --duration 3 --threshold 0.75
+    python benchmark.py --workers 4 --concurrency 1,8,32
+    python benchmark.py --modes sync,gthread,gevent
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from dev_smtp import DevSMTPServer
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(ROOT, 'benchmark_baseline.json')
+VIDEO = '/videos/hero-video-mobile.mp4'
+RANGE_SIZE = 64 * 1024
+
+CONTACT = {
+    'name': 'Benchmark', 'address': 'Testikatu 1', 'postal_code': '02100', 'city': 'Espoo',
+    'email': 'benchmark@example.com', 'phone': '0401234567', 'join': 'ei',
+    'message': 'Kuormitustesti', 'accept_policy': 'y', 'fill_time': '10',
+}
+
+
+# Each scenario returns (method, path, body, headers, expected statuses)
+def home():
+    return 'GET', '/', None, {'Accept-Encoding': 'gzip, br'}, (200,)
+
+
+def static():
+    path = random.choice(('/static/style.css', '/static/script.js'))
+    return 'GET', path, None, {'Accept-Encoding': 'gzip, br'}, (200,)
+
+
+def video_range():
+    start = random.randrange(0, 800_000)
+    return 'GET', VIDEO, None, {'Range': f'bytes={start}-{start + RANGE_SIZE - 1}'}, (206,)
+
+
+def form_post():
+    body = urllib.parse.urlencode(CONTACT)
+    return 'POST', '/fi/', body, {'Content-Type': 'application/x-www-form-urlencoded'}, (302,)
+
+
+SCENARIOS = {'home': home, 'static': static, 'video_range': video_range, 'form_post': form_post}
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of already sorted ``values``."""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))
+    return values[index]
+
+
+def run_level(host, port, scenario, concurrency, duration):
+    latencies = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+    deadline = time.perf_counter() + duration
+
+    def worker(i):
+        while time.perf_counter() < deadline:
+            method, path, body, headers, expected = scenario()
+            started = time.perf_counter()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            try:
+                conn.request(method, path, body, headers)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status in expected
+            except (OSError, http.client.HTTPException):
+                ok = False
+            finally:
+                conn.close()
+            latencies[i].append(time.perf_counter() - started)
+            if not ok:
+                errors[i] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    values = sorted(latency for per_thread in latencies for latency in per_thread)
+    return {
+        'requests': len(values),
+        'rps': round(len(values) / elapsed, 1),
+        'p50_ms': round(percentile(values, 50) * 1000, 2),
+        'p95_ms': round(percentile(values, 95) * 1000, 2),
+        'p99_ms': round(percentile(values, 99) * 1000, 2),
+        'error_rate': round(sum(errors) / len(values), 6) if values else 1.0,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Return a description of every result that regressed against ``baseline``."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result['rps'] < base['rps'] * (1 - threshold):
+            regressions.append(f"{key}: {result['rps']} rps, baseline {base['rps']}")
+        if result['p95_ms'] > base['p95_ms'] * (1 + threshold):
+            regressions.append(f"{key}: p95 {result['p95_ms']} ms, baseline {base['p95_ms']}")
+        # Any error beyond the baseline's: a few dropped requests are a bug, not noise
+        if result['error_rate'] > base['error_rate']:
+            regressions.append(f"{key}: error rate {result['error_rate']}, baseline {base['error_rate']}")
+    return regressions
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(host, port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def start_gunicorn(port, smtp_port, workdir, args, worker_class=None):
+    # Everything the server writes goes to the temporary workdir, not the
+    # repository or the metrics and rate limits of a server running here
+    env = dict(os.environ, MAIL_SERVER='127.0.0.1', MAIL_PORT=str(smtp_port), MAIL_USE_SSL='false',
+               EMAIL_PASSWORD='benchmark', MAIL_QUEUE_PATH=os.path.join(workdir, 'mail_queue.db'),
+               LOG_FILE=os.path.join(workdir, 'app.log'), METRICS_DIR=os.path.join(workdir, 'metrics'),
+               RATE_LIMIT_PATH=os.path.join(workdir, 'rate_limit.db'),
+               JINJA_CACHE_DIR=os.path.join(workdir, 'jinja-cache'),
+               CONTACT_IP_LIMIT='0', CONTACT_EMAIL_LIMIT='0')
+    # gunicorn.conf.py reads the worker class from the environment, so that
+    # it can monkey-patch for gevent before the app is imported
+    if worker_class:
+        env['GUNICORN_WORKER_CLASS'] = worker_class
+    command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--log-level', 'warning']
+    if args.workers:
+        command += ['--workers', str(args.workers)]
+    if args.threads:
+        command += ['--threads', str(args.threads)]
+    return subprocess.Popen(command + ['app:app'], cwd=ROOT, env=env)
+
+
+def run_scenarios(host, port, scenarios, levels, duration, prefix=''):
+    results = {}
+    wait_until_up(host, port)
+    for name in scenarios:
+        for _ in range(20):
+            method, path, body, headers, _expected = SCENARIOS[name]()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            conn.request(method, path, body, headers)
+            conn.getresponse().read()
+            conn.close()
+        for level in levels:
+            result = run_level(host, port, SCENARIOS[name], level, duration)
+            results[f'{prefix}{name}@{level}'] = result
+            print(f"   {name:<12} c={level:<3} {result['rps']:>8} rps  p50 {result['p50_ms']:>7} ms  "
+                  f"p95 {result['p95_ms']:>7} ms  p99 {result['p99_ms']:>7} ms  errors {result['error_rate']:.2%}")
+    return results
+
+
+def print_comparison(results, modes):
+    """Table of requests per second, one column per worker class."""
+    keys = list(dict.fromkeys(key.split('/', 1)[1] for key in results))
+    print(f"   {'':<18}" + ''.join(f'{mode:>12}' for mode in modes))
+    for key in keys:
+        print(f"   {key:<18}" + ''.join(f"{results.get(f'{mode}/{key}', {}).get('rps', '-'):>12}" for mode in modes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='benchmark a running server instead of starting gunicorn')
+    parser.add_argument('--workers', type=int, help='default: sized by gunicorn.conf.py')
+    parser.add_argument('--threads', type=int, help='default: gunicorn.conf.py (gthread only)')
+    parser.add_argument('--worker-class', help='sync, gthread or gevent (default: gunicorn.conf.py)')
+    parser.add_argument('--modes', help='compare these comma separated worker classes')
+    parser.add_argument('--concurrency', default='1,4,16', help='comma separated levels')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per scenario and level')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative regression')
+    parser.add_argument('--check', action='store_true',
+                        help='also fail without a baseline or if this run lacks some of its results')
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(',')]
+    scenarios = args.scenarios.split(',')
+    modes = args.modes.split(',') if args.modes else [args.worker_class]
+    smtp = None
+    workdir = tempfile.mkdtemp(prefix='benchmark-')
+    results = {}
+    try:
+        if args.url:
+            parsed = urllib.parse.urlparse(args.url)
+            print(f"🏁 Benchmarking {args.url}")
+            results = run_scenarios(parsed.hostname, parsed.port or 80, scenarios, levels, args.duration)
+        else:
+            smtp = DevSMTPServer(port=0, quiet=True)
+            smtp.start()
+        for mode in modes if not args.url else ():
+            port = free_port()
+            server = start_gunicorn(port, smtp.port, workdir, args, mode)
+            print(f"🏁 Benchmarking http://127.0.0.1:{port} ({args.workers or 'auto'} x {mode or 'default'} "
+                  f"workers, {args.threads or 'default'} threads)")
+            try:
+                results.update(run_scenarios('127.0.0.1', port, scenarios, levels, args.duration,
+                                             prefix=f'{mode}/' if args.modes else ''))
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+        if args.modes and not args.url:
+            print("📊 Requests per second by worker class")
+            print_comparison(results, modes)
+    finally:
+        if smtp:
+            print(f"   📧 dev SMTP received {len(smtp.messages)} message(s) over {smtp.connections} connection(s)")
+            smtp.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"   💾 Baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        if args.check:
+            print(f"   ❌ No baseline at {args.baseline}")
+            return 1
+        print("   ℹ️  No baseline to compare against (use --save-baseline)")
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if args.check:
+        # Otherwise a run with other levels or scenarios passes by comparing nothing
+        regressions += [f"{key}: in the baseline but not run" for key in sorted(set(baseline) - set(results))]
+    for regression in regressions:
+        print(f"   ❌ {regression}")
+    if regressions:
+        return 1
+    print(f"   ✅ No regressions beyond {args.threshold:.0%} of the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
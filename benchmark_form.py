@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark of ContactForm.validate(), the synchronous part of a POST.
+
+Validates a filled-in form repeatedly inside a request context and
+reports the mean, p50 and p99 time per call. Every DNS query made during
+validation is counted; with --slow-dns each one also sleeps and then
+times out, as it would with an unreachable resolver. The run fails if
+validation touched DNS or p99 exceeds --max-p99-ms.
+
+    python benchmark_form.py
+    python benchmark_form.py --iterations 5000 --slow-dns 2
+"""
+import argparse
+import json
+import socket
+import sys
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+import dns.exception
+import dns.resolver
+from flask import Flask
+
+from benchmark import percentile
+from contact_form import ContactForm
+
+FORM = {
+    'name': 'Benchmark', 'address': 'Testikatu 1', 'postal_code': '02100', 'city': 'Espoo',
+    'email': 'benchmark@example.fi', 'phone': '0401234567', 'join': 'ei',
+    'message': 'Mikrobenchmark', 'accept_policy': 'y', 'fill_time': '10',
+}
+
+
+@contextmanager
+def watch_dns(delay=0.0):
+    """Count (and optionally slow down and fail) DNS lookups in the block."""
+    calls = []
+
+    def resolve(*args, **kwargs):
+        calls.append(args[1] if len(args) > 1 else args)
+        time.sleep(delay)
+        raise dns.exception.Timeout()
+
+    def getaddrinfo(*args, **kwargs):
+        calls.append(args[0])
+        time.sleep(delay)
+        raise socket.gaierror(socket.EAI_AGAIN, 'Temporary failure in name resolution')
+
+    with mock.patch.object(dns.resolver.Resolver, 'resolve', resolve), \
+            mock.patch.object(socket, 'getaddrinfo', getaddrinfo):
+        yield calls
+
+
+def run(iterations=2000, data=FORM, slow_dns=0.0):
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='benchmark', WTF_CSRF_ENABLED=False)
+    timings = []
+    with watch_dns(slow_dns) as calls, app.test_request_context('/', method='POST', data=data):
+        for _ in range(iterations):
+            started = time.perf_counter()
+            valid = ContactForm().validate()
+            timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        'valid': valid,
+        'iterations': iterations,
+        'mean_us': round(sum(timings) / len(timings) * 1e6, 1),
+        'p50_us': round(percentile(timings, 50) * 1e6, 1),
+        'p99_us': round(percentile(timings, 99) * 1e6, 1),
+        'dns_lookups': len(calls),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--slow-dns', type=float, default=0.0, help='seconds each DNS lookup takes before failing')
+    parser.add_argument('--max-p99-ms', type=float, default=5.0)
+    parser.add_argument('--json', action='store_true', help='print the result as JSON')
+    args = parser.parse_args()
+
+    result = run(args.iterations, slow_dns=args.slow_dns)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"ContactForm.validate() x {result['iterations']}: mean {result['mean_us']} µs, "
+              f"p50 {result['p50_us']} µs, p99 {result['p99_us']} µs, "
+              f"valid={result['valid']}, DNS lookups {result['dns_lookups']}")
+    failures = []
+    if not result['valid']:
+        failures.append('the sample form did not validate')
+    if result['dns_lookups']:
+        failures.append(f"validation made {result['dns_lookups']} DNS lookup(s)")
+    if result['p99_us'] > args.max_p99_ms * 1000:
+        failures.append(f"p99 {result['p99_us']} µs is over {args.max_p99_ms} ms")
+    for failure in failures:
+        print(f'FAIL: {failure}')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Build step for static CSS/JS: minify, fingerprint and write a manifest.
+
+Each asset is written to static/dist/<name>.<hash>.<ext> and recorded in
+static/dist/manifest.json. The app resolves url_for('static', ...) through
+the manifest and serves the fingerprinted files with a one year immutable
+Cache-Control, so a deploy never leaves browsers with stale CSS or JS.
+The vendored fonts are named by their content already and are listed as
+they are.
+Every built file also gets .br and .gz siblings that the app serves to
+clients accepting those encodings.
+
+    python build_assets.py
+"""
+import argparse
+import hashlib
+import json
+import os
+import posixpath
+import re
+
+from compression import remove_precompressed, write_precompressed
+from css_tools import minify_css, rebase_css_urls, split_strings
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+ASSETS = ['style.css', 'script.js']
+# Written by vendor_assets.py; built when present
+VENDOR_ASSETS = ['vendor/vendor.css', 'vendor/bootstrap.bundle.min.js']
+# Written by critical_css.py: the purged style.css and the CSS inlined per page
+CRITICAL_DIR = 'critical'
+# Written by vendor_assets.py with a content hash in the name already (the
+# subset fonts); listed under their own name so they are served as immutable
+PREHASHED_DIRS = ['vendor/fonts']
+
+# Strings and comments, in the order a tokenizer would meet them
+_JS_TOKENS = re.compile(
+    r'("(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|`(?:\\.|[^`\\])*`)|(/\*.*?\*/)|((?<![:\\])//[^\n]*)', re.S)
+
+
+def minify_js(source):
+    """Conservative JS minifier: drops comments and indentation only.
+
+    Newlines are kept so automatic semicolon insertion behaves exactly as
+    in the original file.
+    """
+    out = []
+    for is_string, chunk in split_strings(source, _JS_TOKENS):
+        if is_string:
+            out.append(chunk)
+            continue
+        chunk = re.sub(r'[ \t]*\n\s*', '\n', chunk)
+        chunk = re.sub(r'[ \t]+', ' ', chunk)
+        out.append(chunk)
+    return ''.join(out).strip() + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def fingerprint(name, content):
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    root, ext = posixpath.splitext(posixpath.basename(name))
+    return posixpath.join(DIST_DIR, posixpath.dirname(name), f'{root}.{digest}{ext}')
+
+
+def build(static_dir=STATIC_DIR, assets=None):
+    """Build all ``assets`` into ``static_dir``/dist and return the manifest."""
+    if assets is None:
+        assets = ASSETS + [name for name in VENDOR_ASSETS if os.path.exists(os.path.join(static_dir, name))]
+        if os.path.isdir(os.path.join(static_dir, CRITICAL_DIR)):
+            assets += sorted(posixpath.join(CRITICAL_DIR, name)
+                             for name in os.listdir(os.path.join(static_dir, CRITICAL_DIR)) if name.endswith('.css'))
+    dist = os.path.join(static_dir, DIST_DIR)
+    os.makedirs(dist, exist_ok=True)
+    manifest_path = os.path.join(dist, MANIFEST)
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    # Also drops the fonts of an earlier vendor build
+    for directory in PREHASHED_DIRS:
+        for name in [name for name in manifest if posixpath.dirname(name) == directory]:
+            del manifest[name]
+        if os.path.isdir(os.path.join(static_dir, directory)):
+            for name in os.listdir(os.path.join(static_dir, directory)):
+                manifest[posixpath.join(directory, name)] = posixpath.join(directory, name)
+
+    report = []
+    for name in assets:
+        with open(os.path.join(static_dir, name), encoding='utf-8') as f:
+            source = f.read()
+        ext = posixpath.splitext(name)[1]
+        # Already minified upstream; the conservative minifiers gain nothing there
+        minify = MINIFIERS.get(ext) if '.min.' not in name else None
+        minified = minify(source) if minify else source
+        content = minified.encode('utf-8')
+        target = fingerprint(name, content)
+        if ext == '.css':
+            content = rebase_css_urls(minified, name, target).encode('utf-8')
+
+        old = manifest.get(name)
+        if old and old != target and os.path.exists(os.path.join(static_dir, old)):
+            os.remove(os.path.join(static_dir, old))
+            remove_precompressed(os.path.join(static_dir, old))
+        os.makedirs(os.path.dirname(os.path.join(static_dir, target)), exist_ok=True)
+        with open(os.path.join(static_dir, target), 'wb') as f:
+            f.write(content)
+        compressed = write_precompressed(os.path.join(static_dir, target))
+        manifest[name] = target
+        report.append((name, target, len(source.encode('utf-8')), len(content), compressed))
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return manifest, report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--static-dir', default=STATIC_DIR)
+    args = parser.parse_args()
+
+    print("📦 Building static assets")
+    _, report = build(args.static_dir)
+    for name, target, before, after, compressed in report:
+        encoded = ', '.join(f"{encoding} {size}" for encoding, size in compressed.items())
+        print(f"   ✅ {name} -> {target} ({before} -> {after} bytes, -{100 - after * 100 // before}%; {encoded})")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Offline image pipeline: resized AVIF/WebP/JPEG derivatives for static/images.
+
+Every source image gets a ladder of widths in each format, written to
+static/images/derived/ together with manifest.json. The picture() and
+responsive_background() template helpers read the manifest to emit
+<picture>/srcset markup, so phones download a few dozen kilobytes instead
+of the multi-megabyte originals. Requires Pillow (build time only).
+
+    python build_images.py
+"""
+import argparse
+import json
+import os
+import posixpath
+import time
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+SOURCE_DIR = 'images'
+DERIVED_DIR = 'images/derived'
+MANIFEST = 'manifest.json'
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+WIDTHS = [320, 640, 960, 1280, 1920]
+# Images rendered at a fixed size only need 1x/2x/3x renditions
+WIDTHS_BY_IMAGE = {
+    'images/logo.webp': [64, 128, 192],
+}
+# Encoder settings per format, in <source> order (most efficient first)
+FORMATS = {
+    'avif': {'quality': 50},
+    'webp': {'quality': 75, 'method': 6},
+    'jpeg': {'quality': 80, 'optimize': True, 'progressive': True},
+    'png': {'optimize': True},
+}
+EXTENSIONS = {'avif': 'avif', 'webp': 'webp', 'jpeg': 'jpg', 'png': 'png'}
+
+
+def find_sources(static_dir):
+    sources = []
+    for name in sorted(os.listdir(os.path.join(static_dir, SOURCE_DIR))):
+        if name.lower().endswith(SOURCE_EXTENSIONS):
+            sources.append(posixpath.join(SOURCE_DIR, name))
+    return sources
+
+
+def formats_for(image, available):
+    """Modern formats plus a universally supported fallback (PNG keeps alpha)."""
+    fallback = 'png' if image.mode in ('RGBA', 'LA', 'P') else 'jpeg'
+    return [fmt for fmt in ('avif', 'webp') if fmt in available] + [fallback]
+
+
+def available_formats():
+    from PIL import features
+    formats = {'jpeg', 'png'}
+    for fmt in ('webp', 'avif'):
+        if features.check(fmt):
+            formats.add(fmt)
+    return formats
+
+
+def build_image(static_dir, name, available, force=False):
+    from PIL import Image, ImageOps
+
+    source_path = os.path.join(static_dir, name)
+    source_mtime = os.path.getmtime(source_path)
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        image.load()
+    width, height = image.size
+
+    ladder = [w for w in WIDTHS_BY_IMAGE.get(name, WIDTHS) if w < width] or [width]
+    if name not in WIDTHS_BY_IMAGE and width <= WIDTHS[-1] and width not in ladder:
+        ladder.append(width)
+    formats = formats_for(image, available)
+
+    # One directory per source so hero.jpg and hero.webp don't collide
+    target_dir = posixpath.join(DERIVED_DIR, posixpath.basename(name))
+    os.makedirs(os.path.join(static_dir, target_dir), exist_ok=True)
+    entry = {'width': width, 'height': height, 'fallback': formats[-1], 'variants': {}}
+    for fmt in formats:
+        variants = []
+        for target_width in ladder:
+            target_height = round(height * target_width / width)
+            file = posixpath.join(target_dir, f'{target_width}.{EXTENSIONS[fmt]}')
+            path = os.path.join(static_dir, file)
+            if force or not os.path.exists(path) or os.path.getmtime(path) < source_mtime:
+                resized = image.resize((target_width, target_height), Image.LANCZOS)
+                if fmt == 'jpeg' and resized.mode != 'RGB':
+                    resized = resized.convert('RGB')
+                resized.save(path, fmt.upper(), **FORMATS[fmt])
+            variants.append({'width': target_width, 'height': target_height, 'file': file,
+                             'bytes': os.path.getsize(path)})
+        entry['variants'][fmt] = variants
+    return entry
+
+
+def build(static_dir=STATIC_DIR, sources=None, force=False):
+    """Build derivatives for ``sources`` (default: all images) and update the manifest."""
+    os.makedirs(os.path.join(static_dir, DERIVED_DIR), exist_ok=True)
+    manifest_path = os.path.join(static_dir, DERIVED_DIR, MANIFEST)
+    manifest = {}
+    if sources:
+        try:
+            with open(manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            pass
+    available = available_formats()
+    for name in sources or find_sources(static_dir):
+        manifest[name] = build_image(static_dir, name, available, force)
+    # Key order matters: variants are listed most efficient format first
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(sorted(manifest.items())), f, indent=2)
+        f.write('\n')
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--static-dir', default=STATIC_DIR)
+    parser.add_argument('--force', action='store_true', help='re-encode even if derivatives are up to date')
+    parser.add_argument('images', nargs='*', help='static-relative paths, default: everything in static/images')
+    args = parser.parse_args()
+
+    print("🖼️  Building responsive image derivatives")
+    started = time.time()
+    manifest = build(args.static_dir, args.images or None, args.force)
+    for name, entry in manifest.items():
+        if args.images and name not in args.images:
+            continue
+        original = os.path.getsize(os.path.join(args.static_dir, name))
+        smallest = min(v['bytes'] for variants in entry['variants'].values() for v in variants)
+        formats = ', '.join(entry['variants'])
+        print(f"   ✅ {name} ({entry['width']}x{entry['height']}, {original} bytes) -> {formats}, smallest {smallest} bytes")
+    print(f"   ⏱️  {time.time() - started:.1f}s")
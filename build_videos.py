@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Offline video pipeline: hero background renditions and poster frames.
+
+Transcodes a source clip into a ladder of sizes, each as VP9 WebM and H.264
+MP4 (faststart), extracts a poster frame per size and records everything
+in static/videos/manifest.json. The template lists the renditions as
+<source> tags with media queries and codecs, smallest first, so the browser
+picks the smallest file that is adequate for the viewport without any
+JavaScript guessing. Requires ffmpeg and ffprobe on PATH. Transcoding is
+slow, so the results are committed rather than built on deploy.
+
+    python build_videos.py path/to/clip.mov
+    python build_videos.py --check
+"""
+import argparse
+import json
+import os
+import posixpath
+import shutil
+import subprocess
+import sys
+
+VIDEO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'videos')
+MANIFEST = 'manifest.json'
+NAME = 'hero-video'
+
+# Width, the widest viewport it is meant for (None: everything above),
+# and target bitrates in kbit/s. The clip is muted, so there is no audio.
+LADDER = [
+    {'width': 640, 'max_viewport': 768, 'mp4': 700, 'webm': 450},
+    {'width': 1280, 'max_viewport': 1440, 'mp4': 2000, 'webm': 1300},
+    {'width': 1920, 'max_viewport': None, 'mp4': 3500, 'webm': 2300},
+]
+FORMATS = {
+    'webm': {
+        'type': 'video/webm; codecs="vp9"',
+        'args': ['-c:v', 'libvpx-vp9', '-row-mt', '1', '-deadline', 'good', '-cpu-used', '2', '-crf', '34'],
+    },
+    'mp4': {
+        'type': 'video/mp4; codecs="avc1.640028"',
+        'args': ['-c:v', 'libx264', '-profile:v', 'high', '-level', '4.0', '-preset', 'slow',
+                 '-pix_fmt', 'yuv420p', '-movflags', '+faststart'],
+    },
+}
+# The README's budget for the largest rendition
+MAX_BYTES = 10 * 1024 * 1024
+MAX_DURATION = 30
+
+
+def probe(path):
+    """Return width, height, duration and codec of the first video stream."""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries',
+         'stream=width,height,codec_name:format=duration', '-of', 'json', path],
+        check=True, capture_output=True, text=True)
+    info = json.loads(result.stdout)
+    stream = info['streams'][0]
+    return {'width': stream['width'], 'height': stream['height'], 'codec': stream['codec_name'],
+            'duration': float(info['format']['duration'])}
+
+
+def media_query(rung, previous):
+    """Media query for a rung; the widest one takes everything that is left."""
+    if rung['max_viewport'] is None:
+        return f"(min-width: {previous['max_viewport'] + 1}px)" if previous else None
+    return f"(max-width: {rung['max_viewport']}px)"
+
+
+def ffmpeg(*args):
+    subprocess.run(['ffmpeg', '-y', '-v', 'error', *args], check=True)
+
+
+def transcode(source, target, rung, fmt, duration):
+    kbps = rung[fmt]
+    ffmpeg('-i', source, '-t', str(duration), '-an', '-vf', f"scale={rung['width']}:-2",
+           *FORMATS[fmt]['args'], '-b:v', f'{kbps}k', '-maxrate', f'{kbps * 3 // 2}k',
+           '-bufsize', f'{kbps * 2}k', target)
+
+
+def build(source, video_dir=VIDEO_DIR, name=NAME, poster_at=1.0, duration=MAX_DURATION):
+    info = probe(source)
+    duration = min(duration, info['duration'])
+    ladder = [rung for rung in LADDER if rung['width'] <= info['width']] or [dict(LADDER[0], width=info['width'])]
+    # The widest rung always covers the remaining viewports
+    ladder[-1] = dict(ladder[-1], max_viewport=None)
+
+    os.makedirs(os.path.join(video_dir, name), exist_ok=True)
+    entry = {'width': info['width'], 'height': info['height'], 'duration': round(duration, 2),
+             'sources': [], 'posters': []}
+    previous = None
+    for rung in ladder:
+        media = media_query(rung, previous)
+        previous = rung
+        for fmt in FORMATS:
+            file = posixpath.join(name, f"{rung['width']}.{fmt}")
+            path = os.path.join(video_dir, file)
+            print(f"   🎞️  {file}")
+            transcode(source, path, rung, fmt, duration)
+            rendition = probe(path)
+            entry['sources'].append({'file': file, 'type': FORMATS[fmt]['type'], 'media': media,
+                                     'width': rendition['width'], 'height': rendition['height'],
+                                     'bytes': os.path.getsize(path)})
+        poster = posixpath.join(name, f"poster-{rung['width']}.jpg")
+        ffmpeg('-ss', str(poster_at), '-i', source, '-frames:v', '1', '-vf', f"scale={rung['width']}:-2",
+               '-q:v', '3', os.path.join(video_dir, poster))
+        entry['posters'].append({'file': poster, 'width': rung['width']})
+
+    manifest_path = os.path.join(video_dir, MANIFEST)
+    manifest = load_manifest(manifest_path)
+    manifest[name] = entry
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return entry
+
+
+def load_manifest(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def check(video_dir=VIDEO_DIR):
+    """Verify that every rendition in the manifest exists, matches and fits the budget."""
+    problems = []
+    for name, entry in load_manifest(os.path.join(video_dir, MANIFEST)).items():
+        for item in entry['sources'] + entry['posters']:
+            path = os.path.join(video_dir, item['file'])
+            if not os.path.exists(path):
+                problems.append(f"{name}: {item['file']} is missing")
+            elif 'bytes' in item:
+                size = os.path.getsize(path)
+                if size != item['bytes']:
+                    problems.append(f"{name}: {item['file']} is {size} bytes, manifest says {item['bytes']}")
+                if size > MAX_BYTES:
+                    problems.append(f"{name}: {item['file']} is over the {MAX_BYTES // 1024 // 1024} MB budget")
+                if shutil.which('ffprobe') and probe(path)['width'] != item['width']:
+                    problems.append(f"{name}: {item['file']} is not {item['width']} px wide")
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', nargs='?', help='source clip to transcode')
+    parser.add_argument('--name', default=NAME, help='rendition set name in the manifest')
+    parser.add_argument('--video-dir', default=VIDEO_DIR)
+    parser.add_argument('--poster-at', type=float, default=1.0, help='poster frame time in seconds')
+    parser.add_argument('--duration', type=float, default=MAX_DURATION, help='cut the clip to this many seconds')
+    parser.add_argument('--check', action='store_true', help='only verify the existing manifest')
+    args = parser.parse_args()
+
+    if not args.check:
+        if not args.source:
+            parser.error('a source clip is required unless --check is given')
+        if not (shutil.which('ffmpeg') and shutil.which('ffprobe')):
+            sys.exit('ffmpeg and ffprobe are required')
+        print(f"🎬 Building {args.name} renditions from {args.source}")
+        entry = build(args.source, args.video_dir, args.name, args.poster_at, args.duration)
+        for item in entry['sources']:
+            print(f"   ✅ {item['file']} {item['width']}x{item['height']} {item['bytes']} bytes {item['media'] or ''}")
+
+    problems = check(args.video_dir)
+    for problem in problems:
+        print(f"   ❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("   ✅ Video manifest OK")
@@ -0,0 +1,96 @@
+"""Content-Encoding negotiation for static files and rendered HTML.
+
+build_assets.py writes ``.br`` and ``.gz`` siblings next to every built text
+asset; ``static_file`` serves the best one the client accepts. Rendered HTML
+is compressed per response, and the page cache keeps the compressed bodies
+so a cached page is only compressed once per encoding. Brotli is optional:
+without the module only gzip is offered.
+"""
+import gzip
+import mimetypes
+import os
+
+from flask import current_app, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+# Server preference when the client weighs encodings equally
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+# Bodies smaller than this don't get smaller enough to be worth it
+MIN_SIZE = 512
+
+
+def compress(data, encoding, best=False):
+    """Compress ``data``; ``best`` trades CPU time for size (build/cache use)."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if best else 5)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9 if best else 6, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def choose_encoding(available=ENCODINGS):
+    """Return the best of ``available`` for the current request, or None."""
+    return request.accept_encodings.best_match(available)
+
+
+def write_precompressed(path):
+    """Write ``path``.br/.gz next to ``path`` and return their sizes."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    sizes = {}
+    for encoding in ENCODINGS:
+        compressed = compress(data, encoding, best=True)
+        with open(path + SUFFIXES[encoding], 'wb') as f:
+            f.write(compressed)
+        sizes[encoding] = len(compressed)
+    return sizes
+
+
+def remove_precompressed(path):
+    for suffix in SUFFIXES.values():
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def static_file(filename):
+    """Replacement for Flask's static view that prefers precompressed files."""
+    static_folder = current_app.static_folder
+    max_age = current_app.get_send_file_max_age(filename)
+    available = [
+        encoding for encoding in ENCODINGS
+        if os.path.isfile(os.path.join(static_folder, filename + SUFFIXES[encoding]))
+    ]
+    encoding = choose_encoding(available) if available else None
+    if encoding is None:
+        response = send_from_directory(static_folder, filename, max_age=max_age)
+    else:
+        # send_from_directory guesses the type from the name, so pass the
+        # original name's type and mark the encoding explicitly
+        response = send_from_directory(static_folder, filename + SUFFIXES[encoding], max_age=max_age,
+                                       mimetype=mimetypes.guess_type(filename)[0])
+        response.headers['Content-Encoding'] = encoding
+    if available:
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+def compress_response(response):
+    """Compress a buffered dynamic response in place if the client allows it."""
+    if (response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or not response.mimetype.startswith(COMPRESSIBLE_TYPES)):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    encoding = choose_encoding()
+    if encoding is None or len(data) < MIN_SIZE:
+        return response
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,10 @@
+"""
+Yhteiset pytest-asetukset
+"""
+
+import os
+import tempfile
+
+# Lomakkeen lähetysrajat lasketaan jokaisessa testiajossa tyhjästä, ettei
+# edellisten ajojen lähetykset täytä saman osoitteen kiintiötä
+os.environ['RATE_LIMIT_PATH'] = os.path.join(tempfile.mkdtemp(prefix='espoo-israel-tests-'), 'rate_limit.db')
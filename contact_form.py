@@ -1,15 +1,44 @@
+import math
+
 from flask_wtf import FlaskForm
-from wtforms import StringField, SelectField, TextAreaField, SubmitField, IntegerField, BooleanField
-from wtforms.validators import DataRequired, Email    
+from wtforms import StringField, SelectField, TextAreaField, SubmitField, IntegerField, BooleanField, HiddenField
+from wtforms.validators import DataRequired, Email
+
+# People need a few seconds to fill in the form; bots post it at once
+MIN_FILL_SECONDS = 3
 
 class ContactForm(FlaskForm):
     name = StringField('Nimi:', validators=[DataRequired()])
     address = StringField('Postiosoite:', validators=[DataRequired()])
     postal_code = IntegerField('Postinumero:', validators=[DataRequired()])
     city = StringField('Postitoimipaikka:', validators=[DataRequired()])
-    email = StringField('Sähköposti:', validators=[DataRequired(), Email()])
+    # Syntax only: no DNS inside the request. The mail sender checks that
+    # the domain accepts mail (email_check.py)
+    email = StringField('Sähköposti:', validators=[DataRequired(), Email(check_deliverability=False)])
     phone = StringField('Puhelin:', validators=[DataRequired()])
     join = SelectField(u"Haluan liittyä Espoon Suomi-Israel yhdistyksen tukijäseneksi:", choices=[("kyllä", "Kyllä"), ("ei", "Ei")], validators=[DataRequired()])
     message = TextAreaField('Viesti:', validators=[DataRequired()])
     accept_policy = BooleanField('Hyväksyn tietosuojaselosteen</a>', validators=[DataRequired()])
     submit = SubmitField('Lähetä')
+    # Spam traps: the honeypot is hidden from people, and script.js fills in
+    # the seconds spent on the page when the form is submitted. Without JS
+    # (or if script.js fails to load) there is no fill time; those posts
+    # skip the timing check rather than being dropped as spam
+    website = StringField('Website')
+    fill_time = HiddenField()
+
+    def spam_reason(self):
+        """'honeypot' or 'too_fast' for a bot submission, else None.
+
+        Only looks at the submitted values, so it is cheap to call before
+        the validators run.
+        """
+        if self.website.data:
+            return 'honeypot'
+        try:
+            seconds = float(self.fill_time.data)
+        except (TypeError, ValueError):
+            return None
+        if math.isfinite(seconds) and seconds < MIN_FILL_SECONDS:
+            return 'too_fast'
+        return None
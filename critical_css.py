@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Build step for style.css: purge unused rules and extract the critical CSS.
+
+style.css was loaded render-blocking on every page, most of it for
+sections far below the first screen. This step writes to static/critical/:
+
+* style.css: style.css without the rules whose selectors name a class,
+  id or element that no template or script uses (the same tree shaking
+  vendor_assets.py does for Bootstrap)
+* <template>.css for each page in TEMPLATES: the rules of that purged
+  sheet that apply to the first screen, i.e. the page's markup above its
+  ``<!-- fold -->`` comment (all of it when there is none)
+
+Both look at the pages as the app renders them in every language, so
+the markup of the form widgets and the macros counts too.
+
+and lists them in static/critical/manifest.json. The pages inline their
+critical CSS in a <style> block and load the purged sheet without
+blocking rendering; without the manifest they link style.css as before.
+Run build_assets.py afterwards to minify and fingerprint the result.
+
+    python critical_css.py
+"""
+import argparse
+import json
+import os
+import posixpath
+import re
+import shutil
+
+from compression import compress
+from css_tools import (CSS_URL, WORDS, drop_unreferenced, minify_css, parse_css, rebase_css_urls, selector_names,
+                       serialize, shake, split_selectors)
+from vendor_assets import ALWAYS_USED, STATIC_DIR, TEMPLATE_DIR, used_names
+
+CRITICAL_DIR = 'critical'
+MANIFEST = 'manifest.json'
+STYLESHEET = 'style.css'
+# Pages linking style.css; the error pages carry their own inline styles
+TEMPLATES = ['index.html', 'kiitos.html']
+SCRIPTS = ['script.js']
+# Inline CSS resolves url() against the page, not the stylesheet
+STATIC_URL = '/static/'
+
+_FOLD = re.compile(r'<!--\s*fold\b')
+_BODY = re.compile(r'<body\b')
+_TAG = re.compile(r'<([a-zA-Z][-\w]*)')
+_CLASS = re.compile(r'\bclass="([^"]*)"')
+_ID = re.compile(r'\bid="([^"]*)"')
+
+
+def first_screen_names(source):
+    """Elements, classes and ids in the rendered markup between ``<body>`` and ``<!-- fold -->``.
+
+    Unlike the purge, which keeps a rule if its names occur anywhere, names
+    here are typed: ``('.', 'hero')``, ``('#', 'hero')`` and ``('', 'section')``
+    are different things, so links to ``#about`` don't pull in its styles.
+    """
+    body = _BODY.search(source)
+    fold = _FOLD.search(source)
+    markup = source[body.start() if body else 0:fold.start() if fold else len(source)]
+    names = {('', name) for name in ALWAYS_USED}
+    names.update(('', tag.lower()) for tag in _TAG.findall(markup))
+    for prefix, pattern in (('.', _CLASS), ('#', _ID)):
+        for value in pattern.findall(markup):
+            names.update((prefix, name) for name in WORDS.findall(value))
+    return names
+
+
+def on_first_screen(selector, names):
+    """True if every class, id and element in ``selector`` is in ``names`` (typed, see first_screen_names)."""
+    return all((prefix, name.lower() if not prefix else name) in names
+               for prefix, name in selector_names(selector))
+
+
+def absolute_urls(css, source_name, prefix=STATIC_URL):
+    def absolute(match):
+        quote, url = match.groups()
+        if url.startswith(('/', 'data:', 'http:', 'https:', '#')):
+            return match.group(0)
+        path = posixpath.normpath(posixpath.join(posixpath.dirname(source_name), url))
+        return f'url({quote}{prefix}{path}{quote})'
+    return CSS_URL.sub(absolute, css)
+
+
+def purge(source, names):
+    return drop_unreferenced(shake(parse_css(source), names))
+
+
+def critical(nodes, names):
+    """The rules of ``nodes`` for the first screen, with the at-rules they need."""
+    def keep(nodes):
+        kept = []
+        for prelude, body in nodes:
+            if isinstance(body, list):
+                children = keep(body)
+                if children:
+                    kept.append((prelude, children))
+            elif prelude.startswith('@'):
+                kept.append((prelude, body))
+            else:
+                selectors = [s for s in split_selectors(prelude) if on_first_screen(s, names)]
+                if selectors:
+                    kept.append((','.join(selectors), body))
+        return kept
+    return drop_unreferenced(keep(nodes))
+
+
+def _sizes(css):
+    data = minify_css(css).encode('utf-8')
+    return len(data), len(compress(data, 'gzip', best=True))
+
+
+def build(static_dir=STATIC_DIR, template_dir=TEMPLATE_DIR, templates=None, pages=None):
+    """Write the purged and critical CSS into ``static_dir``/critical; returns ``(manifest, report)``.
+
+    ``pages`` maps each template to its HTML in every language, rendered
+    by the app (app.render_pages) by default.
+    """
+    templates = TEMPLATES if templates is None else templates
+    if pages is None:
+        from app import render_pages
+        pages = render_pages()
+    critical_dir = os.path.join(static_dir, CRITICAL_DIR)
+    shutil.rmtree(critical_dir, ignore_errors=True)
+    os.makedirs(critical_dir)
+
+    with open(os.path.join(static_dir, STYLESHEET), encoding='utf-8') as f:
+        source = f.read()
+    scripts = [os.path.join(static_dir, name) for name in SCRIPTS]
+    # Bootstrap's JS adds classes (show, collapsing, ...) that style.css may style too
+    class_scripts = []
+    for path in scripts + [os.path.join(static_dir, 'vendor', 'bootstrap.bundle.min.js')]:
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                class_scripts.append(f.read())
+    rendered = [html for template in templates for html in pages[template]]
+    nodes = purge(source, used_names(template_dir, scripts, class_scripts, rendered))
+
+    purged_name = posixpath.join(CRITICAL_DIR, STYLESHEET)
+    with open(os.path.join(static_dir, purged_name), 'w', encoding='utf-8') as f:
+        f.write(rebase_css_urls(serialize(nodes), STYLESHEET, purged_name) + '\n')
+    manifest = {'stylesheet': purged_name, 'templates': {}}
+    original, purged = _sizes(source), _sizes(serialize(nodes))
+    report = [(STYLESHEET, original, purged, None)]
+
+    for template in templates:
+        names = set().union(*map(first_screen_names, pages[template]))
+        css = absolute_urls(serialize(critical(nodes, names)), STYLESHEET)
+        name = posixpath.join(CRITICAL_DIR, posixpath.splitext(template)[0] + '.css')
+        with open(os.path.join(static_dir, name), 'w', encoding='utf-8') as f:
+            f.write(css + '\n')
+        manifest['templates'][template] = name
+        # Render-blocking bytes: all of style.css before, the inlined rules now
+        report.append((template, original, purged, _sizes(css)))
+
+    with open(os.path.join(critical_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return manifest, report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--static-dir', default=STATIC_DIR)
+    parser.add_argument('--template-dir', default=TEMPLATE_DIR)
+    args = parser.parse_args()
+
+    print(f"✂️  Purging {STYLESHEET} and extracting critical CSS")
+    _, report = build(args.static_dir, args.template_dir)
+    for name, (before, before_gz), (purged, purged_gz), inline in report:
+        if inline is None:
+            print(f"   ✅ {name}: {before} -> {purged} bytes minified, gzip {before_gz} -> {purged_gz}")
+            continue
+        print(f"   ✅ {name}: render-blocking {before_gz} -> {inline[1]} bytes gzip "
+              f"({before_gz - inline[1]} saved; {inline[0]} bytes inlined, {purged_gz} loaded async)")
+    print("   ➡️  Run build_assets.py to fingerprint and compress the result")
@@ -0,0 +1,241 @@
+"""
+CSS helpers shared by the asset build steps.
+
+build_assets.py minifies and fingerprints stylesheets, vendor_assets.py
+tree-shakes the CDN stylesheets and critical_css.py extracts the
+first-screen rules of style.css; this module has what they have in
+common: a tokenizer that keeps strings intact, the minifier, url()
+rebasing and a small parser for rule trees.
+
+A stylesheet parses into ``(prelude, body)`` nodes. ``body`` is None for
+statements such as ``@charset``, a list of nodes for grouping rules like
+``@media`` and the declaration text otherwise.
+"""
+import posixpath
+import re
+
+# Grouping at-rules whose bodies are rules rather than declarations
+GROUPING_RULES = ('@media', '@supports', '@layer', '@container')
+
+# Strings and comments, in the order a tokenizer would meet them
+CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|(/\*.*?\*/)', re.S)
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+# Class, id and element names as they occur in markup, scripts and selectors
+WORDS = re.compile(r'[-\w]+')
+
+_DECLARATION = re.compile(r'([{;])(-?[a-zA-Z][-a-zA-Z]*):\s+')
+_PSEUDO_ARGUMENTS = re.compile(r':[-\w]+\((?:[^()]|\([^()]*\))*\)')
+_ATTRIBUTE = re.compile(r'\[[^\]]*\]')
+_PSEUDO = re.compile(r'::?[-\w]+')
+_SELECTOR_NAMES = re.compile(r'([.#]?)(-?[_a-zA-Z][-\w]*)')
+_VALUE_NAMES = re.compile(r'"([^"]+)"|\'([^\']+)\'|([-\w]+)')
+_FONT_FAMILY = re.compile(r'font-family:\s*([^;}]+)')
+_ANIMATION = re.compile(r'animation(?:-name)?:\s*([^;}]+)')
+
+
+def split_strings(source, tokens):
+    """Split ``source`` into ``(is_string, text)`` chunks with comments removed.
+
+    ``tokens`` matches strings (group 1) and comments (the other groups),
+    e.g. CSS_TOKENS.
+    """
+    chunks = [[False, '']]
+    pos = 0
+    for match in tokens.finditer(source):
+        chunks[-1][1] += source[pos:match.start()]
+        if match.group(1):
+            chunks.append([True, match.group(1)])
+            chunks.append([False, ''])
+        pos = match.end()
+    chunks[-1][1] += source[pos:]
+    return chunks
+
+
+def minify_css(source):
+    out = []
+    for is_string, chunk in split_strings(source, CSS_TOKENS):
+        if is_string:
+            out.append(chunk)
+            continue
+        chunk = re.sub(r'\s+', ' ', chunk)
+        chunk = re.sub(r'\s*([{};,>])\s*', r'\1', chunk)
+        chunk = chunk.replace(';}', '}')
+        # Only tighten "property: value"; in selectors "a :hover" and
+        # "a:hover" mean different things
+        chunk = _DECLARATION.sub(r'\1\2:', chunk)
+        out.append(chunk)
+    return ''.join(out).strip()
+
+
+def rebase_css_urls(css, source_name, target_name):
+    """Keep relative url() references working after moving the stylesheet."""
+    source_dir = posixpath.dirname(source_name)
+    target_dir = posixpath.dirname(target_name)
+
+    def rebase(match):
+        quote, url = match.groups()
+        if url.startswith(('/', 'data:', 'http:', 'https:', '#')):
+            return match.group(0)
+        path = posixpath.normpath(posixpath.join(source_dir, url))
+        return f'url({quote}{posixpath.relpath(path, target_dir or ".")}{quote})'
+    return CSS_URL.sub(rebase, css)
+
+
+# -- Parsing ----------------------------------------------------------------
+
+def _skip_string(css, i):
+    quote = css[i]
+    i += 1
+    while i < len(css) and css[i] != quote:
+        i += 2 if css[i] == '\\' else 1
+    return i + 1
+
+
+def _matching_brace(css, i):
+    depth = 0
+    while i < len(css):
+        c = css[i]
+        if c in '"\'':
+            i = _skip_string(css, i)
+            continue
+        if c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return len(css)
+
+
+def parse_css(css):
+    """Parse ``css`` into ``(prelude, body)`` nodes."""
+    css = ''.join(chunk for _, chunk in split_strings(css, CSS_TOKENS))
+    nodes = []
+    pos = i = 0
+    while i < len(css):
+        c = css[i]
+        if c in '"\'':
+            i = _skip_string(css, i)
+            continue
+        if c == ';':
+            if css[pos:i].strip():
+                nodes.append((css[pos:i].strip(), None))
+            pos = i = i + 1
+            continue
+        if c == '{':
+            end = _matching_brace(css, i)
+            prelude, body = css[pos:i].strip(), css[i + 1:end]
+            nodes.append((prelude, parse_css(body) if prelude.startswith(GROUPING_RULES) else body.strip()))
+            pos = i = end + 1
+            continue
+        i += 1
+    return nodes
+
+
+def serialize(nodes):
+    out = []
+    for prelude, body in nodes:
+        if body is None:
+            out.append(prelude + ';')
+        elif isinstance(body, list):
+            out.append(prelude + '{' + serialize(body) + '}')
+        else:
+            out.append(prelude + '{' + body + '}')
+    return '\n'.join(out)
+
+
+def walk(nodes):
+    """The ``(prelude, body)`` of every rule and statement, inside grouping rules too."""
+    for prelude, body in nodes:
+        if isinstance(body, list):
+            yield from walk(body)
+        else:
+            yield prelude, body
+
+
+# -- Selectors and tree shaking ---------------------------------------------
+
+def split_selectors(prelude):
+    """The selectors of a rule's comma separated ``prelude``."""
+    selectors, depth, start = [], 0, 0
+    for i, c in enumerate(prelude):
+        if c in '([':
+            depth += 1
+        elif c in ')]':
+            depth -= 1
+        elif c == ',' and depth == 0:
+            selectors.append(prelude[start:i].strip())
+            start = i + 1
+    selectors.append(prelude[start:].strip())
+    return selectors
+
+
+def selector_names(selector):
+    """The classes, ids and elements ``selector`` requires, as ``(prefix, name)``.
+
+    The prefix is '.', '#' or '' for an element. Arguments of
+    :not()/:is()/... and attribute selectors are ignored, which keeps a
+    rule rather than risk dropping one that applies.
+    """
+    bare = _PSEUDO.sub('', _ATTRIBUTE.sub('', _PSEUDO_ARGUMENTS.sub('', selector)))
+    return _SELECTOR_NAMES.findall(bare)
+
+
+def selector_used(selector, names):
+    """True if every class, id and element in ``selector`` is in ``names``."""
+    return all(name in names for _, name in selector_names(selector))
+
+
+def _referenced(nodes, pattern):
+    """Quoted strings and words in the values of ``pattern`` in kept rules."""
+    found = set()
+    for prelude, body in walk(nodes):
+        if body is not None and not prelude.startswith('@'):
+            for value in pattern.findall(body):
+                found.update(''.join(match) for match in _VALUE_NAMES.findall(value))
+    return found
+
+
+def shake(nodes, names):
+    """Drop rules whose selectors use nothing from ``names``."""
+    kept = []
+    for prelude, body in nodes:
+        if body is None:
+            # A concatenated file can't have @charset in the middle
+            if not prelude.startswith('@charset'):
+                kept.append((prelude, body))
+        elif isinstance(body, list):
+            children = shake(body, names)
+            if children:
+                kept.append((prelude, children))
+        elif prelude.startswith('@'):
+            kept.append((prelude, body))
+        else:
+            selectors = [s for s in split_selectors(prelude) if selector_used(s, names)]
+            if selectors:
+                kept.append((','.join(selectors), body))
+    return kept
+
+
+def drop_unreferenced(nodes, families=None, animations=None):
+    """Remove @font-face and @keyframes rules that no kept rule refers to."""
+    if families is None:
+        families = _referenced(nodes, _FONT_FAMILY)
+        animations = _referenced(nodes, _ANIMATION)
+    kept = []
+    for prelude, body in nodes:
+        if isinstance(body, list):
+            children = drop_unreferenced(body, families, animations)
+            if children:
+                kept.append((prelude, children))
+        elif prelude == '@font-face':
+            family = _FONT_FAMILY.search(body)
+            if family and family.group(1).strip().strip('"\'') in families:
+                kept.append((prelude, body))
+        elif re.match(r'@(-\w+-)?keyframes\s', prelude):
+            if prelude.split()[1] in animations:
+                kept.append((prelude, body))
+        else:
+            kept.append((prelude, body))
+    return kept
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Local SMTP stand-in for offline development and tests.
+
+Accepts any login and any recipient, keeps received messages in memory and
+optionally writes them as .eml files. Point the app at it with:
+
+    MAIL_SERVER=127.0.0.1 MAIL_PORT=1025 MAIL_USE_SSL=false python app.py
+"""
+import argparse
+import os
+import socketserver
+import sys
+import threading
+import time
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write((line + '\r\n').encode())
+
+    def handle(self):
+        self.reply('220 localhost dev_smtp ready')
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command[:4].upper()
+            if verb in ('HELO', 'EHLO'):
+                if verb == 'EHLO':
+                    self.reply('250-localhost')
+                    self.reply('250-AUTH PLAIN LOGIN')
+                    self.reply('250 8BITMIME')
+                else:
+                    self.reply('250 localhost')
+            elif verb == 'AUTH':
+                # Every login is accepted, just consume the credentials
+                parts = command.split()
+                mechanism = parts[1].upper() if len(parts) > 1 else ''
+                if mechanism == 'LOGIN':
+                    if len(parts) < 3:
+                        self.reply('334 VXNlcm5hbWU6')
+                        self.rfile.readline()
+                    self.reply('334 UGFzc3dvcmQ6')
+                    self.rfile.readline()
+                elif len(parts) < 3:
+                    self.reply('334 ')
+                    self.rfile.readline()
+                self.reply('235 Authentication successful')
+            elif verb == 'MAIL':
+                sender, recipients = command[10:].strip(' <>'), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command[8:].strip(' <>'))
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b'.\r\n', b'.\n'):
+                        break
+                    if data.startswith(b'..'):
+                        data = data[1:]
+                    lines.append(data)
+                self.server.store(sender, recipients, b''.join(lines))
+                sender, recipients = None, []
+                self.reply('250 OK queued')
+            elif verb == 'RSET':
+                sender, recipients = None, []
+                self.reply('250 OK')
+            elif verb == 'NOOP':
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class DevSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=1025, outdir=None, quiet=False):
+        super().__init__((host, port), SMTPHandler)
+        self.outdir = outdir
+        self.quiet = quiet
+        self.messages = []
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    def store(self, sender, recipients, data):
+        with self._lock:
+            self.messages.append({'sender': sender, 'recipients': recipients, 'data': data})
+            count = len(self.messages)
+        if self.outdir:
+            os.makedirs(self.outdir, exist_ok=True)
+            path = os.path.join(self.outdir, f"{int(time.time())}-{count}.eml")
+            with open(path, 'wb') as f:
+                f.write(data)
+        if not self.quiet:
+            print(f"📧 Message {count} from {sender} to {', '.join(recipients)}")
+
+    def handle_error(self, request, client_address):
+        # Clients that are killed mid-session (a stopped app server) are not errors
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        """Serve in a daemon thread (used by tests and benchmarks)."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=1025)
+    parser.add_argument('--outdir', help='write received messages as .eml files here')
+    args = parser.parse_args()
+    server = DevSMTPServer(args.host, args.port, args.outdir)
+    print(f"🚀 Dev SMTP server listening on {args.host}:{server.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,80 @@
+"""Deferred deliverability checks for submitted email addresses.
+
+The contact form only checks the syntax of the address, so a POST never
+waits for DNS. The background mail sender asks DomainVerdicts whether the
+domain accepts mail (an MX record, or the A/AAAA fallback) and flags the
+message when it does not. Verdicts are cached per domain; when DNS gives
+no answer (timeouts, no nameservers) the address is let through and the
+domain is asked again after a short while.
+"""
+import logging
+import threading
+import time
+
+# dnspython and email_validator are imported in the sender thread on first
+# use; the web workers never need them at startup
+logger = logging.getLogger(__name__)
+
+TTL = 24 * 3600
+UNKNOWN_TTL = 300
+TIMEOUT = 5
+MAX_DOMAINS = 10000
+
+
+class DomainVerdicts:
+    """Per-domain cache of True (accepts mail), False (does not) or None (unknown)."""
+
+    def __init__(self, ttl=TTL, unknown_ttl=UNKNOWN_TTL, timeout=TIMEOUT, resolver=None):
+        self.ttl = ttl
+        self.unknown_ttl = unknown_ttl
+        self.timeout = timeout
+        self._resolver = resolver
+        self._verdicts = {}
+        self._lock = threading.Lock()
+
+    def resolver(self):
+        # Our own resolver, so the timeout does not change dnspython's default one
+        if self._resolver is None:
+            import dns.resolver
+            resolver = dns.resolver.Resolver()
+            resolver.lifetime = self.timeout
+            self._resolver = resolver
+        return self._resolver
+
+    def check(self, address, now=None):
+        """Verdict for the domain of ``address``; False if it is not an address at all."""
+        from email_validator import EmailNotValidError, validate_email
+        try:
+            parsed = validate_email(address, check_deliverability=False)
+        except EmailNotValidError:
+            return False
+        return self.domain(parsed.ascii_domain, parsed.domain, now)
+
+    def domain(self, domain, domain_i18n=None, now=None):
+        now = time.monotonic() if now is None else now
+        cached = self._verdicts.get(domain)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+        verdict = self._lookup(domain, domain_i18n or domain)
+        with self._lock:
+            if len(self._verdicts) >= MAX_DOMAINS:
+                self._verdicts = {key: value for key, value in self._verdicts.items() if value[1] > now}
+            self._verdicts[domain] = (verdict, now + (self.unknown_ttl if verdict is None else self.ttl))
+        return verdict
+
+    def _lookup(self, domain, domain_i18n):
+        import dns.resolver
+        from email_validator import EmailUndeliverableError
+        from email_validator.deliverability import validate_email_deliverability
+        try:
+            info = validate_email_deliverability(domain, domain_i18n, dns_resolver=self.resolver())
+        except EmailUndeliverableError as e:
+            # email_validator also reports unexpected resolver errors this way
+            if e.__cause__ is None or isinstance(e.__cause__, (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer)):
+                return False
+            logger.warning("Deliverability of %s unknown: %s", domain, e)
+            return None
+        except Exception as e:
+            logger.warning("Deliverability of %s unknown: %s", domain, e)
+            return None
+        return None if 'unknown-deliverability' in info else True
@@ -3,17 +3,18 @@
 Lopullinen testiraportti kielenvaihtotoiminnon korjauksen jälkeen
 """
 
-import requests
-from bs4 import BeautifulSoup
+from site_client import SiteClient
 
-def generate_final_report():
+def generate_final_report(site=None):
     """Luo lopullinen testiraportti"""
     print("📋 FINAL TEST REPORT - LANGUAGE TOGGLE FIX")
     print("=" * 60)
     
     try:
-        response = requests.get("http://127.0.0.1:5000")
-        soup = BeautifulSoup(response.text, 'html.parser')
+        site = site or SiteClient()
+        site.prefetch("/", "/static/script.js")
+        response = site.get("/")
+        soup = site.soup("/")
         
         print("🔧 ISSUE FIXED:")
         print("   Problem: Language toggle was firing twice per click")
@@ -30,7 +31,7 @@ def generate_final_report():
             print("   ❌ onclick attribute still present")
             
         # Tarkista JavaScript
-        js_response = requests.get("http://127.0.0.1:5000/static/script.js")
+        js_response = site.get("/static/script.js")
         js_content = js_response.text
         
         if "addEventListener('click'" in js_content and "langToggle" in js_content:
@@ -41,11 +42,8 @@ def generate_final_report():
         print("\n🎯 EXPECTED BEHAVIOR NOW:")
         print("   • Single click = Single toggleLanguage() call")
         print("   • Console shows ONE set of messages per click:")
-        print("     - Toggle language called, current: [lang]")
-        print("     - New language: [new_lang]") 
-        print("     - Updating language to: [new_lang]")
-        print("     - Found elements with language data: 41")
-        print("     - Language button updated to: [flag]")
+        print("     - Language toggle event listener added")
+        print("   • Click loads the other language's page (/fi/ ↔ /en/)")
         
         print("\n🧪 TEST INSTRUCTIONS:")
         print("   1. Open http://127.0.0.1:5000")
@@ -65,7 +63,8 @@ def generate_final_report():
             ("JavaScript loads", js_response.status_code == 200),
             ("Event listener configured", "addEventListener" in js_content),
             ("Toggle function exists", "toggleLanguage" in js_content),
-            ("Language data elements", len(soup.find_all(attrs={"data-fi": True})) > 0)
+            ("Server-rendered language", soup.find('html') is not None and soup.find('html').get('lang') in ("fi", "en")),
+            ("No duplicated language data", len(soup.find_all(attrs={"data-fi": True})) == 0)
         ]
         
         passed = 0
@@ -88,4 +87,4 @@ def generate_final_report():
         print(f"❌ Test failed: {e}")
 
 if __name__ == "__main__":
-    generate_final_report()
\ No newline at end of file
+    generate_final_report(SiteClient.from_args(__doc__))
\ No newline at end of file
@@ -0,0 +1,139 @@
+"""gunicorn settings, read automatically when gunicorn starts in this directory.
+
+The worker model comes from GUNICORN_WORKER_CLASS:
+
+- gthread (default): a few threads per worker, so one slow SMTP server
+  or slow client ties up a thread rather than a whole process.
+- sync: one request per process at a time.
+- gevent: cooperative greenlets for many slow connections. The standard
+  library is monkey-patched below, before the app is imported.
+
+The number of workers is sized from the CPUs and memory available to
+the container, unless WEB_CONCURRENCY sets it. GUNICORN_THREADS and
+GUNICORN_WORKER_CONNECTIONS override the per-worker concurrency, and
+GUNICORN_MAX_REQUESTS makes workers restart after that many requests.
+`python benchmark.py --modes sync,gthread,gevent` compares the models
+on our routes.
+"""
+import functools
+import math
+import os
+
+WORKER_CLASSES = ('sync', 'gthread', 'gevent')
+# Resident memory of one worker after the app is preloaded and warmed up
+WORKER_MEMORY = int(os.getenv('GUNICORN_WORKER_MEMORY_MB', 128)) * 1024 * 1024
+
+
+def cpu_count():
+    """CPUs this process may use, honouring a cgroup v2 quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def memory_available():
+    """Bytes of memory for the workers: the cgroup limit, else MemAvailable; None if unknown."""
+    try:
+        with open('/sys/fs/cgroup/memory.max') as f:
+            limit = f.read().strip()
+        if limit != 'max':
+            return int(limit)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def size_workers(worker_class, cpus, memory, worker_memory=WORKER_MEMORY):
+    """Number of worker processes for ``worker_class`` on this machine."""
+    if worker_class == 'sync':
+        workers = 2 * cpus + 1
+    elif worker_class == 'gthread':
+        workers = cpus + 1
+    else:
+        # One event loop per CPU handles the concurrency
+        workers = cpus
+    if memory is not None:
+        # Leave a quarter of the memory for the master, page cache and spikes
+        workers = min(workers, int(memory * 0.75) // worker_memory)
+    return max(1, workers)
+
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+if worker_class not in WORKER_CLASSES:
+    raise ValueError(f"GUNICORN_WORKER_CLASS must be one of {', '.join(WORKER_CLASSES)}, not {worker_class!r}")
+if worker_class == 'gevent':
+    # Patch sockets, threads and locks before app.py creates any, so the
+    # mail sender, SMTP pool and log listener yield instead of blocking
+    from gevent import monkey
+    monkey.patch_all()
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', 8080)}")
+workers = int(os.getenv('WEB_CONCURRENCY', 0)) or size_workers(worker_class, cpu_count(), memory_available())
+threads = int(os.getenv('GUNICORN_THREADS', 4)) if worker_class == 'gthread' else 1
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 200))
+# Import the app once in the master and fork the workers from it, so
+# they share its memory copy-on-write
+preload_app = True
+keepalive = 5
+timeout = 30
+graceful_timeout = 30
+# Workers are not recycled by default: a gthread worker restarting after
+# max_requests drops the connections it has accepted but not yet served.
+# GUNICORN_MAX_REQUESTS turns it on should a worker leak memory, staggered
+# by a tenth so the workers do not restart together.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+if os.path.isdir('/dev/shm'):
+    # Worker heartbeat files on tmpfs, not a possibly slow container disk
+    worker_tmp_dir = '/dev/shm'
+
+
+def on_starting(server):
+    # Workers that import the app themselves (no preload_app) keep their
+    # metrics with the master's; with preload_app this is the same id
+    from metrics import process_id
+    os.environ['METRICS_SERVER'] = process_id(os.getpid())
+
+
+@functools.cache
+def master_metrics():
+    from metrics import Metrics
+    return Metrics()
+
+
+def child_exit(server, worker):
+    # Keep the exited worker's counts in the totals and drop its snapshot file
+    master_metrics().retire(worker.pid)
+
+
+def when_ready(server):
+    # With preload_app the master fills the caches once and every worker
+    # inherits them
+    if server.cfg.preload_app:
+        from app import warm_up
+        warm_up()
+
+
+def post_worker_init(worker):
+    # The worker has loaded app:app (or inherited it with preload_app);
+    # compile the templates and render the cached pages before accepting
+    # connections so the first visitors after a deploy or worker restart
+    # are not slow. Inherited caches make this a few milliseconds.
+    from app import warm_up
+    warm_up()
@@ -0,0 +1,49 @@
+"""Server-side translations for the public pages.
+
+Each language has a flat JSON catalog in ``translations/``. The language of
+a request comes from the URL prefix (``/fi/``, ``/en/``) and otherwise from
+the ``lang`` cookie or the Accept-Language header.
+"""
+import json
+import os
+
+LANGUAGES = ('fi', 'en')
+DEFAULT_LANGUAGE = 'fi'
+LANGUAGE_COOKIE = 'lang'
+CATALOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'translations')
+
+
+def load_catalogs(directory=CATALOG_DIR):
+    catalogs = {}
+    for lang in LANGUAGES:
+        with open(os.path.join(directory, f'{lang}.json'), encoding='utf-8') as f:
+            catalogs[lang] = json.load(f)
+    return catalogs
+
+
+CATALOGS = load_catalogs()
+
+
+def negotiate_language(request):
+    lang = request.cookies.get(LANGUAGE_COOKIE)
+    if lang in LANGUAGES:
+        return lang
+    return request.accept_languages.best_match(LANGUAGES, default=DEFAULT_LANGUAGE)
+
+
+def translator(lang):
+    """Return a ``gettext``-style lookup for ``lang``.
+
+    Missing keys fall back to the default language and finally to the key
+    itself, so an incomplete catalog never breaks rendering.
+    """
+    catalog = CATALOGS.get(lang, CATALOGS[DEFAULT_LANGUAGE])
+    fallback = CATALOGS[DEFAULT_LANGUAGE]
+
+    def gettext(key):
+        return catalog.get(key) or fallback.get(key, key)
+    return gettext
+
+
+def other_language(lang):
+    return 'en' if lang == 'fi' else 'fi'
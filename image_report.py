@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Size and start-up report for the production Docker image.
+
+Builds the image (unless --no-build), then reports its size and the time
+to first request: from ``docker run`` until GET / answers, best and
+median of --runs fresh containers. That is how long a new replica takes
+to come online on scale-out. The run fails if the image is larger than
+--max-size-mb or a container takes longer than --max-seconds.
+
+    python image_report.py
+    python image_report.py --no-build --tag espoo-israel:latest --runs 5 --json
+"""
+import argparse
+import fnmatch
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DOCKERIGNORE = os.path.join(ROOT, '.dockerignore')
+
+
+def dockerignore_patterns(path=DOCKERIGNORE):
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+def is_ignored(name, patterns):
+    """Whether ``name`` (relative to the build context) is left out by ``patterns``."""
+    parts = name.split('/')
+    ignored = False
+    for pattern in patterns:
+        negated = pattern.startswith('!')
+        pattern = pattern.lstrip('!').rstrip('/')
+        # A pattern naming a directory leaves out everything under it;
+        # a leading **/ matches in any directory
+        starts = range(len(parts)) if pattern.startswith('**/') else [0]
+        segments = pattern[3:].split('/') if pattern.startswith('**/') else pattern.split('/')
+        # Wildcards stay within one path segment, as in Docker
+        if any(len(parts) - start >= len(segments) and
+               all(fnmatch.fnmatchcase(part, segment) for part, segment in zip(parts[start:], segments))
+               for start in starts):
+            ignored = not negated
+    return ignored
+
+
+def docker(*args):
+    return subprocess.run(['docker', *args], check=True, capture_output=True, text=True).stdout.strip()
+
+
+def build(tag, context=ROOT):
+    started = time.perf_counter()
+    subprocess.run(['docker', 'build', '-t', tag, context], check=True)
+    return time.perf_counter() - started
+
+
+def image_size(tag):
+    return int(docker('image', 'inspect', '--format', '{{.Size}}', tag))
+
+
+def time_to_first_request(tag, port, timeout=60):
+    """Seconds from ``docker run`` until the container answers GET /."""
+    started = time.perf_counter()
+    container = docker('run', '--detach', '--rm', '--publish', f'127.0.0.1:{port}:8080',
+                       '--env', 'SECRET_KEY=image-report', tag)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+                conn.request('GET', '/')
+                status = conn.getresponse().status
+                conn.close()
+                if status == 200:
+                    return time.perf_counter() - started
+            except (OSError, http.client.HTTPException):
+                pass
+            time.sleep(0.05)
+        raise RuntimeError(f"Container did not answer within {timeout} s:\n{docker('logs', container)}")
+    finally:
+        subprocess.run(['docker', 'rm', '--force', container], capture_output=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tag', default='espoo-israel')
+    parser.add_argument('--no-build', action='store_true', help='report on an existing image')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--max-size-mb', type=float, default=0, help='fail above this image size')
+    parser.add_argument('--max-seconds', type=float, default=0, help='fail above this time to first request')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    result = {'tag': args.tag}
+    if not args.no_build:
+        result['build_s'] = round(build(args.tag), 1)
+    result['size_mb'] = round(image_size(args.tag) / 1e6, 1)
+    starts = [time_to_first_request(args.tag, args.port) for _ in range(args.runs)]
+    result['first_request_s'] = {'best': round(min(starts), 2), 'median': round(statistics.median(starts), 2),
+                                 'runs': [round(s, 2) for s in starts]}
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        if 'build_s' in result:
+            print(f"build: {result['build_s']} s")
+        print(f"image {args.tag}: {result['size_mb']} MB")
+        print(f"time to first request: best {result['first_request_s']['best']} s, "
+              f"median {result['first_request_s']['median']} s ({args.runs} runs)")
+
+    failed = False
+    if args.max_size_mb and result['size_mb'] > args.max_size_mb:
+        print(f"FAILED: image is {result['size_mb']} MB, limit {args.max_size_mb} MB")
+        failed = True
+    if args.max_seconds and max(starts) > args.max_seconds:
+        print(f"FAILED: first request took {max(starts):.2f} s, limit {args.max_seconds} s")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
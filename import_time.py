@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Import-time report for the app, from ``python -X importtime``.
+
+Imports the app in a fresh interpreter (best of --runs), then prints the
+total, the packages with the most self time and the slowest direct
+imports. The run fails if the total exceeds --budget-ms or if one of the
+modules the app defers until first use (DEFERRED) was imported anyway,
+so a stray top-level import shows up in CI rather than in worker start-up
+times.
+
+    python import_time.py
+    python import_time.py --runs 5 --budget-ms 500 --json
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+# Imported on first use or in app.warm_up(), never by ``import app``;
+# the rest are test and build dependencies
+DEFERRED = ('email_validator', 'dns', 'flask_mail', 'sqlalchemy', 'requests', 'bs4', 'PIL', 'fontTools')
+
+
+def parse(output):
+    """``(name, self_us, cumulative_us, depth)`` per line of -X importtime output."""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def subtree(rows, module):
+    """The rows of ``import module`` itself, leaving out what the interpreter imported before it."""
+    # A module's line follows the lines of everything it imported
+    end = max(i for i, row in enumerate(rows) if row[0] == module and row[3] == 0)
+    start = end
+    while start > 0 and rows[start - 1][3] > 0:
+        start -= 1
+    return rows[start:end + 1]
+
+
+def measure(module='app', runs=3):
+    """Rows of the fastest of ``runs`` imports of ``module``."""
+    best = None
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+        rows = subtree(parse(result.stderr), module)
+        if best is None or rows[-1][2] < best[0]:
+            best = (rows[-1][2], rows)
+    return best[1]
+
+
+def digest(rows, module='app', top=10):
+    """Total, self time per top-level package and the slowest direct imports, in ms."""
+    packages = {}
+    for name, self_us, _, _ in rows:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+    return {
+        'module': module,
+        'total_ms': round(rows[-1][2] / 1000, 1),
+        'modules': len(rows),
+        'packages': [(name, round(us / 1000, 1)) for name, us in
+                     sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]],
+        'slowest': [(name, round(us / 1000, 1)) for name, _, us, depth in
+                    sorted(rows, key=lambda row: row[2], reverse=True) if depth == 1][:top],
+    }
+
+
+def deferred_imports(rows, deferred=DEFERRED):
+    return sorted({name.split('.')[0] for name, _, _, _ in rows if name.split('.')[0] in deferred})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=1000,
+                        help='fail if importing the module takes longer (default %(default)s)')
+    parser.add_argument('--json', action='store_true', help='print the digest as JSON')
+    args = parser.parse_args()
+
+    rows = measure(args.module, args.runs)
+    result = digest(rows, args.module, args.top)
+    result['deferred_imported'] = deferred_imports(rows)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"import {args.module}: {result['total_ms']:.0f} ms, {result['modules']} modules "
+              f"(best of {args.runs})")
+        for section in ('packages', 'slowest'):
+            print(f"{section}:")
+            for name, ms in result[section]:
+                print(f"  {name:<40} {ms:8.1f} ms")
+
+    failed = False
+    if result['total_ms'] > args.budget_ms:
+        print(f"FAILED: import {args.module} took {result['total_ms']:.0f} ms, budget {args.budget_ms:.0f} ms")
+        failed = True
+    if result['deferred_imported']:
+        print(f"FAILED: deferred modules imported: {', '.join(result['deferred_imported'])}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""Durable outbound mail queue for contact form submissions.
+
+The request handler only writes a row into a local SQLite database and
+returns; a background thread in each worker drains the queue and talks to
+the SMTP server, retrying failed deliveries with exponential backoff.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    created REAL NOT NULL,
+    last_error TEXT
+)
+"""
+
+
+class MailQueue:
+    """SQLite backed queue shared by all workers on the host."""
+
+    def __init__(self, path, max_attempts=8, base_delay=30, max_delay=3600, lease=300):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease = lease
+        self._initialized = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        if self._initialized != self.path:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(SCHEMA)
+            self._initialized = self.path
+        return conn
+
+    def put(self, subject, sender, recipients, body, submitter=None):
+        # ``submitter`` is the address given in the form, checked on delivery
+        payload = json.dumps({
+            'subject': subject,
+            'sender': sender,
+            'recipients': list(recipients),
+            'body': body,
+            'submitter': submitter,
+        })
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                'INSERT INTO outbox (payload, next_attempt, created) VALUES (?, ?, ?)',
+                (payload, now, now))
+            return cur.lastrowid
+
+    def claim(self, limit=10):
+        """Lease up to ``limit`` due messages so other workers skip them."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                rows = conn.execute(
+                    "SELECT id, payload FROM outbox WHERE status = 'pending' AND next_attempt <= ? "
+                    "ORDER BY id LIMIT ?", (now, limit)).fetchall()
+                conn.executemany(
+                    'UPDATE outbox SET next_attempt = ? WHERE id = ?',
+                    [(now + self.lease, row[0]) for row in rows])
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        return [(row[0], json.loads(row[1])) for row in rows]
+
+    def mark_sent(self, message_id):
+        with closing(self._connect()) as conn:
+            conn.execute('DELETE FROM outbox WHERE id = ?', (message_id,))
+
+    def mark_failed(self, message_id, error):
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT attempts FROM outbox WHERE id = ?', (message_id,)).fetchone()
+            if row is None:
+                return
+            attempts = row[0] + 1
+            if attempts >= self.max_attempts:
+                conn.execute(
+                    "UPDATE outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+                    (attempts, error, message_id))
+                logger.error("Giving up on queued mail %s after %s attempts: %s", message_id, attempts, error)
+                return
+            delay = min(self.base_delay * 2 ** (attempts - 1), self.max_delay)
+            conn.execute(
+                'UPDATE outbox SET attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?',
+                (attempts, time.time() + delay, error, message_id))
+            logger.warning("Queued mail %s failed (attempt %s), retrying in %ss: %s",
+                           message_id, attempts, delay, error)
+
+    def counts(self):
+        with closing(self._connect()) as conn:
+            return dict(conn.execute('SELECT status, COUNT(*) FROM outbox GROUP BY status').fetchall())
+
+
+class MailSender:
+    """Background thread that drains a :class:`MailQueue`.
+
+    ``deliver`` is called with the payload dict of each message and should
+    raise on failure. The thread is started lazily and restarted after a
+    fork, so it is safe to create the sender before gunicorn forks workers.
+    """
+
+    def __init__(self, queue, deliver, poll_interval=5, batch_size=10):
+        self.queue = queue
+        self.deliver = deliver
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._wakeup = threading.Event()
+            self._thread = threading.Thread(target=self._run, name='mail-sender', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def notify(self):
+        self.start()
+        self._wakeup.set()
+
+    def run_once(self):
+        sent = 0
+        for message_id, payload in self.queue.claim(self.batch_size):
+            try:
+                self.deliver(payload)
+            except Exception as e:
+                self.queue.mark_failed(message_id, str(e))
+            else:
+                self.queue.mark_sent(message_id)
+                sent += 1
+        if sent:
+            logger.info("Sent %s queued message(s)", sent)
+        return sent
+
+    def _run(self):
+        while True:
+            try:
+                while self.run_once() == self.batch_size:
+                    pass
+            except Exception:
+                logger.exception("Mail sender loop failed")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
@@ -0,0 +1,332 @@
+"""Request timing metrics in the Prometheus text format.
+
+Every worker keeps request counters, latency histograms per endpoint,
+phase timings (template rendering, form validation, SMTP sends, static
+files) and an in-flight gauge in memory; a background thread writes a
+snapshot to METRICS_DIR once a second when something changed, and so
+does /metrics before answering. Any
+worker answering /metrics merges the snapshots of all workers of the same
+server, so a scrape sees the whole server; snapshots can lag by up to a
+second.
+
+Snapshots live in a directory per server, named after the gunicorn
+master's pid and start time, so a restarted server starts from zero even
+if it gets the same pid. When a worker exits, the master's child_exit
+hook folds its snapshot into the server's retired.json and removes it:
+the sums never go backwards and the directory holds one file per live
+worker. Directories of servers that no longer run are removed.
+"""
+import atexit
+import glob
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, abort, g, request
+from flask.signals import before_render_template, template_rendered
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+STATIC_ENDPOINTS = ('static', 'video')
+RETIRED = 'retired.json'
+
+HELP = {
+    'http_requests_total': ('counter', 'Requests by endpoint, method and status'),
+    'http_request_duration_seconds': ('histogram', 'Time to produce the response, by endpoint'),
+    'app_phase_duration_seconds': ('histogram', 'Time spent in template rendering, form validation, '
+                                                'SMTP sends and static file responses'),
+    'http_requests_in_flight': ('gauge', 'Requests being handled, per worker'),
+}
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def process_id(pid):
+    """``pid`` plus its start time, which a later process with the same pid won't share; None if not running."""
+    try:
+        with open(f'/proc/{pid}/stat', encoding='ascii') as f:
+            # The start time is field 22, counting from the pid, and the
+            # command name before it may contain spaces
+            return f"{pid}-{f.read().rsplit(')', 1)[1].split()[19]}"
+    except FileNotFoundError:
+        return None
+    except (OSError, IndexError):
+        # No /proc: the pid alone
+        return str(pid) if _is_alive(pid) else None
+
+
+def _empty():
+    return {'counters': [], 'histograms': [], 'workers': []}
+
+
+def _series(name, labels):
+    if not labels:
+        return name
+    return f"{name}{{{','.join(f'{key}={json.dumps(str(value))}' for key, value in labels)}}}"
+
+
+class Metrics:
+
+    def __init__(self, directory=None, flush_interval=1.0):
+        self.directory = directory or os.environ.get('METRICS_DIR') or \
+            os.path.join(tempfile.gettempdir(), 'espoo-israel-metrics')
+        self.flush_interval = flush_interval
+        # Set by gunicorn.conf.py for workers that import the app themselves;
+        # with preload_app this process is the master
+        self.server = os.environ.get('METRICS_SERVER') or process_id(os.getpid())
+        self.in_flight = 0
+        self._counters = {}
+        self._histograms = {}
+        self._callbacks = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._paused = False
+        self._flusher = None
+        atexit.register(lambda: self._counters and self.flush())
+
+    # Recording
+
+    def inc(self, name, value=1, **labels):
+        if self._paused:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._dirty = True
+
+    def observe(self, name, seconds, **labels):
+        if self._paused:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram['buckets'][i] += 1
+                    break
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+            self._dirty = True
+
+    @contextmanager
+    def timer(self, phase):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('app_phase_duration_seconds', time.perf_counter() - started, phase=phase)
+
+    @contextmanager
+    def paused(self):
+        """Record nothing inside the block, e.g. while warming up before any request."""
+        self._paused = True
+        try:
+            yield
+        finally:
+            self._paused = False
+
+    def describe(self, name, kind, help):
+        HELP[name] = (kind, help)
+
+    def counter(self, name, help, callback):
+        """Export a per-worker running total kept elsewhere, e.g. cache hits."""
+        self.describe(name, 'counter', help)
+        self._callbacks[name] = callback
+
+    # Flask integration
+
+    def init_app(self, app, path='/metrics'):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.add_url_rule(path, 'metrics', self._view)
+        self.token = app.config.get('METRICS_TOKEN')
+
+    def _before_request(self):
+        if self._flusher is None or not self._flusher.is_alive():
+            # Started in the worker rather than at import, so it survives the fork
+            self._flusher = threading.Thread(target=self._flush_periodically, name='metrics-flush', daemon=True)
+            self._flusher.start()
+        g.metrics_started = time.perf_counter()
+        g.metrics_status = 500
+        # Scrapes are left out of the gauge they report
+        g.metrics_in_flight = request.endpoint != 'metrics'
+        if g.metrics_in_flight:
+            with self._lock:
+                self.in_flight += 1
+
+    def _after_request(self, response):
+        g.metrics_status = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        if g.metrics_in_flight:
+            with self._lock:
+                self.in_flight -= 1
+        self.record_request(request.endpoint or 'unmatched', request.method, g.metrics_status,
+                            time.perf_counter() - started)
+
+    def record_request(self, endpoint, method, status, seconds):
+        """Count a request; also used for responses sent before Flask routing."""
+        self.inc('http_requests_total', endpoint=endpoint, method=method, status=status)
+        self.observe('http_request_duration_seconds', seconds, endpoint=endpoint)
+        if endpoint in STATIC_ENDPOINTS:
+            self.observe('app_phase_duration_seconds', seconds, phase='static')
+
+    def _before_render(self, app, template, context, **extra):
+        g.setdefault('metrics_renders', []).append(time.perf_counter())
+
+    def _after_render(self, app, template, context, **extra):
+        renders = g.get('metrics_renders')
+        if renders:
+            self.observe('app_phase_duration_seconds', time.perf_counter() - renders.pop(), phase='render')
+
+    def _view(self):
+        if self.token and request.headers.get('Authorization') != f'Bearer {self.token}':
+            abort(404)
+        self.flush()
+        return Response(self.render(), content_type=CONTENT_TYPE, headers={'Cache-Control': 'no-store'})
+
+    # Snapshots and exposition
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'in_flight': self.in_flight,
+                'counters': [[name, labels, value] for (name, labels), value in self._counters.items()] +
+                            [[name, [], callback()] for name, callback in self._callbacks.items()],
+                'histograms': [[name, labels, dict(h, buckets=list(h['buckets']))]
+                               for (name, labels), h in self._histograms.items()],
+            }
+
+    def _path(self, name=None):
+        return os.path.join(self.directory, self.server, name or f'worker-{os.getpid()}.json')
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval)
+            if self._dirty:
+                self.flush()
+
+    def flush(self):
+        self._dirty = False
+        try:
+            self._write(self._path(), self.snapshot())
+        except OSError:
+            pass
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def retire(self, pid):
+        """Fold the snapshot of worker ``pid``, which has exited, into the server's retired.json.
+
+        Called by the master only (gunicorn's child_exit hook), so the
+        read-modify-write needs no lock.
+        """
+        path = self._path(f'worker-{pid}.json')
+        snapshot = self._read(path)
+        if snapshot is None:
+            return
+        retired = self._read(self._path(RETIRED)) or _empty()
+        counters, histograms, _ = self._merge([retired, snapshot])
+        # Readers skip the listed workers until their file is gone, so a
+        # scrape never counts one twice
+        workers = [worker for worker in retired['workers']
+                   if os.path.exists(self._path(f'worker-{worker}.json'))]
+        try:
+            self._write(self._path(RETIRED), {
+                'counters': [[name, labels, value] for (name, labels), value in counters.items()],
+                'histograms': [[name, labels, h] for (name, labels), h in histograms.items()],
+                'workers': workers + [pid],
+            })
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _snapshots(self):
+        for name in os.listdir(self.directory) if os.path.isdir(self.directory) else []:
+            pid = name.split('-')[0]
+            if name != self.server and pid.isdigit() and process_id(int(pid)) != name:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+        workers = [self._read(path) for path in glob.glob(self._path('worker-*.json'))]
+        # Read after the workers' files: a worker retired in between is
+        # listed in it and left out of the sum above
+        retired = self._read(self._path(RETIRED)) or _empty()
+        return [retired] + [snapshot for snapshot in workers
+                            if snapshot is not None and snapshot['pid'] not in retired['workers']]
+
+    def collect(self):
+        """Merge the snapshots of all workers: ``(counters, histograms, gauges)``."""
+        return self._merge(self._snapshots())
+
+    @staticmethod
+    def _merge(snapshots):
+        counters, histograms, gauges = {}, {}, {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(tuple(label) for label in labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, h in snapshot['histograms']:
+                key = (name, tuple(tuple(label) for label in labels))
+                merged = histograms.setdefault(key, {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0})
+                merged['buckets'] = [a + b for a, b in zip(merged['buckets'], h['buckets'])]
+                merged['sum'] += h['sum']
+                merged['count'] += h['count']
+            # Gauges of workers that exited are meaningless
+            if 'pid' in snapshot and _is_alive(snapshot['pid']):
+                gauges[('http_requests_in_flight', (('pid', str(snapshot['pid'])),))] = snapshot['in_flight']
+        return counters, histograms, gauges
+
+    def render(self):
+        counters, histograms, gauges = self.collect()
+        lines = []
+        for name in sorted({key[0] for key in (*counters, *histograms, *gauges)}):
+            kind, help = HELP.get(name, ('untyped', name))
+            lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}']
+            for (metric, labels), value in sorted({**counters, **gauges}.items()):
+                if metric == name:
+                    lines.append(f'{_series(name, labels)} {value}')
+            for (metric, labels), h in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS, h['buckets']):
+                    cumulative += count
+                    lines.append(f'{_series(name + "_bucket", labels + (("le", bound),))} {cumulative}')
+                lines.append(f'{_series(name + "_bucket", labels + (("le", "+Inf"),))} {h["count"]}')
+                lines.append(f'{_series(name + "_sum", labels)} {h["sum"]:.6f}')
+                lines.append(f'{_series(name + "_count", labels)} {h["count"]}')
+        return '\n'.join(lines) + '\n'
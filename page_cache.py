@@ -0,0 +1,91 @@
+"""In-memory cache of rendered pages for anonymous GET requests.
+
+The public pages render to the same HTML for every visitor, so each
+template is rendered once per language and kept in memory together with a
+strong ETag. An entry is rebuilt when the template file (or another
+registered dependency) changes on disk. Compressed bodies are kept next
+to the rendered HTML, one per Content-Encoding actually requested.
+"""
+import hashlib
+import os
+import threading
+
+from flask import Response, render_template, request, session
+
+from compression import MIN_SIZE, choose_encoding, compress
+
+
+class PageCache:
+
+    def __init__(self, app, dependencies=()):
+        self.app = app
+        # Callables returning a version of other inputs to the rendered
+        # HTML, e.g. the asset manifest that url_for() resolves through
+        self.dependencies = list(dependencies)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _version(self, template):
+        path = os.path.join(self.app.root_path, self.app.template_folder, template)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        return (mtime,) + tuple(dependency() for dependency in self.dependencies)
+
+    def cacheable(self):
+        # Flashed messages are rendered into the page and consumed from the session
+        return request.method in ('GET', 'HEAD') and not session.get('_flashes')
+
+    def _entry(self, template, lang, context):
+        key = (template, lang)
+        version = self._version(template)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        body = render_template(template, **context()).encode('utf-8')
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        entry = (version, body, etag, {})
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def get(self, template, lang, context, encoding=None):
+        """Return ``(body, etag)`` for ``template``, rendering it on a miss.
+
+        ``context`` is a callable returning the template context so that
+        nothing needs to be built when the page is already cached. With an
+        ``encoding`` the body is compressed (once per entry) and gets its own
+        ETag; small pages are always returned uncompressed.
+        """
+        _, body, etag, encoded = self._entry(template, lang, context)
+        if encoding is None or len(body) < MIN_SIZE:
+            return body, etag
+        if encoding not in encoded:
+            # Compressed once per entry, so spend the CPU on the best ratio
+            encoded[encoding] = compress(body, encoding, best=True)
+        return encoded[encoding], f'{etag}-{encoding}'
+
+    def render(self, template, status=200, lang=None, context=dict):
+        """Render ``template`` through the cache as a conditional response."""
+        if not self.cacheable():
+            return Response(render_template(template, **context()), status, mimetype='text/html')
+        encoding = choose_encoding()
+        body, etag = self.get(template, lang, context, encoding)
+        response = Response(body, status, mimetype='text/html')
+        response.vary.add('Accept-Encoding')
+        if encoding is not None and etag.endswith(f'-{encoding}'):
+            response.headers['Content-Encoding'] = encoding
+        if status != 200:
+            return response
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Page weight and critical path budgets for the rendered homepage.
+
+Renders the page through the app (or fetches it from --url), resolves
+every local resource it references (stylesheets and the fonts and images
+they point to, scripts, images and srcset candidates, video sources and
+posters, the favicon) and measures each one as it is sent with
+``Accept-Encoding: br, gzip``. External resources are listed, not fetched.
+Where the browser picks one candidate (srcset, <video> sources) the
+largest is counted, i.e. the widest viewport. Critical bytes are the
+document plus render-blocking local CSS/JS and preloads.
+
+Exits non-zero when a budget is exceeded, a local resource is missing or
+an embed appears twice on the page.
+
+    python page_weight.py
+    python page_weight.py --path /en/ --budget image=800 --budget render_blocking=2
+"""
+import argparse
+import json
+import posixpath
+import re
+import sys
+from collections import Counter
+from urllib.parse import urljoin, urlsplit
+
+from site_client import SiteClient
+
+# Kilobytes per resource type, counts for the rest
+BUDGETS = {
+    'html': 60,
+    'css': 100,
+    'js': 100,
+    'font': 150,
+    'image': 1000,
+    'video': 2500,
+    'total': 4000,
+    'critical': 170,
+    'render_blocking': 6,
+    'external': 20,
+    'duplicate_embeds': 0,
+}
+SIZE_BUDGETS = ('html', 'css', 'js', 'font', 'image', 'video', 'total', 'critical')
+ENCODINGS = {'Accept-Encoding': 'br, gzip'}
+
+TYPES_BY_EXTENSION = {
+    '.css': 'css', '.js': 'js', '.mjs': 'js',
+    '.woff2': 'font', '.woff': 'font', '.ttf': 'font', '.otf': 'font', '.eot': 'font',
+    '.mp4': 'video', '.webm': 'video', '.ogv': 'video',
+}
+PRELOAD_TYPES = {'style': 'css', 'script': 'js', 'font': 'font', 'image': 'image', 'video': 'video'}
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def resource_type(url, default='image'):
+    return TYPES_BY_EXTENSION.get(posixpath.splitext(urlsplit(url).path)[1].lower(), default)
+
+
+def srcset_candidates(srcset):
+    return [candidate.split()[0] for candidate in srcset.split(',') if candidate.strip()]
+
+
+def is_external(url):
+    return bool(urlsplit(url).netloc)
+
+
+def is_render_blocking(tag):
+    in_head = tag.find_parent('head') is not None
+    if tag.name == 'link':
+        return in_head and tag.get('media', 'all') not in ('print', 'not all') and not tag.has_attr('disabled')
+    return in_head and not (tag.has_attr('async') or tag.has_attr('defer') or tag.get('type') == 'module')
+
+
+def references(soup):
+    """Yield ``(group, urls, type, render_blocking, preload)`` for everything the page loads.
+
+    ``urls`` holds the alternatives the browser picks one of.
+    """
+    for link in soup.find_all('link', href=True):
+        # A browser with JS (critical_css.py's async stylesheet) never loads these
+        if link.find_parent('noscript') is not None:
+            continue
+        rel = [value.lower() for value in link.get('rel', [])]
+        if 'stylesheet' in rel:
+            yield 'stylesheet', [link['href']], 'css', is_render_blocking(link), False
+        elif 'preload' in rel:
+            kind = PRELOAD_TYPES.get(link.get('as'), resource_type(link['href']))
+            yield 'preload', [link['href']], kind, False, True
+        elif 'icon' in rel or 'apple-touch-icon' in rel:
+            yield 'icon', [link['href']], 'image', False, False
+    for script in soup.find_all('script', src=True):
+        yield 'script', [script['src']], 'js', is_render_blocking(script), False
+    for img in soup.find_all('img'):
+        urls = srcset_candidates(img.get('srcset', '')) or [img.get('src')]
+        if img.find_parent('picture') is not None:
+            for source in img.find_parent('picture').find_all('source', srcset=True):
+                urls += srcset_candidates(source['srcset'])
+        yield 'img', [url for url in urls if url], 'image', False, False
+    for video in soup.find_all('video'):
+        urls = [source['src'] for source in video.find_all('source', src=True)]
+        if video.get('src'):
+            urls.append(video['src'])
+        if urls:
+            yield 'video', urls, 'video', False, False
+        if video.get('poster'):
+            yield 'poster', [video['poster']], 'image', False, False
+    for tag in soup.find_all(style=True):
+        for _, url in CSS_URL.findall(tag['style']):
+            yield 'inline style', [url], resource_type(url), False, False
+    for style in soup.find_all('style'):
+        for _, url in CSS_URL.findall(style.get_text()):
+            yield 'inline style', [url], resource_type(url), False, False
+
+
+def embeds(soup):
+    """URLs of iframes and embed facades on the page; each should appear once."""
+    urls = [iframe['src'] for iframe in soup.find_all('iframe', src=True)]
+    urls += [tag['data-embed-src'] for tag in soup.find_all(attrs={'data-embed-src': True})]
+    return urls
+
+
+def measure(site, path, kind):
+    """Transfer size of a local resource, or None if it is missing."""
+    if kind == 'video':
+        response = site.head(path)
+        size = int(response.headers.get('Content-Length', 0))
+    else:
+        response = site.get(path, headers=ENCODINGS)
+        size = len(response.content)
+    return size if response.status_code == 200 else None
+
+
+def collect(site, path='/'):
+    """Measure the page at ``path``; return the report checked by ``check()``."""
+    document = site.get(path, headers=ENCODINGS)
+    soup = site.soup(path)
+    resources = {path: {'url': path, 'type': 'html', 'bytes': len(document.content), 'critical': True,
+                        'render_blocking': False, 'from': 'document'}}
+    external = {}
+    missing = []
+
+    def add(url, kind, group, render_blocking=False, critical=False):
+        if is_external(url):
+            entry = external.setdefault(url, {'url': url, 'type': kind, 'host': urlsplit(url).netloc,
+                                              'render_blocking': False, 'from': group})
+            entry['render_blocking'] |= render_blocking
+            return None
+        url = urlsplit(url)._replace(fragment='').geturl()
+        if url in resources:
+            entry = resources[url]
+            entry['render_blocking'] |= render_blocking
+            entry['critical'] |= critical
+            return entry
+        size = measure(site, url, kind)
+        if size is None:
+            missing.append(url)
+            return None
+        entry = resources[url] = {'url': url, 'type': kind, 'bytes': size, 'critical': critical,
+                                  'render_blocking': render_blocking, 'from': group}
+        if kind == 'css':
+            # Fonts and images referenced from local stylesheets
+            for _, ref in CSS_URL.findall(site.get(url).text):
+                if not ref.startswith('data:'):
+                    add(urljoin(url, ref), resource_type(ref), url, critical=critical and resource_type(ref) == 'font')
+        return entry
+
+    for group, urls, kind, render_blocking, preload in references(soup):
+        urls = [urljoin(path, url) if not is_external(url) else url for url in urls]
+        local = [url for url in urls if not is_external(url)]
+        for url in urls:
+            if is_external(url):
+                add(url, kind, group, render_blocking)
+        if len(local) == 1:
+            add(local[0], kind, group, render_blocking, critical=render_blocking or preload)
+        elif local:
+            # Only one candidate is downloaded: count the largest
+            sizes = {url: measure(site, url, kind) for url in dict.fromkeys(local)}
+            missing.extend(url for url, size in sizes.items() if size is None)
+            present = {url: size for url, size in sizes.items() if size is not None}
+            if present:
+                add(max(present, key=present.get), kind, group)
+
+    for url in {tag['data-lazy-script'] for tag in soup.find_all(attrs={'data-lazy-script': True})}:
+        add(url, 'js', 'lazy script')
+    for url in embeds(soup):
+        add(url, 'embed', 'embed')
+
+    duplicates = sorted(url for url, count in Counter(embeds(soup)).items() if count > 1)
+    return {'path': path, 'resources': sorted(resources.values(), key=lambda r: -r['bytes']),
+            'external': sorted(external.values(), key=lambda r: r['url']), 'missing': sorted(set(missing)),
+            'duplicate_embeds': duplicates}
+
+
+def summarize(report):
+    totals = Counter()
+    for resource in report['resources']:
+        totals[resource['type']] += resource['bytes']
+        totals['total'] += resource['bytes']
+        if resource['critical']:
+            totals['critical'] += resource['bytes']
+    render_blocking = [r for r in report['resources'] + report['external'] if r['render_blocking']]
+    summary = {key: totals[key] for key in SIZE_BUDGETS}
+    summary.update(render_blocking=len(render_blocking), external=len(report['external']),
+                   duplicate_embeds=len(report['duplicate_embeds']))
+    return summary
+
+
+def check(report, budgets=BUDGETS):
+    """Return a description of every exceeded budget and broken reference."""
+    summary = summarize(report)
+    problems = []
+    for key, budget in budgets.items():
+        value = summary[key]
+        if key in SIZE_BUDGETS and value > budget * 1024:
+            problems.append(f"{key}: {value / 1024:.0f} KB, budget {budget} KB")
+        elif key not in SIZE_BUDGETS and value > budget:
+            problems.append(f"{key}: {value}, budget {budget}")
+    if summary['duplicate_embeds'] > budgets.get('duplicate_embeds', 0):
+        problems += [f"embedded twice: {url}" for url in report['duplicate_embeds']]
+    problems += [f"missing: {url}" for url in report['missing']]
+    return problems
+
+
+def parse_budget(value):
+    key, _, number = value.partition('=')
+    if key not in BUDGETS or not number.isdigit():
+        raise argparse.ArgumentTypeError(f"expected one of {', '.join(BUDGETS)} = number, got {value!r}")
+    return key, int(number)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='measure a running server instead of the app in-process')
+    parser.add_argument('--path', default='/')
+    parser.add_argument('--budgets', help='JSON file of budgets overriding the defaults')
+    parser.add_argument('--budget', type=parse_budget, action='append', default=[],
+                        help='override one budget, e.g. image=800 (KB) or render_blocking=2')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args()
+
+    budgets = dict(BUDGETS)
+    if args.budgets:
+        with open(args.budgets, encoding='utf-8') as f:
+            budgets.update(json.load(f))
+    budgets.update(args.budget)
+
+    report = collect(SiteClient(args.url), args.path)
+    summary = summarize(report)
+    problems = check(report, budgets)
+    if args.json:
+        print(json.dumps(dict(report, summary=summary, problems=problems), indent=2))
+        sys.exit(1 if problems else 0)
+
+    print(f"⚖️  Page weight of {args.path}")
+    for resource in report['resources']:
+        flags = ' '.join(flag for flag, on in (('critical', resource['critical']),
+                                               ('blocking', resource['render_blocking'])) if on)
+        print(f"   {resource['bytes'] / 1024:>8.1f} KB  {resource['type']:<6} {resource['url']}  {flags}")
+    print(f"\n🌐 External resources ({len(report['external'])}, not measured):")
+    for resource in report['external']:
+        print(f"   {resource['type']:<6} {resource['url']}{'  blocking' if resource['render_blocking'] else ''}")
+    print("\n📊 Budgets:")
+    for key, budget in budgets.items():
+        value = f"{summary[key] / 1024:.0f} KB" if key in SIZE_BUDGETS else summary[key]
+        limit = f"{budget} KB" if key in SIZE_BUDGETS else budget
+        print(f"   {key:<17} {value!s:>9} / {limit}")
+    for problem in problems:
+        print(f"   ❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("   ✅ Within budget")
@@ -0,0 +1,97 @@
+"""Token bucket rate limiting shared by all workers on the host.
+
+Buckets live in a small SQLite database (RATE_LIMIT_PATH, by default in
+the temp directory; a tmpfs path keeps it in memory) so every gunicorn
+worker sees the same counts. The data is disposable: it is written
+without fsync, and buckets that have filled up again are pruned.
+
+Limits are given per scope as ``capacity/seconds``, e.g. ``5/3600`` for
+five requests with one more allowed every 720 seconds. ``0`` or an empty
+string disables the scope.
+"""
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import closing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    full_at REAL NOT NULL
+)
+"""
+PRUNE_EVERY = 100
+
+
+def parse_limit(value):
+    """``'5/3600'`` -> ``(5, 3600.0)``; None when the limit is disabled."""
+    if not value or value.strip() == '0':
+        return None
+    capacity, _, seconds = value.partition('/')
+    capacity, seconds = int(capacity), float(seconds or 1)
+    if capacity <= 0 or seconds <= 0:
+        return None
+    return capacity, seconds
+
+
+class RateLimiter:
+    """Token buckets keyed by scope and client, e.g. ``ip`` and ``email``."""
+
+    def __init__(self, limits, path=None):
+        self.limits = {scope: limit for scope, limit in limits.items() if limit}
+        self.path = path or os.environ.get('RATE_LIMIT_PATH') or \
+            os.path.join(tempfile.gettempdir(), 'espoo-israel-rate-limit.db')
+        self._initialized = None
+        self._hits = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA synchronous=OFF')
+        if self._initialized != self.path:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(SCHEMA)
+            self._initialized = self.path
+        return conn
+
+    def hit(self, now=None, **keys):
+        """Take one token from the bucket of each ``scope=key``.
+
+        Returns 0 when every bucket had a token. Otherwise nothing is taken
+        and the number of seconds until all of them have one is returned.
+        Empty keys and scopes without a limit are ignored.
+        """
+        buckets = [(f'{scope}:{key}',) + self.limits[scope]
+                   for scope, key in keys.items() if key and scope in self.limits]
+        if not buckets:
+            return 0
+        now = time.time() if now is None else now
+        self._hits += 1
+        with closing(self._connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                levels = []
+                for key, capacity, seconds in buckets:
+                    rate = capacity / seconds
+                    row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+                    tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+                    levels.append((key, tokens, capacity, rate))
+                wait = max([(1 - tokens) / rate for _, tokens, _, rate in levels if tokens < 1], default=0)
+                if not wait:
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)',
+                        [(key, tokens - 1, now, now + (capacity - tokens + 1) / rate)
+                         for key, tokens, capacity, rate in levels])
+                if self._hits % PRUNE_EVERY == 0:
+                    conn.execute('DELETE FROM buckets WHERE full_at <= ?', (now,))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        return wait
+
+    def clear(self):
+        with closing(self._connect()) as conn:
+            conn.execute('DELETE FROM buckets')
@@ -0,0 +1,58 @@
+"""Fast 404s for vulnerability scanner traffic.
+
+Bots probe every site for WordPress logins, PHP admin panels, leaked
+dotfiles and backups. None of those exist here, so the WSGI middleware
+answers them with a fixed 404 body before Flask routes the request: no
+hooks, no template, no session, no log line. Hits are only counted per
+rule; the counts are exported through /metrics.
+
+Rules are named regular expressions searched case-insensitively in the
+request path. Extra ones come from SCANNER_PATTERNS (comma separated
+regular expressions).
+"""
+import re
+
+RULES = {
+    'wordpress': r'/(wp-(admin|login|content|includes|json|config)|xmlrpc\.php|wordpress/)',
+    'php': r'\.php[0-9]?$',
+    'dotfiles': r'/\.(env|git|svn|hg|aws|ssh|docker|vscode|idea|ds_store|htaccess|htpasswd)',
+    'admin_panels': r'/(phpmyadmin|myadmin|pma|adminer|manager/html|actuator|solr|boaform|hnap1)(/|$)',
+    'cgi': r'/cgi-bin/',
+    'backups': r'\.(sql|bak|old|orig|swp|tar|tgz|tar\.gz|zip|rar|7z)$',
+    'server_config': r'/(web\.config|server-status|config\.json|vendor/phpunit)',
+}
+NOT_FOUND = b'<!doctype html><html><head><meta charset="utf-8"><title>404 Not Found</title></head>' \
+            b'<body><h1>404 Not Found</h1></body></html>'
+
+
+class ScannerFilter:
+    """WSGI middleware answering requests for known scanner paths with a static 404."""
+
+    def __init__(self, wsgi_app, rules=RULES, extra_patterns=(), on_block=None):
+        self.wsgi_app = wsgi_app
+        rules = dict(rules)
+        rules.update((f'custom_{i}', pattern) for i, pattern in enumerate(extra_patterns))
+        self.pattern = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in rules.items()),
+                                  re.IGNORECASE)
+        self.on_block = on_block
+        self.counts = dict.fromkeys(rules, 0)
+        self.headers = [
+            ('Content-Type', 'text/html; charset=utf-8'),
+            ('Content-Length', str(len(NOT_FOUND))),
+            ('Cache-Control', 'public, max-age=86400'),
+        ]
+
+    def match(self, path):
+        """Name of the rule matching ``path``, or None."""
+        match = self.pattern.search(path)
+        return match.lastgroup if match else None
+
+    def __call__(self, environ, start_response):
+        rule = self.match(environ.get('PATH_INFO', ''))
+        if rule is None:
+            return self.wsgi_app(environ, start_response)
+        self.counts[rule] += 1
+        if self.on_block is not None:
+            self.on_block(rule)
+        start_response('404 Not Found', list(self.headers))
+        return [] if environ.get('REQUEST_METHOD') == 'HEAD' else [NOT_FOUND]
@@ -0,0 +1,118 @@
+"""Shared transport for the e2e and diagnostic scripts.
+
+Without a base URL the requests go through ``app.test_client()`` in this
+process, so the scripts need no running server; with one they go over HTTP
+with ``requests``. Plain GETs are cached and each page is parsed into a
+BeautifulSoup tree only once, so checks that look at the same page share
+the work. ``prefetch()`` and ``run()`` fetch pages and run independent
+checks in a thread pool.
+
+    python test_e2e.py                               # in-process
+    python test_e2e.py --url http://127.0.0.1:5000   # live server
+"""
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import DefaultCookiePolicy
+
+from bs4 import BeautifulSoup
+
+MAX_WORKERS = 8
+
+
+class Response:
+    """The parts of a ``requests`` response the scripts use."""
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+
+class SiteClient:
+    def __init__(self, base_url=None, headers=None):
+        self.base_url = base_url.rstrip('/') if base_url else ''
+        self.headers = dict(headers or {})
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._key_locks = {}
+        if not base_url:
+            from app import app
+            self.app = app
+
+    @property
+    def _client(self):
+        # Cookies are not kept: a language cookie set by one check must not
+        # change what a cached page looks like to the others
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            if self.base_url:
+                import requests
+                client = requests.Session()
+                client.headers.update(self.headers)
+                client.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            else:
+                client = self.app.test_client(use_cookies=False)
+            self._local.client = client
+        return client
+
+    def request(self, method, path, headers=None, data=None, timeout=10):
+        if self.base_url:
+            response = self._client.request(method, self.base_url + path, headers=headers, data=data,
+                                            timeout=timeout)
+            return Response(response.status_code, response.headers, response.content)
+        response = self._client.open(path, method=method, headers={**self.headers, **(headers or {})}, data=data)
+        try:
+            return Response(response.status_code, response.headers, response.get_data())
+        finally:
+            response.close()
+
+    def _once(self, key, factory):
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._cache:
+                value = factory()
+                with self._lock:
+                    self._cache[key] = value
+        return self._cache[key]
+
+    def get(self, path='/', headers=None, timeout=10):
+        """GET ``path``; without extra headers the response is cached."""
+        if headers:
+            return self.request('GET', path, headers=headers, timeout=timeout)
+        return self._once(('GET', path), lambda: self.request('GET', path, timeout=timeout))
+
+    def head(self, path, headers=None):
+        return self.request('HEAD', path, headers=headers)
+
+    def post(self, path, data):
+        return self.request('POST', path, data=data)
+
+    def soup(self, path='/'):
+        """The parsed page at ``path``; parsed once and shared, so do not modify it."""
+        return self._once(('soup', path), lambda: BeautifulSoup(self.get(path).text, 'html.parser'))
+
+    def prefetch(self, *paths):
+        """Fetch pages in parallel ahead of the checks that read them."""
+        self.run([lambda path=path: self.get(path) for path in paths])
+
+    def run(self, checks):
+        """Run independent callables in parallel; return their results in order."""
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            return list(pool.map(lambda check: check(), checks))
+
+    @classmethod
+    def from_args(cls, description=None, headers=None):
+        """Build a client from ``--url`` on the command line."""
+        parser = argparse.ArgumentParser(description=description)
+        parser.add_argument('--url', help='test a running server, e.g. http://127.0.0.1:5000; '
+                                          'by default the app runs in-process')
+        return cls(parser.parse_args().url, headers)
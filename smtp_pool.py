@@ -0,0 +1,114 @@
+"""Persistent, authenticated SMTP session for the background mail sender.
+
+Opening an SMTP_SSL connection and logging in costs several round trips, so
+the sender keeps one session per worker process and reuses it for every
+queued message. Sessions that have been idle for a while are checked with
+NOOP before use and replaced if the server has dropped them.
+"""
+import logging
+import os
+import smtplib
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPPool:
+    """One reusable SMTP session per process, configured from ``config``.
+
+    ``config`` is read on every (re)connect using the Flask-Mail keys
+    (``MAIL_SERVER``, ``MAIL_PORT``, ``MAIL_USE_SSL``, ...), so changes to
+    the app config take effect with the next session.
+    """
+
+    def __init__(self, config, check_after=10, max_idle=120, max_messages=100, timeout=30):
+        self.config = config
+        self.check_after = check_after
+        self.max_idle = max_idle
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self.stats = {'connects': 0, 'messages_sent': 0, 'stale_sessions': 0, 'failures': 0}
+        self._lock = threading.Lock()
+        self._smtp = None
+        self._pid = None
+        self._last_used = 0
+        self._session_messages = 0
+
+    def _connect(self):
+        config = self.config
+        host, port = config['MAIL_SERVER'], config['MAIL_PORT']
+        if config.get('MAIL_USE_SSL'):
+            smtp = smtplib.SMTP_SSL(host, port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(host, port, timeout=self.timeout)
+        if config.get('MAIL_USE_TLS'):
+            smtp.starttls()
+        if config.get('MAIL_USERNAME') and config.get('MAIL_PASSWORD'):
+            smtp.login(config['MAIL_USERNAME'], config['MAIL_PASSWORD'])
+        self.stats['connects'] += 1
+        self._session_messages = 0
+        logger.info("Opened SMTP session to %s:%s (connects=%s, messages_sent=%s)",
+                    host, port, self.stats['connects'], self.stats['messages_sent'])
+        return smtp
+
+    def _discard(self):
+        if self._smtp is not None and self._pid == os.getpid():
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self._smtp.close()
+        self._smtp = None
+
+    def _close_broken(self):
+        # No QUIT on a session the server dropped; just release the socket
+        if self._smtp is not None:
+            try:
+                self._smtp.close()
+            except OSError:
+                pass
+        self._smtp = None
+
+    def _session(self):
+        # Never reuse a socket inherited from the parent process
+        if self._pid != os.getpid():
+            self._smtp = None
+            self._pid = os.getpid()
+        if self._smtp is not None:
+            idle = time.monotonic() - self._last_used
+            if idle > self.max_idle or self._session_messages >= self.max_messages:
+                self._discard()
+            elif idle > self.check_after:
+                try:
+                    alive = self._smtp.noop()[0] == 250
+                except (smtplib.SMTPException, OSError):
+                    alive = False
+                if not alive:
+                    self.stats['stale_sessions'] += 1
+                    self._close_broken()
+        if self._smtp is None:
+            self._smtp = self._connect()
+        return self._smtp
+
+    def send(self, from_addr, to_addrs, data, mail_options=(), rcpt_options=()):
+        with self._lock:
+            try:
+                try:
+                    self._session().sendmail(from_addr, to_addrs, data, mail_options, rcpt_options)
+                except (smtplib.SMTPServerDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                    # The server closed the session between NOOP and send, retry once
+                    logger.info("SMTP session dropped (%s), reconnecting", e)
+                    self.stats['stale_sessions'] += 1
+                    self._close_broken()
+                    self._session().sendmail(from_addr, to_addrs, data, mail_options, rcpt_options)
+            except Exception:
+                self.stats['failures'] += 1
+                self._discard()
+                raise
+            self.stats['messages_sent'] += 1
+            self._session_messages += 1
+            self._last_used = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            self._discard()
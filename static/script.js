@@ -1,65 +1,13 @@
 // Simple working JavaScript for Espoo-Israel website
 
 // Language Toggle Functionality
-let currentLanguage = 'fi';
-
+// Pages are rendered in one language on the server; toggling loads the
+// other language's URL, which also remembers the choice in a cookie.
 function toggleLanguage() {
-    console.log('Toggle language called, current:', currentLanguage);
-    currentLanguage = currentLanguage === 'fi' ? 'en' : 'fi';
-    console.log('New language:', currentLanguage);
-    updateLanguage();
-    updateLanguageButton();
-    localStorage.setItem('preferredLanguage', currentLanguage);
-}
-
-function updateLanguage() {
-    console.log('Updating language to:', currentLanguage);
-    const elements = document.querySelectorAll('[data-fi][data-en]');
-    console.log('Found elements with language data:', elements.length);
-
-    elements.forEach(element => {
-        if (currentLanguage === 'fi') {
-            element.textContent = element.getAttribute('data-fi');
-        } else {
-            element.textContent = element.getAttribute('data-en');
-        }
-    });
-
-    // Update select field options
-    const joinSelect = document.querySelector('select[name="join"]');
-    if (joinSelect) {
-        const options = joinSelect.querySelectorAll('option');
-        options.forEach(option => {
-            if (option.value === 'kyllä') {
-                option.textContent = currentLanguage === 'fi' ? 'Kyllä' : 'Yes';
-            } else if (option.value === 'ei') {
-                option.textContent = currentLanguage === 'fi' ? 'Ei' : 'No';
-            }
-        });
-    }
-}
-
-function updateLanguageButton() {
     const langToggle = document.getElementById('langToggle');
-    if (!langToggle) {
-        console.error('Language toggle button not found!');
-        return;
-    }
-
-    const flagIcon = langToggle.querySelector('.flag-icon');
-    if (!flagIcon) {
-        console.error('Flag icon not found!');
-        return;
-    }
-
-    if (currentLanguage === 'fi') {
-        flagIcon.textContent = '🇫🇮';
-        langToggle.setAttribute('title', 'Switch to English');
-    } else {
-        flagIcon.textContent = '🇺🇸';
-        langToggle.setAttribute('title', 'Vaihda suomeksi');
+    if (langToggle && langToggle.dataset.href) {
+        window.location.href = langToggle.dataset.href + window.location.hash;
     }
-    console.log('Language button updated to:', flagIcon.textContent);
 }
 
 // Movie Popup Functions
@@ -94,6 +42,67 @@ function showMoviePopupManual() {
     }
 }
 
+// Third-party embeds (templates/embeds.html)
+// A facade is replaced by the real iframe when clicked, and scripts named
+// in data-lazy-script load once their element comes near the viewport.
+function activateEmbed(facade) {
+    if (facade.classList.contains('embed-active')) return;
+    const iframe = document.createElement('iframe');
+    iframe.src = facade.dataset.embedSrc;
+    iframe.title = facade.dataset.embedTitle;
+    iframe.allow = facade.dataset.embedAllow;
+    iframe.allowFullscreen = true;
+    facade.replaceChildren(iframe);
+    facade.classList.add('embed-active');
+}
+
+// A facade link plays the facade it points to, where that one is
+function playLinkedEmbed(event, link) {
+    const target = document.getElementById(link.dataset.embedTarget);
+    if (!target) return;
+    event.preventDefault();
+    // The popup would cover the video
+    if (link.closest('#moviePopup')) closeMoviePopup();
+    target.scrollIntoView({ behavior: 'smooth', block: 'center' });
+    activateEmbed(target);
+}
+
+const loadedScripts = new Set();
+
+function loadScript(src) {
+    if (loadedScripts.has(src)) return;
+    loadedScripts.add(src);
+    const script = document.createElement('script');
+    script.src = src;
+    script.async = true;
+    document.body.appendChild(script);
+}
+
+function initEmbeds() {
+    document.querySelectorAll('.embed-facade').forEach(facade => {
+        if (facade.dataset.embedTarget) {
+            facade.addEventListener('click', event => playLinkedEmbed(event, facade));
+        } else {
+            facade.addEventListener('click', () => activateEmbed(facade), { once: true });
+        }
+    });
+
+    const lazy = document.querySelectorAll('[data-lazy-script]');
+    if (!('IntersectionObserver' in window)) {
+        lazy.forEach(element => loadScript(element.dataset.lazyScript));
+        return;
+    }
+    const observer = new IntersectionObserver(entries => {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                loadScript(entry.target.dataset.lazyScript);
+                observer.unobserve(entry.target);
+            }
+        });
+    }, { rootMargin: '300px' });
+    lazy.forEach(element => observer.observe(element));
+}
+
 // Mobile-First Hero Video Management
 function initHeroVideo() {
     const heroVideo = document.querySelector('.hero-video');
@@ -194,6 +203,17 @@ function initHeroVideo() {
     });
 }
 
+// Contact form: report the seconds spent on the page, which the server
+// uses to tell people from bots posting the form straight away
+function initContactForm() {
+    const field = document.querySelector('form input[name="fill_time"]');
+    if (field) {
+        field.form.addEventListener('submit', function () {
+            field.value = Math.round(performance.now() / 1000);
+        });
+    }
+}
+
 // Make functions globally available
 window.toggleLanguage = toggleLanguage;
 window.closeMoviePopup = closeMoviePopup;
@@ -203,30 +223,25 @@ window.showMoviePopupManual = showMoviePopupManual;
 document.addEventListener('DOMContentLoaded', function () {
     console.log('DOM loaded, initializing...');
 
-    // Initialize language
-    const savedLanguage = localStorage.getItem('preferredLanguage');
-    if (savedLanguage) {
-        currentLanguage = savedLanguage;
+    // Language toggle
+    const langToggle = document.getElementById('langToggle');
+    if (langToggle) {
+        langToggle.addEventListener('click', function (e) {
+            e.preventDefault();
+            toggleLanguage();
+        });
+        console.log('Language toggle event listener added');
     }
 
-    setTimeout(() => {
-        updateLanguage();
-        updateLanguageButton();
-
-        // Add language toggle event listener
-        const langToggle = document.getElementById('langToggle');
-        if (langToggle) {
-            langToggle.addEventListener('click', function (e) {
-                e.preventDefault();
-                toggleLanguage();
-            });
-            console.log('Language toggle event listener added');
-        }
-    }, 100);
-
     // Initialize hero video
     initHeroVideo();
 
+    // Embeds behind facades
+    initEmbeds();
+
+    // Contact form spam check
+    initContactForm();
+
     // Initialize popup
     showMoviePopup();
 
@@ -0,0 +1,215 @@
+"""Static files served from an in-memory index, ahead of Flask routing.
+
+At startup (app.warm_up(), or else the first static request) every file
+under static/ is read once. The index records its size, a content-hash
+ETag, the MIME type, Last-Modified and the .br/.gz siblings written by
+the builds. Small files are kept in memory. Larger
+ones (images, videos) are sent from disk with the server's
+``wsgi.file_wrapper``, i.e. ``sendfile`` under gunicorn. Requests for
+indexed files are answered by the WSGI middleware without stats, Flask
+request contexts or hooks. Conditional requests, single byte ranges and
+HEAD are supported.
+
+Files added after startup are not in the index and still go through
+Flask's static view; changed files are picked up on the next restart
+(or ``StaticIndex.build()``), like the rest of a deploy.
+"""
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from werkzeug.http import http_date, is_resource_modified, parse_accept_header, parse_range_header
+
+from compression import ENCODINGS, SUFFIXES
+
+CHUNK_SIZE = 256 * 1024
+# Files up to this size are kept in memory
+MEMORY_LIMIT = 256 * 1024
+
+
+class StaticFile:
+
+    def __init__(self, path, data, mimetype, last_modified, etag):
+        self.path = path
+        self.size = len(data)
+        self.mimetype = mimetype
+        self.last_modified = last_modified
+        self.etag = etag
+        self.body = data if self.size <= MEMORY_LIMIT else None
+
+    def iter_range(self, start, end):
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+
+class StaticEntry:
+    """A file and its precompressed variants by Content-Encoding."""
+
+    def __init__(self, name, file, variants):
+        self.name = name
+        self.file = file
+        self.variants = variants
+        self.encodings = tuple(encoding for encoding in ENCODINGS if encoding in variants)
+
+
+class StaticIndex:
+    """Every file under ``directory``, by its path relative to it."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._entries = None
+        self._lock = threading.Lock()
+
+    @property
+    def entries(self):
+        # Built on first use so that importing the app stays quick
+        if self._entries is None:
+            with self._lock:
+                if self._entries is None:
+                    self.build()
+        return self._entries
+
+    def _load(self, path, mimetype):
+        with open(path, 'rb') as f:
+            data = f.read()
+        mtime = os.stat(path).st_mtime
+        etag = hashlib.blake2b(data, digest_size=16).hexdigest()
+        return StaticFile(path, data, mimetype, datetime.fromtimestamp(int(mtime), timezone.utc), etag)
+
+    def build(self):
+        entries = {}
+        compressed = tuple(SUFFIXES.values())
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, self.directory).replace(os.sep, '/')
+                if name.endswith(compressed) and os.path.isfile(path[:-len(os.path.splitext(path)[1])]):
+                    continue
+                mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                if mimetype.startswith('text/') or mimetype == 'application/javascript':
+                    mimetype += '; charset=utf-8'
+                file = self._load(path, mimetype)
+                variants = {}
+                for encoding, suffix in SUFFIXES.items():
+                    if os.path.isfile(path + suffix):
+                        variant = self._load(path + suffix, mimetype)
+                        variant.etag = f'{file.etag}-{encoding}'
+                        variants[encoding] = variant
+                entries[name] = StaticEntry(name, file, variants)
+        self._entries = entries
+
+    def get(self, name):
+        return self.entries.get(name)
+
+
+class StaticMiddleware:
+    """WSGI middleware answering GET/HEAD under ``prefix`` from a StaticIndex.
+
+    ``cache_control(name)`` gives the Cache-Control header of a file and
+    ``on_serve(method, status, seconds)`` is called after each response.
+    Anything not in the index goes on to ``wsgi_app``.
+    """
+
+    def __init__(self, wsgi_app, index, prefix='/static/', cache_control=None, on_serve=None):
+        self.wsgi_app = wsgi_app
+        self.index = index
+        self.prefix = prefix
+        self.cache_control = cache_control or (lambda name: 'no-cache')
+        self.on_serve = on_serve
+        self._cache_headers = {}
+        self.served = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        method = environ.get('REQUEST_METHOD')
+        if not path.startswith(self.prefix) or method not in ('GET', 'HEAD'):
+            return self.wsgi_app(environ, start_response)
+        entry = self.index.get(path[len(self.prefix):])
+        if entry is None:
+            return self.wsgi_app(environ, start_response)
+
+        started = time.perf_counter()
+        status, headers, body = self.respond(environ, entry)
+        start_response(status, headers)
+        with self._lock:
+            self.served += 1
+        if self.on_serve is not None:
+            self.on_serve(method, int(status[:3]), time.perf_counter() - started)
+        return [] if method == 'HEAD' else body
+
+    def respond(self, environ, entry):
+        """``(status, headers, body)`` for ``entry`` and the request in ``environ``."""
+        encoding = None
+        if entry.encodings:
+            encoding = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING')).best_match(entry.encodings)
+        file = entry.variants[encoding] if encoding else entry.file
+
+        headers = [
+            ('Content-Type', file.mimetype),
+            ('ETag', f'"{file.etag}"'),
+            ('Last-Modified', http_date(file.last_modified)),
+            ('Cache-Control', self._cache_header(entry.name)),
+        ]
+        if entry.encodings:
+            headers.append(('Vary', 'Accept-Encoding'))
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        else:
+            headers.append(('Accept-Ranges', 'bytes'))
+        if not is_resource_modified(environ, etag=file.etag, last_modified=file.last_modified):
+            return '304 Not Modified', headers, []
+
+        start, end = 0, file.size
+        status = '200 OK'
+        if encoding is None and 'HTTP_RANGE' in environ and self._if_range_matches(environ, file):
+            byte_range = parse_range_header(environ['HTTP_RANGE'])
+            # Multiple ranges are answered with the whole file, which HTTP allows
+            if byte_range is not None and len(byte_range.ranges) == 1:
+                bounds = byte_range.range_for_length(file.size)
+                if bounds is None:
+                    headers.append(('Content-Range', f'bytes */{file.size}'))
+                    headers.append(('Content-Length', '0'))
+                    return '416 Range Not Satisfiable', headers, []
+                start, end = bounds
+                status = '206 Partial Content'
+                headers.append(('Content-Range', f'bytes {start}-{end - 1}/{file.size}'))
+        headers.append(('Content-Length', str(end - start)))
+
+        if file.body is not None:
+            body = [file.body[start:end] if status.startswith('206') else file.body]
+        elif 'wsgi.file_wrapper' in environ and environ.get('REQUEST_METHOD') != 'HEAD':
+            # The server sends Content-Length bytes from the current position,
+            # with sendfile where it can
+            f = open(file.path, 'rb')
+            f.seek(start)
+            body = environ['wsgi.file_wrapper'](f, CHUNK_SIZE)
+        else:
+            body = file.iter_range(start, end)
+        return status, headers, body
+
+    def _cache_header(self, name):
+        # Worked out once per file: a name is fingerprinted or it is not
+        header = self._cache_headers.get(name)
+        if header is None:
+            header = self._cache_headers[name] = self.cache_control(name)
+        return header
+
+    def _if_range_matches(self, environ, file):
+        if_range = environ.get('HTTP_IF_RANGE', '').strip()
+        if not if_range:
+            return True
+        if if_range.startswith(('"', 'W/')):
+            # Strong comparison: a weak ETag never matches
+            return if_range == f'"{file.etag}"'
+        return if_range == http_date(file.last_modified)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Testaa staattisten tiedostojen build-vaihe ja sormenjäljellä varustetut URLit
+"""
+
+import os
+import shutil
+
+import build_assets
+from app import app, asset_manifest, page_cache
+
+
+def make_static(tmp_path):
+    static = tmp_path / 'static'
+    static.mkdir()
+    shutil.copy(os.path.join(app.static_folder, 'script.js'), static / 'script.js')
+    (static / 'style.css').write_text(
+        "/* kommentti */\n.hero-fallback-bg {\n    background: url('images/hero.jpg');\n    content: 'a: b';\n}\n"
+        "div :not(.x) { color: red; }\n", encoding='utf-8')
+    return static
+
+
+def test_build_minifies_and_fingerprints(tmp_path):
+    """Testaa että build tuottaa minifioidut tiedostot ja manifestin"""
+    static = make_static(tmp_path)
+    manifest, _ = build_assets.build(str(static))
+
+    css_name = manifest['style.css']
+    assert css_name.startswith('dist/style.') and css_name.endswith('.css')
+    css = (static / css_name).read_text(encoding='utf-8')
+    assert 'kommentti' not in css
+    assert "url('../images/hero.jpg')" in css
+    assert "content:'a: b'" in css
+    assert 'div :not(.x){color:red}' in css
+
+    js = (static / manifest['script.js']).read_text(encoding='utf-8')
+    assert 'function toggleLanguage()' in js
+    assert '// ' not in js
+
+    # Uudelleenbuildaus samasta lähteestä tuottaa saman nimen
+    assert build_assets.build(str(static))[0] == manifest
+
+
+def test_url_for_resolves_through_manifest(tmp_path, monkeypatch):
+    """Testaa että sivu viittaa sormenjäljellisiin tiedostoihin ja ne välimuistitetaan vuodeksi"""
+    static = make_static(tmp_path)
+    manifest, _ = build_assets.build(str(static))
+    monkeypatch.setattr(app, 'static_folder', str(static))
+    monkeypatch.setattr(asset_manifest, 'path', str(static / 'dist' / 'manifest.json'))
+    page_cache.clear()
+
+    client = app.test_client()
+    html = client.get('/fi/').get_data(as_text=True)
+    assert f"/static/{manifest['style.css']}" in html
+    assert f"/static/{manifest['script.js']}" in html
+
+    response = client.get(f"/static/{manifest['style.css']}")
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+    plain = client.get('/static/style.css')
+    assert 'immutable' not in plain.headers.get('Cache-Control', '')
+    page_cache.clear()
+
+
+def test_static_files_without_manifest(tmp_path, monkeypatch):
+    """Testaa että ilman buildia tiedostot palvellaan alkuperäisillä nimillä"""
+    monkeypatch.setattr(asset_manifest, 'path', str(tmp_path / 'puuttuu.json'))
+    client = app.test_client()
+    response = client.get('/static/style.css')
+    assert response.status_code == 200
+    assert 'immutable' not in response.headers.get('Cache-Control', '')
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Testaa kuormitustestin tilastot ja regressiovertailun
+"""
+
+import benchmark
+
+
+def test_percentile_uses_nearest_rank():
+    """Testaa että persentiilit lasketaan lähimmän sijan menetelmällä"""
+    values = [i / 1000 for i in range(1, 101)]
+    assert benchmark.percentile(values, 50) == 0.05
+    assert benchmark.percentile(values, 95) == 0.095
+    assert benchmark.percentile(values, 99) == 0.099
+    assert benchmark.percentile([0.2], 99) == 0.2
+    assert benchmark.percentile([], 50) == 0.0
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    """Testaa että läpäisykyvyn, p95-viiveen ja virheiden heikkeneminen huomataan"""
+    baseline = {
+        'home@4': {'rps': 800, 'p95_ms': 8.0, 'error_rate': 0.0},
+        'static@4': {'rps': 700, 'p95_ms': 8.0, 'error_rate': 0.0},
+    }
+    within = {
+        'home@4': {'rps': 700, 'p95_ms': 9.0, 'error_rate': 0.0},
+        'static@4': {'rps': 900, 'p95_ms': 5.0, 'error_rate': 0.0},
+        'form_post@4': {'rps': 1, 'p95_ms': 999.0, 'error_rate': 0.5},
+    }
+    assert benchmark.compare(within, baseline, 0.2) == []
+
+    worse = {
+        'home@4': {'rps': 600, 'p95_ms': 8.0, 'error_rate': 0.0},
+        'static@4': {'rps': 700, 'p95_ms': 10.0, 'error_rate': 0.05},
+    }
+    regressions = benchmark.compare(worse, baseline, 0.2)
+    assert len(regressions) == 3
+    assert any(r.startswith('home@4') and 'rps' in r for r in regressions)
+    assert any(r.startswith('static@4') and 'p95' in r for r in regressions)
+    assert any(r.startswith('static@4') and 'error rate' in r for r in regressions)
+
+    # Yksikin pudonnut pyyntö yli perustason on regressio
+    dropped = {'home@4': {'rps': 800, 'p95_ms': 8.0, 'error_rate': 0.0003}}
+    assert benchmark.compare(dropped, baseline, 0.2) == ['home@4: error rate 0.0003, baseline 0.0']
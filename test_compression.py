@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Testaa valmiiksi pakattujen tiedostojen ja HTML-sivujen Content-Encoding-neuvottelu
+"""
+
+import gzip
+
+import pytest
+
+import build_assets
+from app import app, asset_manifest, page_cache
+from test_assets import make_static
+
+
+def test_static_files_use_precompressed_siblings(tmp_path, monkeypatch):
+    """Testaa että buildatut tiedostot palvellaan .br/.gz-versioina Accept-Encodingin mukaan"""
+    static = make_static(tmp_path)
+    manifest, _ = build_assets.build(str(static))
+    monkeypatch.setattr(app, 'static_folder', str(static))
+    monkeypatch.setattr(asset_manifest, 'path', str(static / 'dist' / 'manifest.json'))
+    client = app.test_client()
+    url = f"/static/{manifest['style.css']}"
+    original = (static / manifest['style.css']).read_bytes()
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype == 'text/css'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert 'immutable' in response.headers['Cache-Control']
+    assert gzip.decompress(response.data) == original
+
+    identity = client.get(url)
+    assert 'Content-Encoding' not in identity.headers
+    assert identity.data == original
+    assert identity.headers['ETag'] != response.headers['ETag']
+
+    brotli = pytest.importorskip('brotli')
+    response = client.get(url, headers={'Accept-Encoding': 'gzip, deflate, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data) == original
+
+
+def test_cached_page_is_compressed_once():
+    """Testaa että välimuistitettu sivu pakataan kerran ja 304 toimii pakatulle ETagille"""
+    page_cache.clear()
+    client = app.test_client()
+    plain = client.get('/fi/')
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    first = client.get('/fi/', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(first.data) == plain.data
+    assert len(first.data) < len(plain.data) // 3
+    assert first.headers['ETag'] != plain.headers['ETag']
+
+    second = client.get('/fi/', headers={'Accept-Encoding': 'gzip'})
+    assert second.data == first.data
+
+    not_modified = client.get('/fi/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+    assert not_modified.status_code == 304
+
+
+def test_uncached_html_is_compressed_on_the_fly():
+    """Testaa että välimuistin ohittavat vastaukset (esim. virheellinen lomake) pakataan"""
+    client = app.test_client()
+    response = client.post('/fi/', data={'name': '', 'fill_time': '10'}, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert b'<html' in gzip.decompress(response.data)
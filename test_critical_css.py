@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Testaa style.css:n käyttämättömien sääntöjen karsinnan ja ensimmäisen näkymän CSS:n upotuksen
+"""
+
+import shutil
+
+import build_assets
+import critical_css
+from app import app, asset_manifest, critical_manifest, page_cache
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>x</title></head>
+<body>
+    <nav class="navbar"><a href="#below">Alas</a></nav>
+    <!-- fold -->
+    <section id="below" class="below">Alempana</section>
+</body></html>
+"""
+STYLE = """
+.navbar { background: url('images/bg.jpg'); animation: slide 1s; }
+.navbar.open { color: red; }
+.below { color: blue; }
+#below { margin: 0; }
+.unused { color: green; }
+@keyframes slide { from { opacity: 0; } }
+@keyframes unused-spin { to { transform: rotate(1turn); } }
+@media (max-width: 768px) { .navbar { padding: 0; } .below { padding: 0; } }
+"""
+
+
+def test_purge_and_first_screen(tmp_path):
+    """Testaa että karsittu tyylitiedosto ja sivukohtainen kriittinen CSS sisältävät oikeat säännöt"""
+    (tmp_path / 'templates').mkdir()
+    (tmp_path / 'templates' / 'page.html').write_text(PAGE, encoding='utf-8')
+    static = tmp_path / 'static'
+    static.mkdir()
+    (static / 'style.css').write_text(STYLE, encoding='utf-8')
+    (static / 'script.js').write_text("nav.classList.add('open');\n", encoding='utf-8')
+
+    manifest, report = critical_css.build(str(static), str(tmp_path / 'templates'), ['page.html'],
+                                          {'page.html': [PAGE]})
+    assert manifest == {'stylesheet': 'critical/style.css', 'templates': {'page.html': 'critical/page.css'}}
+    purged = (static / 'critical' / 'style.css').read_text(encoding='utf-8')
+    assert '.navbar.open' in purged and '.below' in purged and "url('../images/bg.jpg')" in purged
+    assert '.unused' not in purged and 'unused-spin' not in purged
+
+    inline = (static / 'critical' / 'page.css').read_text(encoding='utf-8')
+    assert "url('/static/images/bg.jpg')" in inline and '@keyframes slide' in inline
+    assert '@media (max-width: 768px){.navbar' in inline
+    # Linkki #below-kohtaan ei tuo alemman osion tyylejä, eikä JS:n lisäämä luokka kuulu alkutilaan
+    assert '.below' not in inline and '#below' not in inline and '.open' not in inline
+    (_, (original, _), (purged_size, _), _), page = report[0], report[1]
+    assert page[0] == 'page.html' and page[3][0] < purged_size < original
+
+
+def test_rendered_markup_counts(tmp_path):
+    """Testaa että lomakkeen kentät ja makrojen tuottamat luokat huomataan renderöidystä sivusta"""
+    static = tmp_path / 'static'
+    static.mkdir()
+    for name in ('style.css', 'script.js'):
+        shutil.copy(f'{app.static_folder}/{name}', static / name)
+    critical_css.build(str(static))
+    # WTForms tuottaa viestikentän <textarea>-elementin Pythonissa, ei mallipohjassa
+    assert 'textarea{' in (static / 'critical' / 'style.css').read_text(encoding='utf-8')
+    # embeds.html-makrojen luokat ovat ensimmäisessä näkymässä
+    inline = (static / 'critical' / 'index.css').read_text(encoding='utf-8')
+    assert '.embed-facade{' in inline and '.embed-play{' in inline
+
+
+def test_pages_inline_critical_css(tmp_path, monkeypatch):
+    """Testaa että sivu upottaa kriittisen CSS:n ja lataa karsitun tyylitiedoston estämättä renderöintiä"""
+    static = tmp_path / 'static'
+    static.mkdir()
+    for name in ('style.css', 'script.js'):
+        shutil.copy(f'{app.static_folder}/{name}', static / name)
+    critical_css.build(str(static))
+    manifest, _ = build_assets.build(str(static))
+    monkeypatch.setattr(app, 'static_folder', str(static))
+    monkeypatch.setattr(asset_manifest, 'path', str(static / 'dist' / 'manifest.json'))
+    monkeypatch.setattr(critical_manifest, 'path', str(static / 'critical' / 'manifest.json'))
+    monkeypatch.setattr(critical_manifest, 'static_folder', str(static))
+    page_cache.clear()
+
+    client = app.test_client()
+    html = client.get('/fi/').get_data(as_text=True)
+    stylesheet = f"/static/{manifest['critical/style.css']}"
+    assert '<style>' in html and '.hero-content' in html
+    assert f'<link rel="preload" href="{stylesheet}" as="style"' in html
+    assert f'<noscript><link rel="stylesheet" href="{stylesheet}"></noscript>' in html
+    assert f"/static/{manifest['style.css']}" not in html
+
+    thanks = client.get('/fi/thank_you').get_data(as_text=True)
+    assert f'href="{stylesheet}"' in thanks and '.hero-content' not in thanks
+    assert client.get(stylesheet).status_code == 200
+    page_cache.clear()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Testaa build-vaiheiden yhteiset CSS-työkalut: jäsennys, valitsimet ja url-osoitteet
+"""
+
+import css_tools
+
+
+def test_selector_matching():
+    """Testaa että säilytetään vain säännöt joiden kaikki luokat ovat käytössä"""
+    names = {'btn', 'container', 'fa-2x', 'a'}
+    assert css_tools.selector_used('.btn:not(.disabled):hover', names)
+    assert css_tools.selector_used('.container > a[href]::after', names)
+    assert css_tools.selector_used(':root', names)
+    assert not css_tools.selector_used('.btn .table', names)
+    assert not css_tools.selector_used('table', names)
+    assert css_tools.selector_names('#hero .btn:is(.a, .b) > a[href]') == [('#', 'hero'), ('.', 'btn'), ('', 'a')]
+    assert css_tools.split_selectors('a, .b:is(.c, .d), [data-x="1,2"]') == ['a', '.b:is(.c, .d)', '[data-x="1,2"]']
+
+
+def test_parse_and_serialize_round_trip():
+    """Testaa että säännöt, ryhmittelevät at-säännöt ja merkkijonot säilyvät jäsennyksessä"""
+    source = '@charset "UTF-8";\n/* kommentti */\n.a{content:"}{"}\n@media (min-width:576px){.b{color:red}}\n'
+    nodes = css_tools.parse_css(source)
+    assert nodes == [('@charset "UTF-8"', None), ('.a', 'content:"}{"'),
+                     ('@media (min-width:576px)', [('.b', 'color:red')])]
+    assert css_tools.parse_css(css_tools.serialize(nodes)) == nodes
+    assert list(css_tools.walk(nodes))[-1] == ('.b', 'color:red')
+
+
+def test_minify_and_rebase_urls():
+    """Testaa minimoinnin ja suhteellisten url-osoitteiden siirron toiseen hakemistoon"""
+    minified = css_tools.minify_css('a :hover {\n  color: red;\n  content: "a  b";\n}\n')
+    assert minified == 'a :hover{color:red;content:"a  b"}'
+    css = 'a{background:url("img/x.png")}b{background:url(/abs.png)}'
+    assert css_tools.rebase_css_urls(css, 'style.css', 'dist/style.123.css') == \
+        'a{background:url("../img/x.png")}b{background:url(/abs.png)}'
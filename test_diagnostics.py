@@ -3,22 +3,20 @@
 Yksityiskohtainen diagnostiikka JavaScript-toiminnallisuudelle
 """
 
-import requests
 import re
-from bs4 import BeautifulSoup
+
+from site_client import SiteClient
 
 class DiagnosticTester:
-    def __init__(self, base_url="http://127.0.0.1:5000"):
-        self.base_url = base_url
-        self.session = requests.Session()
+    def __init__(self, base_url=None, site=None):
+        self.site = site or SiteClient(base_url)
         
     def analyze_javascript_functions(self):
         """Analysoi JavaScript-funktioiden määrittelyt"""
         print("🔍 JAVASCRIPT FUNCTION ANALYSIS")
         print("=" * 50)
         
-        response = self.session.get(self.base_url + "/static/script.js")
-        js_content = response.text
+        js_content = self.site.get("/static/script.js").text
         
         # Etsi funktioiden määrittelyt
         function_patterns = [
@@ -37,8 +35,6 @@ class DiagnosticTester:
         # Tarkista kriittiset funktiot
         critical_functions = [
             'toggleLanguage',
-            'updateLanguage', 
-            'updateLanguageButton',
             'showMoviePopup',
             'closeMoviePopup',
             'initHeroVideo'
@@ -68,8 +64,7 @@ class DiagnosticTester:
         print("\n🏗️  HTML STRUCTURE ANALYSIS")
         print("=" * 50)
         
-        response = self.session.get(self.base_url)
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = self.site.soup("/")
         
         # Tarkista tärkeät ID:t
         important_ids = [
@@ -98,19 +93,16 @@ class DiagnosticTester:
                 tag_info += f".{'.'.join(elem.get('class'))}"
             print(f"   • {tag_info}: {onclick}")
             
-        # Tarkista data-attribuutit kielenvaihtoa varten
-        lang_elements = soup.find_all(attrs={"data-fi": True, "data-en": True})
-        print(f"\n🌍 LANGUAGE DATA ATTRIBUTES:")
-        print(f"   📊 Total elements: {len(lang_elements)}")
-        
-        # Ryhmittele elementtien mukaan
-        element_types = {}
-        for elem in lang_elements:
-            tag = elem.name
-            element_types[tag] = element_types.get(tag, 0) + 1
-            
-        for tag, count in element_types.items():
-            print(f"   • {tag}: {count} elements")
+        # Tarkista palvelimella renderöity kieli
+        html = soup.find('html')
+        print(f"\n🌍 SERVER-SIDE LANGUAGE:")
+        print(f"   📊 <html lang>: {html.get('lang') if html else 'missing'}")
+        lang_toggle = soup.find(attrs={'id': 'langToggle'})
+        if lang_toggle:
+            print(f"   • Toggle target: {lang_toggle.get('data-href')}")
+        leftovers = soup.find_all(attrs={"data-fi": True, "data-en": True})
+        if leftovers:
+            print(f"   ⚠️  {len(leftovers)} elements still carry data-fi/data-en")
             
     def analyze_css_javascript_integration(self):
         """Analysoi CSS:n ja JavaScriptin integraatio"""
@@ -118,12 +110,10 @@ class DiagnosticTester:
         print("=" * 50)
         
         # Hae CSS
-        css_response = self.session.get(self.base_url + "/static/style.css")
-        css_content = css_response.text
+        css_content = self.site.get("/static/style.css").text
         
         # Hae JavaScript
-        js_response = self.session.get(self.base_url + "/static/script.js")
-        js_content = js_response.text
+        js_content = self.site.get("/static/script.js").text
         
         # Etsi CSS-luokkia joita JavaScript käyttää
         js_classes = re.findall(r'[\'"]([a-zA-Z-]+)[\'"]', js_content)
@@ -151,8 +141,7 @@ class DiagnosticTester:
         print("\n🎬 VIDEO IMPLEMENTATION ANALYSIS")
         print("=" * 50)
         
-        response = self.session.get(self.base_url)
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = self.site.soup("/")
         
         # Tarkista video-elementti
         video = soup.find('video')
@@ -178,7 +167,7 @@ class DiagnosticTester:
                 # Testaa videon saavutettavuus
                 if src:
                     try:
-                        video_response = self.session.head(self.base_url + src)
+                        video_response = self.site.head(src)
                         size = video_response.headers.get('content-length', 'Unknown')
                         print(f"     Status: {video_response.status_code}, Size: {size} bytes")
                     except Exception as e:
@@ -187,8 +176,7 @@ class DiagnosticTester:
             print("❌ VIDEO ELEMENT NOT FOUND")
             
         # Tarkista video-CSS
-        css_response = self.session.get(self.base_url + "/static/style.css")
-        css_content = css_response.text
+        css_content = self.site.get("/static/style.css").text
         
         video_css_classes = [
             'hero-video', 'hero-video-container', 
@@ -207,6 +195,8 @@ class DiagnosticTester:
         print("🔬 COMPREHENSIVE DIAGNOSTICS")
         print("=" * 60)
         
+        # Analyysit tulostavat raporttia, joten rinnakkain haetaan vain sivut
+        self.site.prefetch("/", "/static/script.js", "/static/style.css")
         self.analyze_javascript_functions()
         self.analyze_html_structure()
         self.analyze_css_javascript_integration()
@@ -217,5 +207,5 @@ class DiagnosticTester:
         print("📋 Review the analysis above for any issues")
 
 if __name__ == "__main__":
-    diagnostics = DiagnosticTester()
+    diagnostics = DiagnosticTester(site=SiteClient.from_args(__doc__))
     diagnostics.run_full_diagnostics()
\ No newline at end of file
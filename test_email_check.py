@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Testaa sähköpostiosoitteen syntaksitarkistuksen ja viivästetyn toimitettavuustarkistuksen
+"""
+
+import dns.exception
+import dns.resolver
+from wtforms.validators import Email
+
+import app as app_module
+import benchmark_form
+from contact_form import ContactForm
+from email_check import DomainVerdicts
+
+
+class FakeResolver:
+    """DNS-palvelin, joka vastaa ennalta annetuilla tuloksilla"""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.queries = []
+
+    def resolve(self, domain, record):
+        self.queries.append((domain, record))
+        answer = self.answers[domain]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+class MX:
+    def __init__(self, exchange):
+        self.preference = 10
+        self.exchange = exchange
+
+
+def test_form_validation_makes_no_dns_lookups():
+    """Testaa että lomakkeen validointi ei tee DNS-kyselyitä hitaallakaan palvelimella"""
+    result = benchmark_form.run(iterations=50, slow_dns=0.5)
+    assert result['valid'] and result['dns_lookups'] == 0
+    assert not benchmark_form.run(iterations=1, data=dict(benchmark_form.FORM, email='ei-osoite'))['valid']
+
+
+def test_watch_dns_counts_deliverability_lookups(monkeypatch):
+    """Testaa että mittari huomaisi validoinnin DNS-kyselyt"""
+    validator = ContactForm.email.kwargs['validators'][1]
+    assert isinstance(validator, Email) and validator.check_deliverability is False
+    monkeypatch.setattr(validator, 'check_deliverability', True)
+    assert benchmark_form.run(iterations=1)['dns_lookups'] > 0
+
+
+def test_verdicts_are_cached_with_ttl():
+    """Testaa tulosten välimuisti, lyhyempi aika tuntemattomille ja virheelliset osoitteet"""
+    resolver = FakeResolver({
+        'example.fi': [MX('mail.example.fi.')],
+        'missing.fi': dns.resolver.NXDOMAIN(),
+        'slow.fi': dns.exception.Timeout(),
+    })
+    verdicts = DomainVerdicts(ttl=100, unknown_ttl=10, resolver=resolver)
+    assert verdicts.check('a@example.fi', now=0) is True
+    assert verdicts.check('b@EXAMPLE.fi', now=50) is True
+    assert verdicts.check('a@missing.fi', now=0) is False
+    assert verdicts.check('a@slow.fi', now=0) is None
+    assert verdicts.check('ei-osoite', now=0) is False
+    assert len(resolver.queries) == 3
+
+    verdicts.check('a@slow.fi', now=11)
+    verdicts.check('a@example.fi', now=99)
+    assert len(resolver.queries) == 4
+    verdicts.check('a@example.fi', now=101)
+    assert len(resolver.queries) == 5
+
+
+def test_sender_flags_undeliverable_submitter(monkeypatch):
+    """Testaa että taustalähettäjä merkitsee viestin, jos lähettäjän verkkotunnus ei ota postia vastaan"""
+    resolver = FakeResolver({'example.fi': [MX('mail.example.fi.')], 'missing.fi': dns.resolver.NXDOMAIN()})
+    monkeypatch.setattr(app_module, 'email_domains', DomainVerdicts(resolver=resolver))
+    sent = []
+    monkeypatch.setattr(app_module.smtp_pool, 'send', lambda sender, recipients, data, *options: sent.append(data))
+    for submitter in ('testi@example.fi', 'testi@missing.fi', None):
+        app_module.deliver_submission({'subject': 'Testi', 'sender': 'moi@espoo-israel.fi',
+                                       'recipients': ['info@espoo-israel.fi'], 'body': 'Nimi: Testi',
+                                       'submitter': submitter})
+    flagged = [b'HUOM' in data for data in sent]
+    assert flagged == [False, True, False]
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Testaa että upotukset renderöidään kevyinä julkisivuina ilman kolmannen osapuolen skriptejä
+"""
+
+from bs4 import BeautifulSoup
+
+from app import app, page_cache
+
+
+def test_embeds_render_as_facades():
+    """Testaa ettei sivu lataa iframeja tai kolmannen osapuolen skriptejä heti"""
+    page_cache.clear()
+    html = app.test_client().get('/fi/').get_data(as_text=True)
+    soup = BeautifulSoup(html, 'html.parser')
+
+    assert soup.find('iframe') is None
+    scripts = [s['src'] for s in soup.find_all('script', src=True)]
+    assert not any(host in src for src in scripts
+                   for host in ('youtube.com', 'facebook.net', 'recaptcha', 'stripe.com'))
+
+    facades = soup.select('.embed-facade[data-embed-src]')
+    assert len(facades) == 2
+    assert 'videoseries?list=PLuIS6QfhZIsmUYoryGn8DIArdhVzHvJvA' in facades[0]['data-embed-src']
+    assert facades[1]['data-embed-src'] == 'https://www.youtube-nocookie.com/embed/d3Uf8Vyp3U8?autoplay=1'
+    assert all(f.find('button', class_='embed-play') for f in facades)
+    # Traileri upotetaan kerran, ponnahdusikkuna linkittää tapahtumaosion julkisivuun
+    assert html.count('embed/d3Uf8Vyp3U8') == 1
+    links = soup.select('.embed-facade[data-embed-target]')
+    assert len(links) == 1 and links[0]['href'] == '#trailer'
+    assert links[0].find_parent(id='moviePopup')
+    assert soup.find(id='trailer')['data-embed-src'] == facades[1]['data-embed-src']
+    assert not links[0].find('button')
+
+    buttons = soup.find_all('stripe-buy-button')
+    assert len(buttons) == 2
+    assert all(b['data-lazy-script'] == 'https://js.stripe.com/v3/buy-button.js' for b in buttons)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Testaa gunicorn-asetusten työprosessien mitoituksen ja työmallin valinnan
+"""
+
+import os
+import runpy
+
+import pytest
+
+CONF = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+MB = 1024 * 1024
+
+
+def load(monkeypatch, **env):
+    for name in ('GUNICORN_WORKER_CLASS', 'WEB_CONCURRENCY', 'GUNICORN_THREADS', 'GUNICORN_MAX_REQUESTS', 'PORT'):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(CONF)
+
+
+def test_workers_follow_cpus_and_memory(monkeypatch):
+    """Testaa että työprosessien määrä seuraa suorittimia ja muisti rajaa sen"""
+    size = load(monkeypatch)['size_workers']
+    assert size('sync', 4, None) == 9
+    assert size('gthread', 4, None) == 5
+    assert size('gevent', 4, None) == 4
+    # 512 MB:sta kolme neljännestä riittää kolmelle 128 MB:n työprosessille
+    assert size('sync', 4, 512 * MB, worker_memory=128 * MB) == 3
+    assert size('gthread', 1, 64 * MB, worker_memory=128 * MB) == 1
+
+
+def test_environment_selects_worker_model(monkeypatch):
+    """Testaa oletusmallin, ympäristömuuttujat ja virheellisen mallin"""
+    conf = load(monkeypatch, PORT='5001')
+    assert conf['worker_class'] == 'gthread' and conf['threads'] == 4
+    assert conf['bind'] == '0.0.0.0:5001'
+    assert conf['preload_app']
+    # Työprosesseja ei kierrätetä oletuksena, koska kierrätys pudottaa jonossa olevat yhteydet
+    assert conf['max_requests'] == 0
+    assert load(monkeypatch, GUNICORN_MAX_REQUESTS='5000')['max_requests_jitter'] == 500
+    conf = load(monkeypatch, GUNICORN_WORKER_CLASS='sync', WEB_CONCURRENCY='7')
+    assert conf['workers'] == 7 and conf['threads'] == 1
+    with pytest.raises(ValueError):
+        load(monkeypatch, GUNICORN_WORKER_CLASS='eventlet')
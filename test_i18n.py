@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Testaa palvelimella renderöity kieliversio (/fi/, /en/ ja Accept-Language)
+"""
+
+from app import app, page_cache
+
+
+def test_language_routes_render_only_active_language():
+    """Testaa että /fi/ ja /en/ sisältävät vain oman kielensä tekstit"""
+    client = app.test_client()
+    fi = client.get('/fi/').get_data(as_text=True)
+    en = client.get('/en/').get_data(as_text=True)
+
+    assert '<html lang="fi">' in fi
+    assert '<html lang="en">' in en
+    assert 'Tervetuloa Espoon Suomi-Israel Yhdistyksen sivustolle' in fi
+    assert 'Welcome to Espoo Finland-Israel Association' in en
+    assert 'Welcome to Espoo' not in fi
+    assert 'data-fi' not in fi and 'data-en' not in en
+    assert '<option value="kyllä">Yes</option>' in en
+    assert 'action="/en/"' in en
+
+
+def test_root_negotiates_language():
+    """Testaa että juuriosoite valitsee kielen evästeestä tai Accept-Language-otsakkeesta"""
+    client = app.test_client()
+    response = client.get('/', headers={'Accept-Language': 'en-US,en;q=0.9'})
+    assert '<html lang="en">' in response.get_data(as_text=True)
+    assert 'Accept-Language' in response.headers['Vary']
+
+    assert '<html lang="fi">' in client.get('/').get_data(as_text=True)
+
+    client.set_cookie('lang', 'en')
+    assert '<html lang="en">' in client.get('/', headers={'Accept-Language': 'fi'}).get_data(as_text=True)
+
+
+def test_explicit_language_is_remembered_and_cached_separately():
+    """Testaa että kielivalinta tallennetaan evästeeseen ja välimuisti on kielikohtainen"""
+    page_cache.clear()
+    client = app.test_client()
+    response = client.get('/en/')
+    assert 'lang=en' in response.headers['Set-Cookie']
+    en_etag = response.headers['ETag']
+    fi_etag = client.get('/fi/').headers['ETag']
+    assert en_etag != fi_etag
+    assert client.get('/en/', headers={'If-None-Match': en_etag}).status_code == 304
+
+
+def test_invalid_post_rerenders_in_same_language():
+    """Testaa että virheellinen lomake näytetään samalla kielellä"""
+    client = app.test_client()
+    response = client.post('/en/', data={'name': '', 'join': 'kyllä', 'fill_time': '10'})
+    body = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert 'Postal Code:' in body
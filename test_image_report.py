@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Testaa, että Docker-kuvaan päätyvät kaikki sovelluksen moduulit ja vain ne
+"""
+
+import json
+import subprocess
+import sys
+
+from image_report import ROOT, dockerignore_patterns, is_ignored
+
+# Sovelluksen omat moduulit, jotka ``import app`` tuo
+APP_MODULES = """
+import json, os, sys
+import app
+print(json.dumps([os.path.relpath(m.__file__) for m in list(sys.modules.values())
+                  if getattr(m, '__file__', None) and os.path.dirname(os.path.abspath(m.__file__)) == os.getcwd()]))
+"""
+
+
+def test_is_ignored():
+    """Testaa hakemisto-, jokerimerkki- ja poikkeussääntöjen tulkinnan"""
+    patterns = ['static/dist', 'test_*.py', '**/__pycache__', '*.md', '!KEEP.md']
+    assert is_ignored('static/dist/style.1a2b.css', patterns)
+    assert is_ignored('test_app.py', patterns)
+    assert is_ignored('templates/__pycache__/x.pyc', patterns)
+    assert not is_ignored('static/style.css', patterns)
+    assert is_ignored('NOTES.md', patterns) and not is_ignored('KEEP.md', patterns)
+    assert not is_ignored('docs/NOTES.md', patterns)
+
+
+def test_image_contains_app_modules():
+    """Testaa, ettei mitään sovelluksen tuomaa moduulia jätetä pois kuvasta"""
+    patterns = dockerignore_patterns()
+    output = subprocess.run([sys.executable, '-c', APP_MODULES], cwd=ROOT, capture_output=True, text=True,
+                            check=True).stdout
+    local = json.loads(output.splitlines()[-1])
+    assert 'contact_form.py' in local
+    assert [name for name in local if is_ignored(name, patterns)] == []
+    for name in ('gunicorn.conf.py', 'templates/index.html', 'translations/fi.json', 'static/style.css'):
+        assert not is_ignored(name, patterns)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Testaa kuvajohdannaisten build-vaihe ja <picture>-apufunktio
+"""
+
+import pytest
+
+import build_images
+from app import app
+from assets import ImageManifest
+
+
+def test_picture_without_manifest_is_plain_img(tmp_path):
+    """Testaa että ilman manifestia kuva renderöidään tavallisena <img>-tagina"""
+    manifest = ImageManifest(str(tmp_path / 'manifest.json'))
+    with app.test_request_context('/'):
+        html = str(manifest.picture('images/pic1.jpg', alt='Kuva', class_='img-fluid'))
+    assert html == '<img alt="Kuva" src="/static/images/pic1.jpg" class="img-fluid">'
+
+
+def test_build_and_render_picture(tmp_path):
+    """Testaa että johdannaiset ja srcset/sizes/width/height muodostuvat oikein"""
+    Image = pytest.importorskip('PIL.Image')
+    images = tmp_path / 'images'
+    images.mkdir()
+    Image.new('RGB', (1000, 500), 'navy').save(images / 'kuva.jpg')
+    Image.new('RGBA', (400, 400), (255, 0, 0, 128)).save(images / 'logo.png')
+
+    data = build_images.build(str(tmp_path))
+    kuva = data['images/kuva.jpg']
+    assert (kuva['width'], kuva['height']) == (1000, 500)
+    assert kuva['fallback'] == 'jpeg'
+    assert [v['width'] for v in kuva['variants']['jpeg']] == [320, 640, 960, 1000]
+    assert (tmp_path / kuva['variants']['jpeg'][0]['file']).exists()
+    assert data['images/logo.png']['fallback'] == 'png'
+
+    manifest = ImageManifest(str(tmp_path / 'images' / 'derived' / 'manifest.json'))
+    with app.test_request_context('/'):
+        html = str(manifest.picture('images/kuva.jpg', alt='Kuva', sizes='50vw', loading='lazy'))
+        logo = str(manifest.picture('images/logo.png', alt='logo', height=60))
+        style = str(manifest.background('images/kuva.jpg', '.tausta'))
+
+    assert html.startswith('<picture>')
+    assert 'sizes="50vw"' in html
+    assert 'width="1000" height="500"' in html
+    assert '/static/images/derived/kuva.jpg/320.jpg 320w' in html
+    assert 'loading="lazy"' in html
+    assert 'width="60" height="60"' in logo
+    assert style.startswith('<style>.tausta{background-image:url(/static/images/derived/kuva.jpg/320.jpg)')
+    assert '@media (min-width: 161px)' in style
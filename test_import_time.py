@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Testaa tuontiaikaraportin jäsentimen ja sen, ettei sovellus tuo viivästettyjä moduuleja
+"""
+
+from import_time import deferred_imports, digest, measure, parse, subtree
+
+OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       900 |        900 | site
+import time:       100 |        100 |     dns.name
+import time:       300 |        400 |   dns
+import time:      2000 |       2000 |   flask
+import time:       500 |       2900 | app
+"""
+
+
+def test_parse_and_digest():
+    """Testaa syvyydet, sovelluksen oman osuuden rajauksen ja koosteen"""
+    rows = parse(OUTPUT)
+    assert [row[3] for row in rows] == [0, 2, 1, 1, 0]
+    rows = subtree(rows, 'app')
+    assert [row[0] for row in rows] == ['dns.name', 'dns', 'flask', 'app']
+    result = digest(rows, 'app')
+    assert result['total_ms'] == 2.9
+    assert result['packages'][0] == ('flask', 2.0) and ('dns', 0.4) in result['packages']
+    assert result['slowest'] == [('flask', 2.0), ('dns', 0.4)]
+    assert deferred_imports(rows) == ['dns']
+
+
+def test_app_import_defers_heavy_modules():
+    """Testaa että sovelluksen tuonti ei lataa sähköposti-, DNS- tai testiriippuvuuksia"""
+    rows = measure('app', runs=1)
+    assert rows[-1][0] == 'app'
+    assert deferred_imports(rows) == []
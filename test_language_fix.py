@@ -3,16 +3,17 @@
 Testaa kielenvaihtotoiminnon korjaus
 """
 
-import requests
-from bs4 import BeautifulSoup
+from site_client import SiteClient
 
 def test_language_button_fix():
     """Testaa että kielenvaihtopainike on korjattu"""
+    check_language_button(SiteClient())
+
+def check_language_button(site):
     print("🔧 Testing Language Button Fix")
     print("=" * 40)
     
-    response = requests.get("http://127.0.0.1:5000")
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = site.soup("/")
     
     # Tarkista kielenvaihtopainike
     lang_button = soup.find('button', id='langToggle')
@@ -58,4 +59,4 @@ def test_language_button_fix():
     print("   4. Should see only ONE set of toggle messages")
 
 if __name__ == "__main__":
-    test_language_button_fix()
\ No newline at end of file
+    check_language_button(SiteClient.from_args(__doc__))
\ No newline at end of file
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Testaa jonon kautta kirjoitettavat JSON-lokit, pyyntötunnisteet ja 404-otannan
+"""
+
+import json
+import logging
+import queue
+
+import pytest
+from flask import Flask
+
+import app_logging
+
+
+@pytest.fixture
+def logged_app(tmp_path):
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    app = Flask(__name__)
+
+    @app.route('/fail')
+    def fail():
+        raise RuntimeError('boom')
+
+    @app.errorhandler(404)
+    def not_found(e):
+        app.logger.info("404 Not Found", extra={'sample': '404'})
+        return 'not found', 404
+
+    path = tmp_path / 'logs' / 'app.log'
+    listener = app_logging.setup_logging(app, path=str(path))
+
+    def read():
+        listener.stop()
+        return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+    yield app, read
+    listener.stop()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def test_records_are_json_with_request_ids(logged_app):
+    """Testaa JSON-rivit, pyyntötunnisteen otsakkeen ja poikkeusten jäljityksen"""
+    app, read = logged_app
+    client = app.test_client()
+    response = client.get('/missing', headers={'X-Request-ID': 'abc-123'})
+    assert response.headers['X-Request-ID'] == 'abc-123'
+    generated = client.get('/missing', headers={'X-Request-ID': 'bad id <script>'}).headers['X-Request-ID']
+    assert len(generated) == 32 and generated != 'bad id <script>'
+    app.testing = False
+    assert client.get('/fail').status_code == 500
+
+    records = read()
+    assert records[0]['message'] == '404 Not Found'
+    assert records[0]['level'] == 'INFO'
+    assert records[0]['request_id'] == 'abc-123'
+    assert records[0]['path'] == '/missing'
+    assert records[1]['request_id'] == generated
+    error = next(r for r in records if r['level'] == 'ERROR')
+    assert 'RuntimeError: boom' in error['exception']
+    assert error['path'] == '/fail'
+
+
+def test_404_noise_is_sampled(logged_app):
+    """Testaa että 404-tulva rajataan ja ohitettujen määrä kerrotaan"""
+    app, read = logged_app
+    sampler = next(f for f in app.extensions['logging']['handler'].filters
+                   if isinstance(f, app_logging.SamplingFilter))
+    client = app.test_client()
+    for _ in range(sampler.burst + 25):
+        client.get('/wp-login.php')
+    sampler.interval = 0
+    client.get('/.env')
+    logging.getLogger('other').warning('not sampled')
+
+    records = read()
+    not_found = [r for r in records if r['message'] == '404 Not Found']
+    assert len(not_found) == sampler.burst + 1
+    assert not_found[-1]['suppressed'] == 25
+    assert records[-1]['message'] == 'not sampled'
+
+
+def test_full_queue_drops_instead_of_blocking():
+    """Testaa että täysi jono ei pysäytä lokikutsua"""
+    handler = app_logging.DroppingQueueHandler(queue.Queue(1))
+    logger = logging.getLogger('test_full_queue')
+    logger.propagate = False
+    logger.addHandler(handler)
+    for i in range(3):
+        logger.warning('message %s', i)
+    assert handler.dropped == 2
+    handler.queue.get_nowait()
+    logger.warning('after')
+    assert handler.queue.get_nowait().dropped == 2
+    assert handler.dropped == 0
+
+
+def test_rotating_file_is_capped_and_reopened(tmp_path):
+    """Testaa kokorajan, varmuuskopioiden määrän ja toisen prosessin kiertämän tiedoston"""
+    path = tmp_path / 'app.log'
+    handler = app_logging.SharedRotatingFileHandler(str(path), maxBytes=1000, backupCount=2)
+    handler.setFormatter(app_logging.JSONFormatter())
+    record = logging.makeLogRecord({'msg': 'x' * 100, 'levelname': 'INFO', 'name': 'test'})
+    for _ in range(100):
+        handler.emit(record)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['app.log', 'app.log.1', 'app.log.2']
+    assert all(p.stat().st_size <= 1000 for p in tmp_path.iterdir())
+
+    # Toinen työprosessi kierrätti tiedoston: kirjoitus jatkuu uuteen tiedostoon
+    path.rename(tmp_path / 'rotated-elsewhere.log')
+    handler.emit(record)
+    handler.close()
+    assert path.exists() and path.read_text().count('\n') == 1
+
+
+def test_forked_worker_gets_own_queue(logged_app):
+    """Testaa että forkattu työprosessi saa oman jonon ja kuuntelijan"""
+    app, read = logged_app
+    handler, listener = app.extensions['logging']['handler'], app.extensions['logging']['listener']
+    parent_queue = handler.queue
+    listener.after_fork(handler)
+    assert handler.queue is listener.queue is not parent_queue
+    logging.getLogger('worker').warning('after fork')
+    assert read()[-1]['message'] == 'after fork'
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Testaa lomakeviestien jonon ja taustalähettäjän paikallista SMTP-palvelinta vasten
+"""
+
+import smtplib
+import socket
+import time
+from email.message import EmailMessage
+
+from dev_smtp import DevSMTPServer
+from mail_queue import MailQueue, MailSender
+from smtp_pool import SMTPPool
+
+
+def smtp_deliver(port):
+    def deliver(payload):
+        msg = EmailMessage()
+        msg['Subject'] = payload['subject']
+        msg['From'] = payload['sender']
+        msg['To'] = ', '.join(payload['recipients'])
+        msg.set_content(payload['body'])
+        with smtplib.SMTP('127.0.0.1', port) as smtp:
+            smtp.login('moi@espoo-israel.fi', 'salasana')
+            smtp.send_message(msg)
+    return deliver
+
+
+def test_queue_delivers_to_local_smtp(tmp_path):
+    """Testaa että jonotettu viesti toimitetaan ja poistetaan jonosta"""
+    server = DevSMTPServer(port=0)
+    server.start()
+    try:
+        queue = MailQueue(str(tmp_path / 'queue.db'))
+        queue.put("Testi", "moi@espoo-israel.fi", ["info@espoo-israel.fi", "espoo.israel@gmail.com"], "Nimi: Testi")
+        sender = MailSender(queue, smtp_deliver(server.port))
+
+        assert sender.run_once() == 1
+        assert queue.counts() == {}
+        assert len(server.messages) == 1
+        assert server.messages[0]['recipients'] == ["info@espoo-israel.fi", "espoo.israel@gmail.com"]
+        assert b"Nimi: Testi" in server.messages[0]['data']
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_failed_delivery_is_retried_with_backoff(tmp_path):
+    """Testaa että epäonnistunut lähetys siirretään myöhemmäksi ja lopulta hylätään"""
+    queue = MailQueue(str(tmp_path / 'queue.db'), max_attempts=2, base_delay=60)
+    queue.put("Testi", "moi@espoo-israel.fi", ["info@espoo-israel.fi"], "Viesti")
+
+    def broken(payload):
+        raise smtplib.SMTPServerDisconnected("connection lost")
+
+    sender = MailSender(queue, broken)
+    assert sender.run_once() == 0
+    assert queue.counts() == {'pending': 1}
+    # Backoff: viesti ei ole heti uudelleen vuorossa
+    assert queue.claim() == []
+
+    with queue._connect() as conn:
+        conn.execute('UPDATE outbox SET next_attempt = ?', (time.time() - 1,))
+    assert sender.run_once() == 0
+    assert queue.counts() == {'failed': 1}
+
+
+def test_claimed_messages_are_leased(tmp_path):
+    """Testaa että kaksi workeria ei saa samaa viestiä"""
+    queue = MailQueue(str(tmp_path / 'queue.db'))
+    queue.put("Testi", "moi@espoo-israel.fi", ["info@espoo-israel.fi"], "Viesti")
+    assert len(queue.claim()) == 1
+    assert queue.claim() == []
+
+
+def test_pool_reuses_one_session_for_batch(tmp_path):
+    """Testaa että useampi jonotettu viesti lähetetään samalla SMTP-yhteydellä"""
+    server = DevSMTPServer(port=0)
+    server.start()
+    try:
+        config = {'MAIL_SERVER': '127.0.0.1', 'MAIL_PORT': server.port, 'MAIL_USE_SSL': False,
+                  'MAIL_USERNAME': 'moi@espoo-israel.fi', 'MAIL_PASSWORD': 'salasana'}
+        pool = SMTPPool(config)
+        queue = MailQueue(str(tmp_path / 'queue.db'))
+        for i in range(5):
+            queue.put(f"Testi {i}", "moi@espoo-israel.fi", ["info@espoo-israel.fi"], "Viesti")
+
+        def deliver(payload):
+            pool.send(payload['sender'], payload['recipients'], payload['body'].encode())
+
+        assert MailSender(queue, deliver).run_once() == 5
+        assert pool.stats['connects'] == 1
+        assert pool.stats['messages_sent'] == 5
+        assert server.connections == 1
+
+        # Palvelimen katkaisema yhteys huomataan ja avataan uudelleen
+        pool.check_after = 0
+        pool._smtp.sock.shutdown(socket.SHUT_RDWR)
+        pool.send("moi@espoo-israel.fi", ["info@espoo-israel.fi"], b"Viesti")
+        assert pool.stats['connects'] == 2
+        assert pool.stats['stale_sessions'] == 1
+        assert len(server.messages) == 6
+
+        # Lähetyksen aikana katkennut yhteys suljetaan ennen uutta, ettei soketti vuoda
+        pool.check_after = 60
+        broken = pool._smtp
+
+        def reset(*args):
+            raise ConnectionResetError(104, 'Connection reset by peer')
+        broken.sendmail = reset
+        pool.send("moi@espoo-israel.fi", ["info@espoo-israel.fi"], b"Viesti")
+        assert broken.sock is None and pool._smtp is not broken
+        assert pool.stats['connects'] == 3
+        assert pool.stats['stale_sessions'] == 2
+        assert len(server.messages) == 7
+        pool.close()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Testaa pyyntöjen ajoitusmittarit ja /metrics-päätepisteen
+"""
+
+import json
+import os
+import re
+import runpy
+import subprocess
+from types import SimpleNamespace
+
+from flask import Flask, render_template_string
+
+import app as app_module
+from metrics import Metrics
+
+
+def sample(text, series):
+    match = re.search(rf'^{re.escape(series)} (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+def make_app(tmp_path, token=None):
+    app = Flask(__name__)
+    app.config['METRICS_TOKEN'] = token
+    metrics = Metrics(str(tmp_path))
+    metrics.init_app(app)
+
+    @app.route('/page')
+    def page():
+        with metrics.timer('validate'):
+            pass
+        return render_template_string('<p>{{ 1 + 1 }}</p>')
+
+    return app, metrics
+
+
+def test_requests_are_timed_and_exposed(tmp_path):
+    """Testaa laskurit, histogrammit, vaiheajoitukset ja Prometheus-tekstimuoto"""
+    app, _ = make_app(tmp_path)
+    client = app.test_client()
+    for _ in range(3):
+        assert client.get('/page').status_code == 200
+    assert client.get('/missing').status_code == 404
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    text = response.get_data(as_text=True)
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert sample(text, 'http_requests_total{endpoint="page",method="GET",status="200"}') == 3
+    assert sample(text, 'http_requests_total{endpoint="unmatched",method="GET",status="404"}') == 1
+    assert sample(text, 'http_request_duration_seconds_bucket{endpoint="page",le="+Inf"}') == 3
+    assert sample(text, 'http_request_duration_seconds_count{endpoint="page"}') == 3
+    assert sample(text, 'app_phase_duration_seconds_count{phase="render"}') == 3
+    assert sample(text, 'app_phase_duration_seconds_count{phase="validate"}') == 3
+    # Kyselyä itseään ei lasketa käynnissä oleviin pyyntöihin
+    assert sample(text, f'http_requests_in_flight{{pid="{os.getpid()}"}}') == 0
+
+
+def test_snapshots_are_merged_across_workers(tmp_path):
+    """Testaa että saman palvelimen työprosessien tilannevedokset lasketaan yhteen"""
+    app, metrics = make_app(tmp_path)
+    client = app.test_client()
+    client.get('/page')
+
+    # Lopettaneen työprosessin laskurit jäävät summaan, mittari ei
+    dead = subprocess.Popen(['true'])
+    dead.wait()
+    snapshot = {
+        'pid': dead.pid, 'in_flight': 4,
+        'counters': [['http_requests_total', [['endpoint', 'page'], ['method', 'GET'], ['status', 200]], 5]],
+        'histograms': [['http_request_duration_seconds', [['endpoint', 'page']],
+                        {'buckets': [1] + [0] * 10, 'sum': 0.001, 'count': 1}]],
+    }
+    worker = tmp_path / metrics.server / f'worker-{dead.pid}.json'
+    worker.parent.mkdir()
+    worker.write_text(json.dumps(snapshot))
+    # Päättyneen palvelimen hakemisto siivotaan, vaikka sen pid olisi käytössä
+    stale = tmp_path / f'{os.getpid()}-0'
+    stale.mkdir()
+    (stale / f'worker-{dead.pid}.json').write_text(json.dumps(snapshot))
+
+    series = 'http_requests_total{endpoint="page",method="GET",status="200"}'
+    text = client.get('/metrics').get_data(as_text=True)
+    assert sample(text, series) == 6
+    assert f'pid="{dead.pid}"' not in text
+    assert not stale.exists()
+
+    # Pääprosessi yhdistää lopettaneen työprosessin tiedoston palvelimen yhteissummaan
+    metrics.retire(dead.pid)
+    metrics.retire(dead.pid)
+    assert not worker.exists()
+    assert sorted(path.name for path in worker.parent.iterdir()) == ['retired.json', f'worker-{os.getpid()}.json']
+    text = client.get('/metrics').get_data(as_text=True)
+    assert sample(text, series) == 6
+    assert sample(text, 'http_request_duration_seconds_count{endpoint="page"}') == 2
+
+
+def test_child_exit_retires_worker(tmp_path, monkeypatch):
+    """Testaa että gunicornin child_exit-koukku siirtää työprosessin laskurit yhteissummaan"""
+    monkeypatch.setenv('METRICS_DIR', str(tmp_path))
+    monkeypatch.delenv('METRICS_SERVER', raising=False)
+    conf = runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py'))
+    metrics = Metrics(str(tmp_path))
+    metrics.inc('http_requests_total', endpoint='page', method='GET', status=200)
+    metrics.flush()
+
+    conf['child_exit'](None, SimpleNamespace(pid=os.getpid()))
+    assert not (tmp_path / metrics.server / f'worker-{os.getpid()}.json').exists()
+    assert sample(metrics.render(), 'http_requests_total{endpoint="page",method="GET",status="200"}') == 1
+
+
+def test_token_protects_endpoint(tmp_path):
+    """Testaa että METRICS_TOKEN vaatii Bearer-tunnisteen"""
+    app, _ = make_app(tmp_path, token='s3cret')
+    client = app.test_client()
+    assert client.get('/metrics').status_code == 404
+    assert client.get('/metrics', headers={'Authorization': 'Bearer s3cret'}).status_code == 200
+
+
+def test_app_records_page_cache_and_validation(tmp_path, monkeypatch):
+    """Testaa että sovellus vie sivuvälimuistin ja lomakkeen validoinnin mittarit"""
+    monkeypatch.setattr(app_module.metrics, 'directory', str(tmp_path))
+    client = app_module.app.test_client()
+    client.get('/fi/')
+    client.get('/fi/')
+    client.post('/fi/', data={'name': '', 'fill_time': '10'})
+    text = client.get('/metrics').get_data(as_text=True)
+    assert sample(text, 'page_cache_hits_total') >= 1
+    assert sample(text, 'app_phase_duration_seconds_count{phase="validate"}') >= 1
+    assert sample(text, 'http_requests_total{endpoint="home",method="POST",status="200"}') >= 1
+
+
+def test_app_exports_smtp_pool_stats(tmp_path, monkeypatch):
+    """Testaa että SMTP-yhteyspoolin laskurit näkyvät /metrics-vastauksessa"""
+    monkeypatch.setattr(app_module.metrics, 'directory', str(tmp_path))
+    monkeypatch.setattr(app_module.smtp_pool, 'stats',
+                        {'connects': 2, 'messages_sent': 40, 'stale_sessions': 1, 'failures': 3})
+    text = app_module.app.test_client().get('/metrics').get_data(as_text=True)
+    assert '# TYPE smtp_connects_total counter' in text
+    assert sample(text, 'smtp_connects_total') == 2
+    assert sample(text, 'smtp_messages_sent_total') == 40
+    assert sample(text, 'smtp_stale_sessions_total') == 1
+    assert sample(text, 'smtp_failures_total') == 3
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Testaa renderöityjen sivujen välimuisti ja ETag/304-vastaukset
+"""
+
+import os
+
+from app import app, page_cache
+
+
+def test_home_is_served_from_cache_with_etag():
+    """Testaa että etusivu renderöidään kerran ja palvelee 304-vastauksen"""
+    page_cache.clear()
+    client = app.test_client()
+
+    first = client.get('/')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    misses = page_cache.misses
+
+    second = client.get('/')
+    assert second.status_code == 200
+    assert second.data == first.data
+    assert page_cache.misses == misses
+
+    not_modified = client.get('/', headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b''
+
+
+def test_template_change_invalidates_entry():
+    """Testaa että muuttunut sivupohja renderöidään uudelleen"""
+    page_cache.clear()
+    client = app.test_client()
+    client.get('/thank_you')
+    misses = page_cache.misses
+
+    path = os.path.join(app.root_path, app.template_folder, 'kiitos.html')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    try:
+        client.get('/thank_you')
+        assert page_cache.misses == misses + 1
+    finally:
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def test_flashed_messages_bypass_cache():
+    """Testaa että flash-viestit näkyvät eikä niitä tallenneta välimuistiin"""
+    page_cache.clear()
+    client = app.test_client()
+    cached = client.get('/').data
+
+    with client.session_transaction() as session:
+        session['_flashes'] = [('message', 'Failed to send message. Please try again later.')]
+    flashed = client.get('/')
+    assert b'Failed to send message' in flashed.data
+    assert 'ETag' not in flashed.headers
+    assert client.get('/').data == cached
+
+
+def test_error_pages_are_cached():
+    """Testaa että 404-sivu palautetaan välimuistista oikealla statuksella"""
+    page_cache.clear()
+    client = app.test_client()
+    assert client.get('/ei-ole-olemassa').status_code == 404
+    misses = page_cache.misses
+    response = client.get('/ei-ole-olemassakaan')
+    assert response.status_code == 404
+    assert page_cache.misses == misses
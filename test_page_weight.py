@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Testaa sivun painon ja kriittisen polun budjettitarkistus
+"""
+
+from bs4 import BeautifulSoup
+
+import page_weight
+from site_client import Response, SiteClient
+
+PAGE = """<html><head>
+<link rel="stylesheet" href="/static/a.css">
+<link rel="stylesheet" href="/static/print.css" media="print">
+<link rel="stylesheet" href="https://cdn.example.com/lib.css">
+<noscript><link rel="stylesheet" href="/static/nojs.css"></noscript>
+<script src="/static/head.js"></script>
+<script src="/static/deferred.js" defer></script>
+</head><body>
+<img src="/static/small.jpg" srcset="/static/small.jpg 320w, /static/large.jpg 1280w">
+<video poster="/static/poster.jpg"><source src="/videos/a.mp4" media="(max-width: 768px)"><source src="/videos/b.mp4"></video>
+<div data-embed-src="https://video.example.com/1"></div>
+<div data-embed-src="https://video.example.com/1"></div>
+<img src="/static/missing.png">
+</body></html>"""
+
+STYLESHEET = b"@font-face{src:url(font.woff2)} body{background:url('/static/bg.jpg')}"
+SIZES = {
+    '/static/print.css': 100, '/static/font.woff2': 3000, '/static/bg.jpg': 5000,
+    '/static/head.js': 1000, '/static/deferred.js': 1000, '/static/small.jpg': 10_000,
+    '/static/large.jpg': 90_000, '/static/poster.jpg': 20_000, '/videos/a.mp4': 100_000, '/videos/b.mp4': 400_000,
+}
+
+
+class FakeSite:
+    def get(self, path, headers=None):
+        if path == '/':
+            return Response(200, {}, PAGE.encode())
+        if path == '/static/a.css':
+            return Response(200, {}, STYLESHEET)
+        if path in SIZES:
+            return Response(200, {}, b'x' * SIZES[path])
+        return Response(404, {}, b'')
+
+    def head(self, path):
+        return Response(200 if path in SIZES else 404, {'Content-Length': str(SIZES.get(path, 0))}, b'')
+
+    def soup(self, path):
+        return BeautifulSoup(self.get(path).text, 'html.parser')
+
+
+def test_collect_resolves_resources_and_budgets():
+    """Testaa resurssien koot, kriittinen polku, suurin vaihtoehto ja tuplaupotukset"""
+    report = page_weight.collect(FakeSite())
+    resources = {r['url']: r for r in report['resources']}
+    assert resources['/static/a.css']['render_blocking'] and resources['/static/a.css']['critical']
+    assert resources['/static/font.woff2']['type'] == 'font' and resources['/static/font.woff2']['critical']
+    assert not resources['/static/bg.jpg']['critical']
+    assert not resources['/static/print.css']['render_blocking']
+    assert not resources['/static/deferred.js']['render_blocking']
+    assert '/static/large.jpg' in resources and '/static/small.jpg' not in resources
+    assert '/videos/b.mp4' in resources and '/videos/a.mp4' not in resources
+    assert report['missing'] == ['/static/missing.png']
+    assert report['duplicate_embeds'] == ['https://video.example.com/1']
+    assert [r['url'] for r in report['external'] if r['render_blocking']] == ['https://cdn.example.com/lib.css']
+
+    summary = page_weight.summarize(report)
+    assert summary['render_blocking'] == 3
+    assert summary['critical'] == len(PAGE) + len(STYLESHEET) + 3000 + 1000
+    assert summary['video'] == 400_000
+
+    problems = page_weight.check(report, dict(page_weight.BUDGETS, image=100, video=1000))
+    assert "image: 112 KB, budget 100 KB" in problems
+    assert "embedded twice: https://video.example.com/1" in problems
+    assert "missing: /static/missing.png" in problems
+    assert not any(problem.startswith('video') for problem in problems)
+
+
+def test_collect_real_homepage_in_process():
+    """Testaa että oikean etusivun tyylitiedosto ja sen taustakuva löytyvät"""
+    report = page_weight.collect(SiteClient(), '/fi/')
+    resources = {r['url']: r for r in report['resources']}
+    stylesheet = next(url for url in resources if url.startswith('/static/') and url.endswith('.css'))
+    assert resources[stylesheet]['render_blocking']
+    assert any(r['from'] == stylesheet and r['type'] == 'image' for r in report['resources'])
+    assert report['missing'] == []
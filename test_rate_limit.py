@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Testaa yhteystietolomakkeen lähetysrajat ja roskapostiansat
+"""
+
+import os
+
+import pytest
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from app import app, contact_limiter, mail_queue
+from rate_limit import RateLimiter, parse_limit
+
+VALID = {
+    'name': 'Testi', 'address': 'Testikatu 1', 'postal_code': '02100', 'city': 'Espoo',
+    'email': 'testi@example.com', 'phone': '0401234567', 'join': 'ei',
+    'message': 'Hei', 'accept_policy': 'y', 'fill_time': '12',
+}
+
+
+def test_parse_limit():
+    """Testaa rajan jäsentäminen ja pois kytkeminen"""
+    assert parse_limit('5/3600') == (5, 3600.0)
+    assert parse_limit('3') == (3, 1.0)
+    assert parse_limit('0') is None
+    assert parse_limit('') is None
+
+
+def test_bucket_refills_over_time(tmp_path):
+    """Testaa että kiintiö loppuu, täyttyy ajan myötä ja on avainkohtainen"""
+    limiter = RateLimiter({'ip': (2, 60), 'email': None}, path=str(tmp_path / 'limits.db'))
+    assert limiter.hit(now=0, ip='10.0.0.1') == 0
+    assert limiter.hit(now=0, ip='10.0.0.1') == 0
+    assert limiter.hit(now=0, ip='10.0.0.1') == pytest.approx(30)
+    assert limiter.hit(now=0, ip='10.0.0.2') == 0
+    assert limiter.hit(now=30, ip='10.0.0.1') == 0
+    # Rajaton näkymä ja tyhjä avain ohitetaan
+    assert limiter.hit(now=30, email='a@example.com', ip='') == 0
+
+
+def test_denied_hit_takes_no_tokens(tmp_path):
+    """Testaa että hylätty pyyntö ei kuluta muiden näkymien kiintiötä"""
+    limiter = RateLimiter({'ip': (5, 60), 'email': (1, 60)}, path=str(tmp_path / 'limits.db'))
+    assert limiter.hit(now=0, ip='10.0.0.1', email='a@example.com') == 0
+    for _ in range(3):
+        assert limiter.hit(now=0, ip='10.0.0.1', email='a@example.com') > 0
+    for _ in range(4):
+        assert limiter.hit(now=0, ip='10.0.0.1') == 0
+    assert limiter.hit(now=0, ip='10.0.0.1') > 0
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(contact_limiter, 'path', str(tmp_path / 'limits.db'))
+    monkeypatch.setattr(mail_queue, 'path', str(tmp_path / 'queue.db'))
+    monkeypatch.setattr('app.mail_sender.notify', lambda: None)
+    return app.test_client()
+
+
+@pytest.mark.parametrize('extra', [{'website': 'http://spam.example'}, {'fill_time': '1'}, {'fill_time': '0'}])
+def test_bots_are_redirected_without_mail(client, extra):
+    """Testaa että ansaan jäänyt lähetys näyttää onnistuneelta mutta ei jonota viestiä"""
+    response = client.post('/fi/', data=dict(VALID, **extra))
+    assert response.status_code == 302 and response.location.endswith('/fi/thank_you')
+    assert mail_queue.counts() == {}
+
+
+@pytest.mark.parametrize('fill_time', [None, '', 'abc', 'nan'])
+def test_post_without_fill_time_is_queued(client, fill_time):
+    """Testaa että ilman JavaScriptiä lähetetty (täyttöajaton) lomake jonotetaan eikä hylätä"""
+    data = {key: value for key, value in VALID.items() if key != 'fill_time'}
+    if fill_time is not None:
+        data['fill_time'] = fill_time
+    response = client.post('/fi/', data=data)
+    assert response.status_code == 302 and response.location.endswith('/fi/thank_you')
+    assert mail_queue.counts() == {'pending': 1}
+
+
+def test_flood_gets_429_before_validation(client):
+    """Testaa että samasta osoitteesta tuleva tulva saa 429-vastauksen"""
+    statuses = [client.post('/fi/', data=dict(VALID, email=f'testi{i}@example.com')).status_code
+                for i in range(12)]
+    assert statuses == [302] * 10 + [429] * 2
+    assert mail_queue.counts() == {'pending': 10}
+    response = client.post('/fi/', data=VALID)
+    assert int(response.headers['Retry-After']) > 0
+    # Sama sähköpostiosoite toisesta osoitteesta rajataan omalla kiintiöllään
+    other = [client.post('/fi/', data=VALID, environ_base={'REMOTE_ADDR': '10.0.0.9'}).status_code
+             for _ in range(4)]
+    assert other == [302, 302, 302, 429]
+
+
+def test_clients_behind_proxy_get_own_buckets(client, monkeypatch):
+    """Testaa että välityspalvelimen takana kukin asiakas saa oman IP-kiintiönsä"""
+    monkeypatch.setattr(app, 'wsgi_app', ProxyFix(app.wsgi_app, x_for=1))
+    proxy = {'REMOTE_ADDR': '10.0.0.1'}
+    for i in range(10):
+        headers = {'X-Forwarded-For': '203.0.113.5'}
+        data = dict(VALID, email=f'testi{i}@example.com')
+        assert client.post('/fi/', data=data, headers=headers, environ_base=proxy).status_code == 302
+    assert client.post('/fi/', data=dict(VALID, email='x@example.com'), headers={'X-Forwarded-For': '203.0.113.5'},
+                       environ_base=proxy).status_code == 429
+    assert client.post('/fi/', data=dict(VALID, email='y@example.com'), headers={'X-Forwarded-For': '203.0.113.6'},
+                       environ_base=proxy).status_code == 302
+    # Julkaisuasetukset luottavat yhteen välityspalvelimeen
+    root = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(root, 'Procfile'), encoding='utf-8') as f:
+        assert 'TRUSTED_PROXIES=${TRUSTED_PROXIES:-1} gunicorn' in f.read()
+    with open(os.path.join(root, 'Dockerfile'), encoding='utf-8') as f:
+        assert 'TRUSTED_PROXIES=1' in f.read()
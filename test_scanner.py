@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Testaa haavoittuvuusskannerien pyyntöjen nopea 404-vastaus
+"""
+
+import pytest
+from flask import Flask
+
+from app import app, page_cache
+from scanner import NOT_FOUND, ScannerFilter
+
+
+@pytest.mark.parametrize('path, rule', [
+    ('/wp-login.php', 'wordpress'),
+    ('/blog/wp-admin/setup-config.php', 'wordpress'),
+    ('/index.php', 'php'),
+    ('/.env', 'dotfiles'),
+    ('/.git/config', 'dotfiles'),
+    ('/phpMyAdmin/', 'admin_panels'),
+    ('/cgi-bin/luci', 'cgi'),
+    ('/backup.tar.gz', 'backups'),
+    ('/vendor/phpunit/phpunit/src/Util/PHP/eval-stdin.php', 'server_config'),
+])
+def test_scanner_paths_match_rules(path, rule):
+    """Testaa että tunnetut skanneripolut tunnistetaan oikealla säännöllä"""
+    assert ScannerFilter(None).match(path) == rule
+
+
+@pytest.mark.parametrize('path', ['/', '/fi/', '/en/thank_you', '/static/style.css',
+                                  '/static/vendor/vendor.css', '/videos/hero-video-mobile.mp4',
+                                  '/.well-known/security.txt', '/metrics'])
+def test_site_paths_pass_through(path):
+    """Testaa että sivuston omia polkuja ei estetä"""
+    assert ScannerFilter(None).match(path) is None
+
+
+def test_blocked_requests_never_reach_flask():
+    """Testaa että estetty pyyntö ei reitity Flaskiin ja osumat lasketaan"""
+    calls = []
+    inner = Flask(__name__)
+    inner.before_request(lambda: calls.append(1))
+    blocked = []
+    inner.wsgi_app = ScannerFilter(inner.wsgi_app, extra_patterns=[r'^/secret-admin'], on_block=blocked.append)
+    client = inner.test_client()
+
+    response = client.get('/wp-login.php')
+    assert response.status_code == 404 and response.data == NOT_FOUND
+    assert client.head('/.env').data == b''
+    assert client.get('/secret-admin/login').status_code == 404
+    assert client.get('/elsewhere').status_code == 404
+    assert len(calls) == 1
+    assert blocked == ['wordpress', 'dotfiles', 'custom_0']
+    assert inner.wsgi_app.counts['wordpress'] == 1
+
+
+def test_app_answers_scanners_without_rendering():
+    """Testaa sovelluksen staattinen vastaus ja HTTP-virheiden tilakoodit"""
+    client = app.test_client()
+    misses = page_cache.misses
+    response = client.get('/wp-admin/')
+    assert response.status_code == 404 and response.data == NOT_FOUND
+    assert page_cache.misses == misses
+    assert 'scanner_blocked_total{rule="wordpress"}' in client.get('/metrics').get_data(as_text=True)
+    # Oudot metodit saavat 405:n eivätkä renderöityä 500-sivua
+    assert client.open('/', method='PROPFIND').status_code == 405
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Testaa e2e-skriptien yhteinen sovellusyhteys ilman palvelinta
+"""
+
+from site_client import SiteClient
+
+
+def test_pages_are_fetched_and_parsed_once():
+    """Testaa että sivut haetaan ja jäsennetään kerran ja tarkistukset ajetaan järjestyksessä"""
+    site = SiteClient()
+    calls = []
+    request = site.request
+    site.request = lambda method, path, **kwargs: calls.append((method, path)) or request(method, path, **kwargs)
+
+    soups = site.run([lambda: site.soup('/fi/') for _ in range(8)])
+    assert all(soup is soups[0] for soup in soups)
+    assert soups[0].find('html')['lang'] == 'fi'
+    assert calls == [('GET', '/fi/')]
+
+    assert site.run([lambda n=n: n * n for n in range(5)]) == [0, 1, 4, 9, 16]
+    partial = site.get('/static/script.js', headers={'Range': 'bytes=0-9'})
+    assert partial.status_code == 206 and len(partial.content) == 10
+    assert site.get('/en/').headers['Content-Type'].startswith('text/html')
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Testaa muistissa olevan staattisten tiedostojen hakemiston ja sen WSGI-palvelimen
+"""
+
+import gzip
+
+import pytest
+from flask import Flask
+
+import app as app_module
+import static_server
+from static_server import StaticIndex, StaticMiddleware
+
+CSS = b'body { color: #123456; }\n' * 100
+
+
+@pytest.fixture
+def site(tmp_path):
+    (tmp_path / 'style.css').write_bytes(CSS)
+    (tmp_path / 'style.css.gz').write_bytes(gzip.compress(CSS))
+    (tmp_path / 'dist').mkdir()
+    (tmp_path / 'dist' / 'app.1a2b3c4d.js').write_bytes(b'console.log(1);')
+    (tmp_path / 'big.bin').write_bytes(bytes(range(256)) * 2048)
+    (tmp_path / 'backup.tar.gz').write_bytes(b'not a sibling')
+
+    flask_app = Flask(__name__, static_folder=str(tmp_path), static_url_path='/static')
+    routed = []
+    flask_app.before_request(lambda: routed.append(1))
+    served = []
+    flask_app.wsgi_app = StaticMiddleware(flask_app.wsgi_app, StaticIndex(str(tmp_path)),
+                                          cache_control=lambda name: 'immutable' if name.startswith('dist/')
+                                          else 'no-cache',
+                                          on_serve=lambda method, status, seconds: served.append(status))
+    return flask_app.test_client(), routed, served
+
+
+def test_index_lists_files_with_variants(site, tmp_path):
+    """Testaa että pakatut sisarustiedostot liitetään alkuperäiseen eikä listata erikseen"""
+    index = StaticIndex(str(tmp_path))
+    assert sorted(index.entries) == ['backup.tar.gz', 'big.bin', 'dist/app.1a2b3c4d.js', 'style.css']
+    style = index.get('style.css')
+    assert style.encodings == ('gzip',) and style.file.body == CSS
+    assert style.variants['gzip'].etag == f'{style.file.etag}-gzip'
+    assert index.get('big.bin').file.body is None
+
+
+def test_files_are_served_without_flask(site):
+    """Testaa vastauksen otsakkeet, pakatun version valinnan ja ehdolliset pyynnöt"""
+    client, routed, served = site
+    response = client.get('/static/style.css')
+    assert response.status_code == 200 and response.data == CSS
+    assert response.headers['Content-Type'] == 'text/css; charset=utf-8'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    etag = response.headers['ETag']
+
+    compressed = client.get('/static/style.css', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.data) == CSS
+    assert compressed.headers['ETag'] != etag
+
+    assert client.get('/static/style.css', headers={'If-None-Match': etag}).status_code == 304
+    assert client.head('/static/style.css').data == b''
+    assert client.get('/static/dist/app.1a2b3c4d.js').headers['Cache-Control'] == 'immutable'
+    assert routed == []
+    assert served == [200, 200, 304, 200, 200]
+
+
+def test_ranges_of_large_files(site, monkeypatch):
+    """Testaa tavualueet levyltä luettavalle tiedostolle ja If-Range-ehdon"""
+    client, _, _ = site
+    monkeypatch.setattr(static_server, 'CHUNK_SIZE', 1000)
+    data = bytes(range(256)) * 2048
+    response = client.get('/static/big.bin', headers={'Range': 'bytes=1000-4999'})
+    assert response.status_code == 206 and response.data == data[1000:5000]
+    assert response.headers['Content-Range'] == f'bytes 1000-4999/{len(data)}'
+    assert client.get('/static/big.bin', headers={'Range': f'bytes={len(data)}-'}).status_code == 416
+    stale = client.get('/static/big.bin', headers={'Range': 'bytes=0-9', 'If-Range': '"vanha"'})
+    assert stale.status_code == 200 and len(stale.data) == len(data)
+
+
+def test_unknown_paths_go_to_flask(site):
+    """Testaa että tuntemattomat polut ja muut metodit päätyvät Flaskille"""
+    client, routed, served = site
+    assert client.get('/static/missing.css').status_code == 404
+    assert client.get('/static/../style.css').status_code == 404
+    assert client.post('/static/style.css').status_code == 405
+    assert len(routed) == 3 and served == []
+
+
+def test_app_serves_static_from_index():
+    """Testaa että sovelluksen staattiset tiedostot tulevat hakemistosta ja lasketaan mittareihin"""
+    client = app_module.app.test_client()
+    middleware = app_module.app.wsgi_app
+    assert isinstance(middleware, StaticMiddleware)
+    served = middleware.served
+    response = client.get('/static/style.css')
+    assert response.status_code == 200 and 'X-Request-ID' not in response.headers
+    assert middleware.served == served + 1
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'http_requests_total{endpoint="static",method="GET",status="200"}' in text
@@ -3,37 +3,40 @@
 Simuloi käyttäjän toimintoja sivustolla ja seuraa server-lokeja
 """
 
-import requests
-import time
-import json
-from bs4 import BeautifulSoup
+from site_client import SiteClient
+
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
 
 class UserActionSimulator:
-    def __init__(self, base_url="http://127.0.0.1:5000"):
-        self.base_url = base_url
-        self.session = requests.Session()
+    def __init__(self, base_url=None, site=None):
         # Simuloi oikea selain
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        })
+        self.site = site or SiteClient(base_url, headers=BROWSER_HEADERS)
         
     def simulate_page_load(self):
         """Simuloi sivun lataus kuten oikea selain"""
         print("🌐 Simulating page load...")
         
         # 1. Lataa HTML
-        response = self.session.get(self.base_url)
+        response = self.site.get("/")
         print(f"   📄 HTML loaded: {response.status_code}")
         
         # 2. Parsee HTML ja etsi staattiset resurssit
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = self.site.soup("/")
+        
+        # Selain hakee sivun resurssit rinnakkain; tulokset tulostetaan järjestyksessä
+        resources = [link.get('href') for link in soup.find_all('link', rel='stylesheet')]
+        resources += [script.get('src') for script in soup.find_all('script', src=True)]
+        resources += [img.get('src') for img in soup.find_all('img', src=True)[:3]]
+        self.site.prefetch(*[path for path in resources if path and path.startswith('/static/')])
         
         # 3. Lataa CSS
         css_links = soup.find_all('link', rel='stylesheet')
         for link in css_links:
             href = link.get('href')
             if href and href.startswith('/static/'):
-                css_response = self.session.get(self.base_url + href)
+                css_response = self.site.get(href)
                 print(f"   🎨 CSS loaded: {href} ({css_response.status_code})")
         
         # 4. Lataa JavaScript
@@ -41,7 +44,7 @@ class UserActionSimulator:
         for script in js_scripts:
             src = script.get('src')
             if src and src.startswith('/static/'):
-                js_response = self.session.get(self.base_url + src)
+                js_response = self.site.get(src)
                 print(f"   📜 JS loaded: {src} ({js_response.status_code})")
         
         # 5. Lataa kuvat
@@ -49,7 +52,7 @@ class UserActionSimulator:
         for img in images[:3]:  # Vain muutama ensimmäinen
             src = img.get('src')
             if src and src.startswith('/static/'):
-                img_response = self.session.get(self.base_url + src)
+                img_response = self.site.get(src)
                 print(f"   🖼️  Image loaded: {src} ({img_response.status_code})")
         
         # 6. Lataa video (simuloi autoplay)
@@ -60,12 +63,12 @@ class UserActionSimulator:
                 src = source.get('src')
                 if src:
                     # Simuloi video lataus (HEAD request ensin, sitten partial content)
-                    video_head = self.session.head(self.base_url + src)
+                    video_head = self.site.head(src)
                     print(f"   🎬 Video HEAD: {src} ({video_head.status_code})")
                     
                     # Simuloi partial content request (kuten video player tekisi)
                     headers = {'Range': 'bytes=0-1023'}
-                    video_partial = self.session.get(self.base_url + src, headers=headers)
+                    video_partial = self.site.get(src, headers=headers)
                     print(f"   🎬 Video partial: {src} ({video_partial.status_code})")
                     break
         
@@ -76,8 +79,7 @@ class UserActionSimulator:
         """Simuloi kielenvaihtoa (ei voi testata JavaScriptiä, mutta testaa että elementit ovat paikallaan)"""
         print("\n🌍 Simulating language toggle...")
         
-        response = self.session.get(self.base_url)
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = self.site.soup("/")
         
         # Tarkista että kielenvaihtopainike löytyy
         lang_toggle = soup.find('button', id='langToggle')
@@ -87,22 +89,19 @@ class UserActionSimulator:
             if flag_icon:
                 print(f"   🏴 Flag icon: {flag_icon.get_text()}")
         
-        # Tarkista kielenvaihtoa varten tarvittavat data-attribuutit
-        lang_elements = soup.find_all(attrs={"data-fi": True, "data-en": True})
-        print(f"   📝 Found {len(lang_elements)} elements with language data")
-        
-        # Näytä muutama esimerkki
-        for i, elem in enumerate(lang_elements[:3]):
-            fi_text = elem.get('data-fi', '')[:30]
-            en_text = elem.get('data-en', '')[:30]
-            print(f"   🔄 Element {i+1}: FI='{fi_text}...' EN='{en_text}...'")
+            # Kielenvaihto lataa toisen kielen sivun
+            target = lang_toggle.get('data-href')
+            if target:
+                switched = self.site.get(target)
+                switched_soup = self.site.soup(target)
+                title = switched_soup.find('h1')
+                print(f"   🔄 {target} ({switched.status_code}): '{title.get_text(strip=True)[:30] if title else ''}...'")
             
     def simulate_popup_interaction(self):
         """Simuloi popup-vuorovaikutusta"""
         print("\n🎬 Simulating popup interaction...")
         
-        response = self.session.get(self.base_url)
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = self.site.soup("/")
         
         # Tarkista popup-elementti
         popup = soup.find('div', id='moviePopup')
@@ -132,8 +131,7 @@ class UserActionSimulator:
         """Simuloi lomakkeen täyttöä"""
         print("\n📝 Simulating form interaction...")
         
-        response = self.session.get(self.base_url)
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = self.site.soup("/")
         
         form = soup.find('form')
         if form:
@@ -167,11 +165,12 @@ class UserActionSimulator:
                 'city': '',
                 'join': 'kyllä',
                 'message': '',
-                'accept_policy': 'y'
+                'accept_policy': 'y',
+                'fill_time': '10'  # script.js täyttää selaimessa
             }
             
             try:
-                form_response = self.session.post(self.base_url, data=form_data)
+                form_response = self.site.post("/", data=form_data)
                 print(f"   📤 Form submission: {form_response.status_code}")
                 
                 # Tarkista että palataan lomakkeeseen (validointivirheet)
@@ -189,8 +188,7 @@ class UserActionSimulator:
         """Simuloi navigoinnin klikkauksia"""
         print("\n🧭 Simulating navigation clicks...")
         
-        response = self.session.get(self.base_url)
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = self.site.soup("/")
         
         # Tarkista navigointi
         nav = soup.find('nav')
@@ -217,9 +215,6 @@ class UserActionSimulator:
             # Simuloi sivun lataus
             self.simulate_page_load()
             
-            # Odota hetki (simuloi käyttäjän lukemista)
-            time.sleep(1)
-            
             # Simuloi eri toimintoja
             self.simulate_language_toggle()
             self.simulate_popup_interaction()
@@ -234,5 +229,5 @@ class UserActionSimulator:
             print(f"\n❌ Simulation failed: {e}")
 
 if __name__ == "__main__":
-    simulator = UserActionSimulator()
+    simulator = UserActionSimulator(site=SiteClient.from_args(__doc__, headers=BROWSER_HEADERS))
     simulator.run_full_simulation()
\ No newline at end of file
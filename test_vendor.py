@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Testaa kolmannen osapuolen CSS:n karsinta, fonttien osajoukot ja paikallinen käyttö
+"""
+
+import os
+
+import pytest
+
+import build_assets
+import vendor_assets
+from app import app, page_cache, vendor_manifest
+from assets import AssetManifest
+
+FONT = '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+
+BOOTSTRAP = """@charset "UTF-8";/*! Bootstrap */
+:root{--bs-body-font-weight:400}
+.container,.container-xxl{width:100%}
+.table{--bs-table-bg:transparent}
+.btn:not(:disabled):hover,.btn-check:checked+.btn{color:red}
+.collapsing{height:0;transition:height .35s ease}
+.progress-bar-animated{animation:1s linear infinite progress-bar-stripes}
+@keyframes progress-bar-stripes{0%{background-position-x:1rem}}
+@keyframes spinner-border{to{transform:rotate(360deg)}}
+@media (min-width:576px){.container{max-width:540px}.table-sm{padding:0}}
+h1,.h1{font-weight:500}
+textarea{resize:vertical}
+select{word-wrap:normal}
+"""
+ICONS = """@font-face{font-display:block;font-family:"bootstrap-icons";src:url("./fonts/bootstrap-icons.woff2?abc") format("woff2"),url("./fonts/bootstrap-icons.woff?abc") format("woff")}
+.bi::before,[class^="bi-"]::before{font-family:bootstrap-icons !important}
+.bi-calendar-fill::before{content:"\\2665"}
+.bi-alarm::before{content:"\\2663"}
+"""
+FONTAWESOME = """@font-face{font-family:"Font Awesome 6 Brands";font-weight:400;src:url(../webfonts/fa-brands-400.woff2) format("woff2")}
+@font-face{font-family:"Font Awesome 6 Free";font-weight:900;src:url(../webfonts/fa-solid-900.woff2) format("woff2")}
+.fab{font-family:"Font Awesome 6 Brands"}
+.fas{font-family:"Font Awesome 6 Free"}
+.fa-facebook:before{content:"\\263a"}
+"""
+ROBOTO = """/* latin */
+@font-face{font-family:'Roboto';font-weight:400;src:url(https://fonts.gstatic.com/s/roboto/latin.woff2) format('woff2');unicode-range:U+0000-00FF}
+/* cyrillic */
+@font-face{font-family:'Roboto';font-weight:400;src:url(https://fonts.gstatic.com/s/roboto/cyrillic.woff2) format('woff2');unicode-range:U+0400-045F}
+"""
+
+
+def fake_cdn(requested):
+    with open(FONT, 'rb') as f:
+        font = f.read()
+    responses = {
+        vendor_assets.STYLESHEETS[0]: BOOTSTRAP.encode(),
+        vendor_assets.STYLESHEETS[1]: ICONS.encode(),
+        vendor_assets.STYLESHEETS[2]: FONTAWESOME.encode(),
+        vendor_assets.SCRIPTS['bootstrap.bundle.min.js']: b'var c={HIDING:"collapsing"};',
+    }
+
+    def fetch(url):
+        requested.append(url)
+        if url.startswith('https://i.ytimg.com/'):
+            return b'jpeg'
+        if url.startswith('https://fonts.googleapis.com/'):
+            return ROBOTO.encode()
+        if url in responses:
+            return responses[url]
+        if url.endswith('.woff2') or '.woff2?' in url:
+            return font
+        raise AssertionError(f"unexpected download: {url}")
+    return fetch
+
+
+def test_vendor_build_and_templates(tmp_path, monkeypatch):
+    """Testaa että build karsii CSS:n, tekee fonttien osajoukot ja sivut käyttävät niitä"""
+    pytest.importorskip('fontTools.subset')
+    if not os.path.exists(FONT):
+        pytest.skip('DejaVu font not installed')
+    static = tmp_path / 'static'
+    static.mkdir()
+    (static / 'style.css').write_text("body{font-family:'Roboto'}.a{font-weight:bold}", encoding='utf-8')
+    (static / 'script.js').write_text("el.classList.add('show');", encoding='utf-8')
+    requested = []
+
+    manifest, report = vendor_assets.build(str(static), fetch=fake_cdn(requested))
+
+    css = (static / 'vendor' / 'vendor.css').read_text(encoding='utf-8')
+    assert '.container-xxl' not in css and '.container{width:100%}' in css
+    assert '.table' not in css
+    assert '.btn:not(:disabled):hover,.btn-check:checked+.btn' not in css
+    assert '.collapsing{' in css
+    # WTForms tuottaa lomakkeen kentät Pythonissa, joten mallipohjista ei niitä löydy
+    assert 'textarea{resize:vertical}' in css and 'select{word-wrap:normal}' in css
+    assert '@charset' not in css
+    assert 'spinner-border' not in css and 'progress-bar-stripes' not in css
+    assert '.bi-calendar-fill' in css and '.bi-alarm' not in css
+    assert 'Font Awesome 6 Brands' in css and 'Font Awesome 6 Free' not in css
+    assert 'cyrillic' not in ''.join(requested)
+    assert 'wght@400;500;700' in next(url for url in requested if 'googleapis' in url)
+    assert 'https://' not in css
+
+    fonts = os.listdir(static / 'vendor' / 'fonts')
+    assert len(fonts) == 3
+    for name, before, after in report:
+        if name.endswith('.woff2'):
+            assert after < before // 10
+    assert manifest['youtube/d3Uf8Vyp3U8.jpg'] == 'vendor/youtube/d3Uf8Vyp3U8.jpg'
+    assert manifest['preload'] == [f"vendor/fonts/{next(f for f in fonts if f.startswith('latin'))}"]
+
+    # Fonttien nimissä on jo sisällön tiiviste, joten ne tarjoillaan muuttumattomina
+    assets, _ = build_assets.build(str(static))
+    assert all(assets[f'vendor/fonts/{font}'] == f'vendor/fonts/{font}' for font in fonts)
+    assert AssetManifest(str(static / 'dist' / 'manifest.json')).is_hashed(f'vendor/fonts/{fonts[0]}')
+
+    monkeypatch.setattr(app, 'static_folder', str(static))
+    monkeypatch.setattr(vendor_manifest, 'path', str(static / 'vendor' / 'manifest.json'))
+    page_cache.clear()
+    html = app.test_client().get('/fi/').get_data(as_text=True)
+    assert '/static/vendor/vendor.css' in html
+    assert '/static/vendor/bootstrap.bundle.min.js' in html
+    assert 'rel="preload" href="/static/vendor/fonts/latin.' in html
+    assert '<img src="/static/vendor/youtube/d3Uf8Vyp3U8.jpg"' in html
+    assert 'cdn.jsdelivr.net' not in html and 'fonts.googleapis.com' not in html
+    page_cache.clear()
+
+
+def test_cdn_fallback_without_vendor_build(tmp_path, monkeypatch):
+    """Testaa että ilman vendor-buildia käytetään CDN-osoitteita"""
+    monkeypatch.setattr(vendor_manifest, 'path', str(tmp_path / 'puuttuu.json'))
+    page_cache.clear()
+    html = app.test_client().get('/fi/').get_data(as_text=True)
+    assert 'cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css' in html
+    page_cache.clear()
+
+
+def test_failed_download_keeps_previous_build(tmp_path):
+    """Testaa että epäonnistunut lataus jättää edellisen vendor-buildin paikalleen"""
+    pytest.importorskip('fontTools.subset')
+    if not os.path.exists(FONT):
+        pytest.skip('DejaVu font not installed')
+    static = tmp_path / 'static'
+    static.mkdir()
+    (static / 'style.css').write_text("body{font-family:'Roboto'}", encoding='utf-8')
+    (static / 'script.js').write_text('', encoding='utf-8')
+    vendor_assets.build(str(static), fetch=fake_cdn([]))
+    assert oct(os.stat(static / 'vendor').st_mode & 0o777) == '0o755'
+    before = {path: path.read_bytes() for path in (static / 'vendor').rglob('*') if path.is_file()}
+
+    working = fake_cdn([])
+
+    def fetch(url):
+        if url.startswith('https://fonts.googleapis.com/'):
+            raise RuntimeError(f"Download of {url} failed: HTTP Error 503")
+        return working(url)
+
+    with pytest.raises(RuntimeError, match='503'):
+        vendor_assets.build(str(static), fetch=fetch)
+    with pytest.raises(RuntimeError, match='Download of http://127.0.0.1:9/'):
+        vendor_assets.fetch('http://127.0.0.1:9/bootstrap.min.css')
+    assert {path: path.read_bytes() for path in (static / 'vendor').rglob('*') if path.is_file()} == before
+    assert sorted(os.listdir(static)) == ['script.js', 'style.css', 'vendor']
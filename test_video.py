@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Testaa hero-videon Range-pyynnöt, validaattorit ja puuttuvien versioiden käsittely
+"""
+
+import json
+
+from bs4 import BeautifulSoup
+
+import build_videos
+from app import app, hero_videos, page_cache
+
+
+def test_range_requests():
+    """Testaa 206-, 416- ja 304-vastaukset"""
+    client = app.test_client()
+    path = hero_videos.get('hero-video-mobile.mp4').path
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    full = client.get('/videos/hero-video-mobile.mp4')
+    assert full.status_code == 200
+    assert full.headers['Accept-Ranges'] == 'bytes'
+    assert full.data == data
+
+    partial = client.get('/videos/hero-video-mobile.mp4', headers={'Range': 'bytes=100-1123'})
+    assert partial.status_code == 206
+    assert partial.headers['Content-Range'] == f'bytes 100-1123/{len(data)}'
+    assert partial.data == data[100:1124]
+
+    tail = client.get('/videos/hero-video-mobile.mp4', headers={'Range': 'bytes=-500'})
+    assert tail.data == data[-500:]
+
+    too_far = client.get('/videos/hero-video-mobile.mp4', headers={'Range': f'bytes={len(data)}-'})
+    assert too_far.status_code == 416
+    assert too_far.headers['Content-Range'] == f'bytes */{len(data)}'
+
+    etag = full.headers['ETag']
+    assert client.get('/videos/hero-video-mobile.mp4', headers={'If-None-Match': etag}).status_code == 304
+    stale = client.get('/videos/hero-video-mobile.mp4', headers={'Range': 'bytes=0-9', 'If-Range': '"vanha"'})
+    assert stale.status_code == 200
+
+    assert client.get('/videos/puuttuu.mp4').status_code == 404
+    assert client.get('/videos/../app.py').status_code == 404
+
+
+def test_missing_renditions_are_not_referenced(tmp_path, monkeypatch):
+    """Testaa että sivulla mainitaan vain olemassa olevat videot ja ilman niitä vain julistekuva"""
+    client = app.test_client()
+    page_cache.clear()
+    html = client.get('/fi/').get_data(as_text=True)
+    assert '/videos/hero-video-mobile.mp4' in html
+    assert 'hero-video.mp4' not in html
+    assert 'poster="' in html
+
+    monkeypatch.setattr(hero_videos, 'directory', str(tmp_path))
+    html = client.get('/fi/').get_data(as_text=True)
+    assert '<video' not in html
+    assert 'hero-fallback-bg' in html
+    page_cache.clear()
+
+
+def test_sources_from_manifest(tmp_path, monkeypatch):
+    """Testaa että <source>-lista ja juliste tulevat build_videos.py:n manifestista"""
+    (tmp_path / 'hero-video').mkdir()
+    sources = []
+    for width, media in ((640, '(max-width: 768px)'), (1920, '(min-width: 769px)')):
+        for fmt, type_ in (('webm', 'video/webm; codecs="vp9"'), ('mp4', 'video/mp4; codecs="avc1.640028"')):
+            file = f'hero-video/{width}.{fmt}'
+            (tmp_path / file).write_bytes(b'x' * width)
+            sources.append({'file': file, 'type': type_, 'media': media, 'width': width, 'bytes': width})
+    (tmp_path / 'hero-video' / 'poster-640.jpg').write_bytes(b'jpg')
+    manifest = {'hero-video': {'sources': sources, 'posters': [{'file': 'hero-video/poster-640.jpg', 'width': 640}]}}
+    (tmp_path / 'manifest.json').write_text(json.dumps(manifest), encoding='utf-8')
+
+    monkeypatch.setattr(hero_videos, 'directory', str(tmp_path))
+    monkeypatch.setattr(hero_videos, 'path', str(tmp_path / 'manifest.json'))
+    page_cache.clear()
+    soup = BeautifulSoup(app.test_client().get('/fi/').data, 'html.parser')
+    video = soup.find('video', class_='hero-video')
+    assert [(s['src'], s['media']) for s in video.find_all('source')] == [
+        ('/videos/hero-video/640.webm', '(max-width: 768px)'),
+        ('/videos/hero-video/640.mp4', '(max-width: 768px)'),
+        ('/videos/hero-video/1920.webm', '(min-width: 769px)'),
+        ('/videos/hero-video/1920.mp4', '(min-width: 769px)'),
+    ]
+    assert video.find('source')['type'] == 'video/webm; codecs="vp9"'
+    assert video['poster'] == '/static/videos/hero-video/poster-640.jpg'
+    page_cache.clear()
+
+    assert build_videos.check(str(tmp_path)) == []
+    (tmp_path / 'hero-video' / '1920.mp4').unlink()
+    assert build_videos.check(str(tmp_path)) == ['hero-video: hero-video/1920.mp4 is missing']
+
+
+def test_ladder_media_queries():
+    """Testaa että leveimmälle versiolle jää loput näyttöleveydet"""
+    mobile, desktop, hd = build_videos.LADDER
+    assert build_videos.media_query(mobile, None) == '(max-width: 768px)'
+    assert build_videos.media_query(dict(hd, max_viewport=None), desktop) == '(min-width: 1441px)'
+    assert build_videos.media_query(dict(mobile, max_viewport=None), None) is None
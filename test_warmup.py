@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Testaa mallien esikäännöksen, tavukoodivälimuistin ja käynnistyksen lämmityksen
+"""
+
+from jinja2 import DictLoader, Environment
+
+from app import app, metrics, page_cache, warm_up
+from warmup import bytecode_cache, compile_templates
+
+
+def test_bytecode_cache_skips_compiling(tmp_path):
+    """Testaa että toinen ympäristö lataa käännetyn mallin levyltä"""
+    templates = {'page.html': '{% for i in range(3) %}<p>{{ i }}</p>{% endfor %}', 'notes.txt': 'x'}
+    first = Environment(loader=DictLoader(templates), bytecode_cache=bytecode_cache(str(tmp_path)))
+    assert list(compile_templates(first)) == ['page.html']
+    assert len(list(tmp_path.iterdir())) == 1
+
+    second = Environment(loader=DictLoader(templates), bytecode_cache=bytecode_cache(str(tmp_path)))
+    compiled = []
+    second.compile = lambda *args, **kwargs: compiled.append(args)
+    assert second.get_template('page.html').render() == '<p>0</p><p>1</p><p>2</p>'
+    assert compiled == []
+
+
+def test_warm_up_fills_page_cache():
+    """Testaa että lämmityksen jälkeen ensimmäinenkin pyyntö tulee välimuistista"""
+    page_cache.clear()
+    result = warm_up()
+    assert {'index.html', 'kiitos.html', '404.html', '500.html', 'error.html'} <= set(result['compiled'])
+    assert {'index.html (fi)', 'index.html (en)', '404.html'} <= set(result['rendered'])
+
+    client = app.test_client()
+    misses = page_cache.misses
+    for path in ('/fi/', '/en/', '/en/thank_you', '/ei-ole'):
+        for encoding in ('br', 'gzip', 'identity'):
+            client.get(path, headers={'Accept-Encoding': encoding})
+    assert page_cache.misses == misses
+
+
+def test_warm_up_is_not_counted_in_metrics():
+    """Testaa ettei lämmitys näy mittareissa, joita jokainen haarautettu työprosessi perisi"""
+    page_cache.clear()
+    hits, misses = page_cache.hits, page_cache.misses
+    counters = dict(metrics._counters)
+    histograms = {key: h['count'] for key, h in metrics._histograms.items()}
+    warm_up()
+    assert (page_cache.hits, page_cache.misses) == (hits, misses)
+    assert metrics._counters == counters
+    assert {key: h['count'] for key, h in metrics._histograms.items()} == histograms
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Vendoring step: self-host the third-party CSS, fonts and JS from the CDNs.
+
+Downloads Bootstrap, Bootstrap Icons, Font Awesome and Roboto, and the
+thumbnails for the YouTube facades in templates/embeds.html, and keeps
+only what the templates use:
+
+* CSS rules whose selectors only name classes, ids and elements that occur
+  in templates/, in the pages as the app renders them or in our scripts
+  (plus class names Bootstrap's JS adds)
+* @font-face and @keyframes rules that a kept rule refers to
+* the icon font glyphs of the kept icon rules, and the Roboto weights and
+  characters the pages actually use
+
+The CSS parser and the tree shaking are in css_tools.py.
+
+The result is static/vendor/vendor.css, the fonts it points to and the
+Bootstrap bundle, listed in static/vendor/manifest.json. The templates use
+them when the manifest exists and the CDNs otherwise. Run build_assets.py
+afterwards to fingerprint and precompress them. Requires fontTools
+(build time only) and network access.
+
+    python vendor_assets.py
+"""
+import argparse
+import glob
+import hashlib
+import io
+import json
+import logging
+import os
+import posixpath
+import re
+import shutil
+import string
+import sys
+import tempfile
+import urllib.parse
+import urllib.request
+
+from css_tools import WORDS, drop_unreferenced, parse_css, serialize, shake, walk
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, 'static')
+TEMPLATE_DIR = os.path.join(ROOT, 'templates')
+TRANSLATION_DIR = os.path.join(ROOT, 'translations')
+VENDOR_DIR = 'vendor'
+FONT_DIR = 'fonts'
+MANIFEST = 'manifest.json'
+
+STYLESHEETS = [
+    'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+    'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/bootstrap-icons.css',
+    'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0-beta3/css/all.min.css',
+]
+SCRIPTS = {
+    'bootstrap.bundle.min.js': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+}
+# Bootstrap's JS toggles classes (show, collapsing, ...) that no template
+# mentions, so string literals in these scripts count as used names
+SCRIPTS_ADDING_CLASSES = ['bootstrap.bundle.min.js']
+# Facade thumbnails for every embeds.youtube() call in the templates
+YOUTUBE_THUMBNAIL = 'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg'
+GOOGLE_FONTS = 'https://fonts.googleapis.com/css2?family=Roboto:wght@{weights}&display=swap'
+# Google Fonts picks the font format from the User-Agent; this one gets woff2
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+ALWAYS_USED = {'html', 'body'}
+# WTForms renders these from Python; a field added later shouldn't arrive
+# unstyled because no page had one at build time
+FORM_WIDGETS = {'input', 'textarea', 'select', 'option', 'button', 'label'}
+# Text typed into the form may contain any Latin-1 character
+FORM_CHARACTERS = set(map(ord, string.printable)) | set(range(0xA0, 0x100))
+
+# Inlined critical CSS names what the last build kept, not what the page uses
+_STYLE_BLOCK = re.compile(r'<style\b.*?</style>', re.S | re.I)
+_JS_STRINGS = re.compile(r'"((?:\\.|[^"\\])*)"|\'((?:\\.|[^\'\\])*)\'')
+_ICON_CONTENT = re.compile(r'(?:content|--fa):\s*["\']\\([0-9a-fA-F]{2,6})["\']')
+_FONT_WEIGHT = re.compile(r'font-weight:\s*(\d00|bold|normal)\b')
+_URL = re.compile(r'url\(\s*[\'"]?([^\'")]+)[\'"]?\s*\)')
+_SRC = re.compile(r'src:[^;}]*')
+_YOUTUBE_EMBED = re.compile(r'embeds\.youtube\(\s*[\'"]([-\w]{11})[\'"]')
+
+
+def fetch(url):
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.read()
+    except OSError as e:
+        # HTTP errors and timeouts included
+        raise RuntimeError(f"Download of {url} failed: {e}") from e
+
+
+# -- Tree shaking -----------------------------------------------------------
+
+def used_names(template_dir=TEMPLATE_DIR, scripts=(), class_scripts=(), pages=()):
+    """Every word in the templates, ``scripts`` and the rendered ``pages``, plus string literals in ``class_scripts``.
+
+    The template source also covers markup that only some requests render
+    (form errors); ``pages`` adds what the macros and form widgets output.
+    """
+    names = ALWAYS_USED | FORM_WIDGETS
+    for path in glob.glob(os.path.join(template_dir, '*.html')) + list(scripts):
+        with open(path, encoding='utf-8') as f:
+            names.update(WORDS.findall(f.read()))
+    for html in pages:
+        names.update(WORDS.findall(_STYLE_BLOCK.sub('', html)))
+    for source in class_scripts:
+        for match in _JS_STRINGS.finditer(source):
+            names.update(WORDS.findall(match.group(1) or match.group(2) or ''))
+    return names
+
+
+# -- Fonts ------------------------------------------------------------------
+
+def icon_codepoints(nodes):
+    return {int(code, 16) for _, body in walk(nodes) if body for code in _ICON_CONTENT.findall(body)}
+
+
+def used_weights(*stylesheets):
+    weights = set()
+    for css in stylesheets:
+        for weight in _FONT_WEIGHT.findall(css):
+            weights.add({'normal': 400, 'bold': 700}.get(weight) or int(weight))
+    return sorted(weights)
+
+
+def youtube_videos(template_dir=TEMPLATE_DIR):
+    videos = set()
+    for path in glob.glob(os.path.join(template_dir, '*.html')):
+        with open(path, encoding='utf-8') as f:
+            videos.update(_YOUTUBE_EMBED.findall(f.read()))
+    return sorted(videos)
+
+
+def used_characters(template_dir=TEMPLATE_DIR, translation_dir=TRANSLATION_DIR):
+    characters = set(FORM_CHARACTERS)
+    for path in glob.glob(os.path.join(template_dir, '*.html')):
+        with open(path, encoding='utf-8') as f:
+            characters.update(map(ord, f.read()))
+    for path in glob.glob(os.path.join(translation_dir, '*.json')):
+        with open(path, encoding='utf-8') as f:
+            for text in json.load(f).values():
+                characters.update(map(ord, text))
+    return characters
+
+
+def unicode_range(value):
+    codepoints = set()
+    for part in value.split(','):
+        part = part.strip().upper().removeprefix('U+')
+        if '-' in part:
+            start, end = part.split('-')
+        else:
+            start, end = part.replace('?', '0'), part.replace('?', 'F')
+        codepoints.update(range(int(start, 16), int(end, 16) + 1))
+    return codepoints
+
+
+def subset_font(data, codepoints):
+    """Return ``data`` as a woff2 font with only the glyphs for ``codepoints``."""
+    from fontTools import subset
+
+    # Tables fontTools can't subset (e.g. FFTM) are dropped, which is fine
+    logging.getLogger('fontTools.subset').setLevel(logging.ERROR)
+    options = subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = ['*']
+    font = subset.load_font(io.BytesIO(data), options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=codepoints)
+    subsetter.subset(font)
+    out = io.BytesIO()
+    subset.save_font(font, out, options)
+    return out.getvalue()
+
+
+def localize_fonts(nodes, base_url, codepoints, font_dir, fetch):
+    """Subset every @font-face in ``nodes`` into ``font_dir`` and point ``src`` at it.
+
+    Returns ``(nodes, fonts)`` where ``fonts`` lists ``(filename, before, after)``.
+    """
+    fonts = []
+    downloads = {}
+    subsets = {}
+    kept = []
+    for prelude, body in nodes:
+        if isinstance(body, list):
+            children, nested = localize_fonts(body, base_url, codepoints, font_dir, fetch)
+            kept.append((prelude, children))
+            fonts.extend(nested)
+            continue
+        if prelude != '@font-face':
+            kept.append((prelude, body))
+            continue
+        wanted = codepoints
+        declared = re.search(r'unicode-range:\s*([^;}]+)', body)
+        if declared:
+            wanted = wanted & unicode_range(declared.group(1))
+            if not wanted:
+                continue
+        urls = _URL.findall(body)
+        url = next((u for u in urls if '.woff2' in u), urls[0])
+        url = urllib.parse.urljoin(base_url, url)
+        if url not in downloads:
+            downloads[url] = fetch(url)
+        # Google Fonts serves one variable font for every weight
+        if (url, frozenset(wanted)) not in subsets:
+            subsets[url, frozenset(wanted)] = subset_font(downloads[url], wanted)
+        data = subsets[url, frozenset(wanted)]
+        stem = posixpath.splitext(posixpath.basename(urllib.parse.urlparse(url).path))[0]
+        filename = f'{stem}.{hashlib.sha256(data).hexdigest()[:10]}.woff2'
+        with open(os.path.join(font_dir, filename), 'wb') as f:
+            f.write(data)
+        fonts.append((filename, len(downloads[url]), len(data)))
+        body = _SRC.sub(f'src:url({FONT_DIR}/{filename}) format("woff2")', body, count=1)
+        kept.append((prelude, body))
+    return kept, fonts
+
+
+# -- Build ------------------------------------------------------------------
+
+def build(static_dir=STATIC_DIR, template_dir=TEMPLATE_DIR, translation_dir=TRANSLATION_DIR, fetch=fetch,
+          pages=None):
+    """Vendor everything into ``static_dir``/vendor and return ``(manifest, report)``.
+
+    ``pages`` is the HTML the CSS is shaken against besides the templates,
+    by default every page as the app renders it (app.render_pages).
+
+    The files are built in a temporary directory next to it and swapped in
+    only once every download has succeeded, so a failed run leaves the
+    previous build (or, without one, the CDN fallback) in place.
+    """
+    vendor_dir = os.path.join(static_dir, VENDOR_DIR)
+    build_dir = tempfile.mkdtemp(prefix=f'.{VENDOR_DIR}-', dir=static_dir)
+    try:
+        # mkdtemp makes it private; the files are served to everyone
+        os.chmod(build_dir, 0o755)
+        manifest, report = _build(build_dir, static_dir, template_dir, translation_dir, fetch, pages)
+    except BaseException:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+    # A fresh directory, so fonts of an older build don't linger
+    if os.path.exists(vendor_dir):
+        os.rename(vendor_dir, f'{build_dir}.old')
+    os.rename(build_dir, vendor_dir)
+    shutil.rmtree(f'{build_dir}.old', ignore_errors=True)
+    return manifest, report
+
+
+def _build(vendor_dir, static_dir, template_dir, translation_dir, fetch, pages):
+    font_dir = os.path.join(vendor_dir, FONT_DIR)
+    os.makedirs(font_dir)
+    report = []
+
+    manifest = {'preload': []}
+    for name, url in SCRIPTS.items():
+        data = fetch(url)
+        with open(os.path.join(vendor_dir, name), 'wb') as f:
+            f.write(data)
+        manifest[name] = posixpath.join(VENDOR_DIR, name)
+        report.append((name, len(data), len(data)))
+
+    os.makedirs(os.path.join(vendor_dir, 'youtube'))
+    for video_id in youtube_videos(template_dir):
+        name = f'youtube/{video_id}.jpg'
+        data = fetch(YOUTUBE_THUMBNAIL.format(video_id=video_id))
+        with open(os.path.join(vendor_dir, name), 'wb') as f:
+            f.write(data)
+        manifest[name] = posixpath.join(VENDOR_DIR, name)
+        report.append((name, len(data), len(data)))
+
+    scripts = [os.path.join(static_dir, 'script.js')]
+    class_scripts = []
+    for name in SCRIPTS_ADDING_CLASSES:
+        with open(os.path.join(vendor_dir, name), encoding='utf-8') as f:
+            class_scripts.append(f.read())
+    if pages is None:
+        from app import render_pages
+        pages = [html for rendered in render_pages().values() for html in rendered]
+    names = used_names(template_dir, scripts, class_scripts, pages)
+    characters = used_characters(template_dir, translation_dir)
+
+    parts = []
+    for url in STYLESHEETS:
+        source = fetch(url).decode('utf-8')
+        nodes = drop_unreferenced(shake(parse_css(source), names))
+        # Icon fonts only need the glyphs of the icons that survived
+        icons = icon_codepoints(nodes)
+        nodes, fonts = localize_fonts(nodes, url, icons or characters, font_dir, fetch)
+        css = serialize(nodes)
+        parts.append(css)
+        report.append((posixpath.basename(urllib.parse.urlparse(url).path), len(source), len(css)))
+        report.extend(fonts)
+
+    with open(os.path.join(static_dir, 'style.css'), encoding='utf-8') as f:
+        weights = used_weights(f.read(), *parts)
+    url = GOOGLE_FONTS.format(weights=';'.join(map(str, weights)))
+    nodes, fonts = localize_fonts(parse_css(fetch(url).decode('utf-8')), url, characters, font_dir, fetch)
+    parts.append(serialize(nodes))
+    report.extend(fonts)
+    # The regular weight of the basic Latin range is on every page
+    for prelude, body in walk(nodes):
+        declared = re.search(r'unicode-range:\s*([^;}]+)', body or '')
+        if prelude == '@font-face' and re.search(r'font-weight:\s*400\b', body) \
+                and (declared is None or ord('a') in unicode_range(declared.group(1))):
+            font = posixpath.join(VENDOR_DIR, _URL.search(body).group(1))
+            if font not in manifest['preload']:
+                manifest['preload'].append(font)
+
+    with open(os.path.join(vendor_dir, 'vendor.css'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(parts) + '\n')
+    manifest['vendor.css'] = posixpath.join(VENDOR_DIR, 'vendor.css')
+    with open(os.path.join(vendor_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return manifest, report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--static-dir', default=STATIC_DIR)
+    args = parser.parse_args()
+
+    print("📥 Vendoring third-party CSS, fonts and JS")
+    try:
+        _, report = build(args.static_dir)
+    except RuntimeError as e:
+        print(f"   ❌ {e}; the previous vendor build is unchanged")
+        sys.exit(1)
+    for name, before, after in report:
+        print(f"   ✅ {name}: {before} -> {after} bytes")
+    print("   ➡️  Run build_assets.py to fingerprint and compress the result")
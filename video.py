@@ -0,0 +1,184 @@
+"""Byte-range serving for the hero video renditions.
+
+Browsers fetch ``<video>`` sources in ranges (a probe for the moov atom,
+then chunks as playback proceeds), so every response is either a 206 for
+one range or a full 200, with ETag/Last-Modified validators. Under a server
+that provides ``wsgi.file_wrapper`` (gunicorn, waitress) the file is
+positioned at the range start and the server sends it with ``sendfile``;
+otherwise the range is sliced from a shared memory map.
+
+``VideoLibrary.sources()`` lists the renditions recorded by build_videos.py
+and only those that exist, so a missing file is never requested and the
+poster image stays visible.
+"""
+import mimetypes
+import mmap
+import os
+import posixpath
+import threading
+from datetime import datetime, timezone
+
+from flask import Response, abort, request, url_for
+from werkzeug.http import http_date, is_resource_modified, parse_range_header
+from werkzeug.security import safe_join
+
+from assets import JSONManifest
+
+CHUNK_SIZE = 256 * 1024
+VIDEO_EXTENSIONS = ('.mp4', '.webm')
+MAX_AGE = 24 * 3600
+VIDEO_DIR = 'videos'
+MANIFEST = 'manifest.json'
+
+
+class VideoFile:
+    """An open rendition: size, validators and a read-only memory map."""
+
+    def __init__(self, path):
+        self.path = path
+        stat = os.stat(path)
+        self.size = stat.st_size
+        self.last_modified = datetime.fromtimestamp(int(stat.st_mtime), timezone.utc)
+        self.mtime_ns = stat.st_mtime_ns
+        self.etag = f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self._map = None
+        self._lock = threading.Lock()
+
+    @property
+    def map(self):
+        if self._map is None:
+            with self._lock:
+                if self._map is None:
+                    with open(self.path, 'rb') as f:
+                        self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def iter_range(self, start, end):
+        for offset in range(start, end, CHUNK_SIZE):
+            yield self.map[offset:min(offset + CHUNK_SIZE, end)]
+
+
+class VideoLibrary(JSONManifest):
+    """Video renditions described by build_videos.py's manifest.
+
+    Rendition sets missing from the manifest fall back to a fixed list of
+    ``(filename, media query)`` pairs, from the smallest file to the largest.
+    """
+
+    def __init__(self, directory, fallback=None):
+        super().__init__(os.path.join(directory, MANIFEST))
+        self.directory = directory
+        self.fallback = fallback or {}
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def _stat(self, filename):
+        try:
+            return os.stat(os.path.join(self.directory, filename)).st_mtime_ns
+        except OSError:
+            return None
+
+    @property
+    def version(self):
+        """Changes when the manifest is rebuilt or a fallback file changes."""
+        return (super().version,) + tuple(
+            self._stat(filename) for renditions in self.fallback.values() for filename, _ in renditions)
+
+    def sources(self, name):
+        """``(url, type, media)`` for the ``<source>`` tags of existing renditions.
+
+        Manifest entries are already ordered smallest first with a media
+        query per size. For the fallback list, with more than one rendition
+        each gets its media query and the smallest is repeated last without
+        one, for browsers that ignore ``media`` on ``<source>``.
+        """
+        self._refresh()
+        entry = self.data.get(name)
+        if entry is not None:
+            return [(url_for('video', filename=item['file']), item['type'], item['media'])
+                    for item in entry['sources'] if self._stat(item['file']) is not None]
+
+        existing = [(filename, media) for filename, media in self.fallback.get(name, ())
+                    if self._stat(filename) is not None]
+        sources = [(url_for('video', filename=filename), 'video/mp4', media if len(existing) > 1 else None)
+                   for filename, media in existing]
+        if len(existing) > 1:
+            sources.append((sources[0][0], 'video/mp4', None))
+        return sources
+
+    def poster(self, name, width=1280):
+        """URL of the smallest poster frame at least ``width`` pixels wide, if any."""
+        self._refresh()
+        posters = self.data.get(name, {}).get('posters')
+        if not posters:
+            return None
+        poster = next((p for p in posters if p['width'] >= width), posters[-1])
+        return url_for('static', filename=posixpath.join(VIDEO_DIR, poster['file']))
+
+    def get(self, filename):
+        path = safe_join(self.directory, filename)
+        if path is None or not filename.endswith(VIDEO_EXTENSIONS):
+            return None
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        video = self._files.get(path)
+        if video is None or video.mtime_ns != mtime_ns:
+            # A replaced file gets a new map; the old one is released once
+            # responses still reading from it finish
+            with self._lock:
+                video = self._files[path] = VideoFile(path)
+        return video
+
+    def response(self, filename):
+        """Serve ``filename`` as a conditional, range-aware response."""
+        video = self.get(filename)
+        if video is None:
+            abort(404)
+
+        headers = {
+            'Accept-Ranges': 'bytes',
+            'ETag': f'"{video.etag}"',
+            'Last-Modified': http_date(video.last_modified),
+            'Cache-Control': f'public, max-age={MAX_AGE}',
+        }
+        if not is_resource_modified(request.environ, etag=video.etag, last_modified=video.last_modified):
+            return Response(status=304, headers=headers)
+
+        start, end = 0, video.size
+        status = 200
+        if 'Range' in request.headers and self._if_range_matches(video):
+            byte_range = parse_range_header(request.headers['Range'])
+            # Multiple ranges are valid HTTP but no player asks for them;
+            # answering with the whole file is allowed
+            if byte_range is not None and len(byte_range.ranges) == 1:
+                bounds = byte_range.range_for_length(video.size)
+                if bounds is None:
+                    headers['Content-Range'] = f'bytes */{video.size}'
+                    return Response(status=416, headers=headers)
+                start, end = bounds
+                status = 206
+                headers['Content-Range'] = f'bytes {start}-{end - 1}/{video.size}'
+        headers['Content-Length'] = str(end - start)
+
+        if request.method == 'HEAD':
+            body = []
+        elif 'wsgi.file_wrapper' in request.environ:
+            # The server sends Content-Length bytes from the current
+            # position, with sendfile where it can
+            f = open(video.path, 'rb')
+            f.seek(start)
+            body = request.environ['wsgi.file_wrapper'](f, CHUNK_SIZE)
+        else:
+            body = video.iter_range(start, end)
+        return Response(body, status, headers=headers, mimetype=video.mimetype, direct_passthrough=True)
+
+    def _if_range_matches(self, video):
+        if_range = request.if_range
+        if if_range.etag is not None:
+            return if_range.etag == video.etag
+        if if_range.date is not None:
+            return if_range.date >= video.last_modified
+        return True
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Startup warmup: load deferred imports, compile the templates and fill
+the page cache.
+
+The app imports its heavier dependencies on first use, Jinja compiles a
+template on its first use and the page cache renders (and compresses) a
+page on its first request, so without this the first visitors of every
+new gunicorn worker pay for all three. gunicorn.conf.py
+runs app.warm_up() in each worker before it accepts connections. Compiled
+templates are kept in a filesystem bytecode cache (JINJA_CACHE_DIR), so
+later workers and restarts only load them.
+
+Run directly to print the startup-time report; --compile-only just fills
+the bytecode cache, which the Docker build does so that no worker
+compiles a template:
+
+    python warmup.py
+    python warmup.py --compile-only
+"""
+import argparse
+import importlib
+import logging
+import os
+import tempfile
+import time
+
+from jinja2 import FileSystemBytecodeCache
+
+logger = logging.getLogger(__name__)
+
+
+def bytecode_cache(directory=None):
+    """FileSystemBytecodeCache in JINJA_CACHE_DIR or the temp directory."""
+    directory = directory or os.environ.get('JINJA_CACHE_DIR') or \
+        os.path.join(tempfile.gettempdir(), 'espoo-israel-jinja')
+    os.makedirs(directory, exist_ok=True)
+    return FileSystemBytecodeCache(directory)
+
+
+def import_modules(names):
+    """Import modules the app defers until first use; returns seconds per module."""
+    timings = {}
+    for name in names:
+        started = time.perf_counter()
+        importlib.import_module(name)
+        timings[name] = time.perf_counter() - started
+    return timings
+
+
+def compile_templates(env, extensions=('.html',)):
+    """Load every template of ``env``; returns seconds per template."""
+    timings = {}
+    for name in env.list_templates(extensions=[ext.lstrip('.') for ext in extensions]):
+        started = time.perf_counter()
+        env.get_template(name)
+        timings[name] = time.perf_counter() - started
+    return timings
+
+
+def timed(timings, key, render):
+    started = time.perf_counter()
+    render()
+    timings[key] = time.perf_counter() - started
+
+
+def report(imported, compiled, rendered, total):
+    """Log one line summing up the warmup, with the slowest steps."""
+    steps = {**{f'import {name}': seconds for name, seconds in imported.items()}, **compiled, **rendered}
+    slowest = sorted(steps.items(), key=lambda item: item[1], reverse=True)[:3]
+    logger.info("Warmed up in %.0f ms: imports in %.0f ms, %s templates compiled in %.0f ms, "
+                "%s pages rendered in %.0f ms",
+                total * 1000, sum(imported.values()) * 1000, len(compiled), sum(compiled.values()) * 1000,
+                len(rendered), sum(rendered.values()) * 1000,
+                extra={'warmup_ms': round(total * 1000, 1),
+                       'slowest': {name: round(seconds * 1000, 1) for name, seconds in slowest}})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--compile-only', action='store_true',
+                        help='only compile the templates into JINJA_CACHE_DIR')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    from app import app, warm_up
+    import_seconds = time.perf_counter() - started
+    if args.compile_only:
+        compiled = compile_templates(app.jinja_env)
+        print(f"{len(compiled)} templates compiled in {sum(compiled.values()) * 1000:.0f} ms")
+        return
+    result = warm_up()
+    print(f"import app: {import_seconds * 1000:.0f} ms")
+    for section in ('imported', 'compiled', 'rendered'):
+        print(f"{section}:")
+        for name, seconds in result[section].items():
+            print(f"  {name:<32} {seconds * 1000:8.1f} ms")
+    print(f"warmup total: {result['total'] * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()